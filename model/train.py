@@ -1,22 +1,33 @@
 
 import os
+import argparse
 import joblib
 import json
 import time
 import numpy as np
 import pandas as pd
 from sklearn.utils.class_weight import compute_class_weight
-from sklearn.metrics import f1_score, classification_report, confusion_matrix
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
 from lightgbm import LGBMClassifier
 from xgboost import XGBClassifier
+from src.checkpoint import Checkpointer
+from src.early_stopping import fit_with_early_stopping, supports_early_stopping
+from src.registry import register_model
+from src.native_export import export_native, feature_names_from
+from src.evaluation import evaluate_model
+from src.bootstrap import confidence_intervals
+from src.experiment_cache import experiment_key, load_cached, save_key
+from src.matrix_format import training_matrix
 
 # ---------------- CONFIG ----------------
 DATA_DIR = "data/training_ready/"
 MODELS_ROOT = "model/fine/"
 PREPROCESSOR_PATH = "models/preprocessor.pkl"
 RANDOM_STATE = 42
+EARLY_STOPPING = True        # Carve out a validation split and stop GBMs early
+PATIENCE = 50
+CHECKPOINTING = True         # Periodic checkpoints; continue a crashed run with --resume
 MODELS_CONFIG ={"lightgbm_tuned": {
     "class": LGBMClassifier,
     "params": {
@@ -50,22 +61,6 @@ def get_weights(y_train):
     weights = compute_class_weight("balanced", classes=classes, y=y_train)
     return dict(zip(classes, weights))
 
-def evaluate_model(model, X_test, y_test):
-    start_time = time.time()
-    preds = model.predict(X_test)
-    inference_time = time.time() - start_time
-    
-    report = classification_report(y_test, preds, output_dict=True)
-    
-    return {
-        "macro_f1": f1_score(y_test, preds, average="macro"),
-        "weighted_f1": f1_score(y_test, preds, average="weighted"),
-        "inference_time_cpu": inference_time,
-        "class_4_recall": report["3"]["recall"], # index 3 is Severity 4
-        "report": report,
-        "confusion_matrix": confusion_matrix(y_test, preds).tolist()
-    }
-
 def save_all(name, model, metrics, weights):
     path = os.path.join(MODELS_ROOT, name)
     os.makedirs(path, exist_ok=True)
@@ -78,9 +73,15 @@ def save_all(name, model, metrics, weights):
     with open(os.path.join(path, "class_weights.json"), "w") as f:
         json.dump({int(k)+1: v for k, v in weights.items()}, f, indent=4)
 
+    # Booster in its native format too, for fast, version-tolerant loading when serving
+    export_native(model, path, feature_names_from())
+
+    # Index the artifact so it can be listed and compared without opening it
+    register_model(path)
+
 # ---------------- MAIN ----------------
 
-def main():
+def main(resume=False, force=False):
     X_train, X_test, y_train, y_test = load_data()
     weights_dict = get_weights(y_train)
     
@@ -96,23 +97,59 @@ def main():
             sample_weights = np.array([weights_dict[t] for t in y_train])
         else:
             params["class_weight"] = weights_dict
-        
+
+        # Reuse the saved model when data, class, params and code are unchanged
+        key, key_parts = experiment_key(os.path.join(DATA_DIR, "train_data.pkl"), config["class"], params,
+                                       code=[main, load_data, get_weights],
+                                       settings={"early_stopping": EARLY_STOPPING, "patience": PATIENCE},
+                                       test_path=os.path.join(DATA_DIR, "test_data.pkl"))
+        cached = load_cached(os.path.join(MODELS_ROOT, name), key, force=force)
+        if cached:
+            model, metrics = cached
+            print(f"Reusing {name} (experiment key {key[:12]} unchanged; --force to retrain)")
+            comparison_log.append({
+                "model": name,
+                "macro_f1": metrics["macro_f1"],
+                "class_4_recall": metrics["class_4_recall"],
+                "train_time": metrics["training_time"]
+            })
+            continue
+
+        # Layout picked by src/matrix_format.py for this library (CSR by default)
+        X_fit = training_matrix(X_train, config["class"])
+
         model = config["class"](**params)
         
         # Train
         start_train = time.time()
-        if name == "xgboost":
-            model.fit(X_train, y_train, sample_weight=sample_weights)
+        early_stopping = None
+        checkpoint = None
+        if EARLY_STOPPING and supports_early_stopping(model):
+            checkpoint = Checkpointer(name, resume=resume) if CHECKPOINTING else None
+            early_stopping = fit_with_early_stopping(
+                model, X_fit, y_train,
+                sample_weight=sample_weights if name == "xgboost" else None,
+                patience=PATIENCE, checkpoint=checkpoint
+            )
+        elif name == "xgboost":
+            model.fit(X_fit, y_train, sample_weight=sample_weights)
         else:
-            model.fit(X_train, y_train)
+            model.fit(X_fit, y_train)
         train_time = time.time() - start_train
+        del X_fit
         
         # Eval
         metrics = evaluate_model(model, X_test, y_test)
         metrics["training_time"] = train_time
+        metrics["bootstrap"] = confidence_intervals(metrics["confusion_matrix"])
+        if early_stopping:
+            metrics["early_stopping"] = early_stopping
         
         # Save
         save_all(name, model, metrics, weights_dict)
+        save_key(os.path.join(MODELS_ROOT, name), key, key_parts)
+        if checkpoint:
+            checkpoint.clear()
         
         comparison_log.append({
             "model": name,
@@ -130,7 +167,13 @@ def main():
     print(pd.DataFrame(comparison_log).sort_values("macro_f1", ascending=False))
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resume", action="store_true",
+                        help="continue each model from its latest checkpoint")
+    parser.add_argument("--force", action="store_true",
+                        help="retrain even when a model with the same experiment key is saved")
+    args = parser.parse_args()
+    main(resume=args.resume, force=args.force)
 
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -220,6 +220,7 @@ df["Start_Time"] = pd.to_datetime(df["Start_Time"], errors="coerce")
 df["hour"] = df["Start_Time"].dt.hour
 df['day'] = df['Start_Time'].dt.day
 df['month'] = df['Start_Time'].dt.month
+df['year'] = df['Start_Time'].dt.year   # Not a model feature; orders rows for src/backtest.py
 df['dayofweek'] = df['Start_Time'].dt.dayofweek
 
 # Map hour to coarse time-of-day bucket
@@ -56,10 +56,11 @@ def load_data():
         df[col] = df[col].astype('category')
     return df
 
-def get_preprocessor():
+def get_preprocessor(numeric=NUMERIC_FEATURES, categorical=CATEGORICAL_FEATURES, boolean=BOOL_FEATURES):
     """
     Creates a scikit-learn ColumnTransformer.
     This is the object we will save for the UI later.
+    Pass column subsets to build a reduced preprocessor (see src/model_slimming.py).
     """
     # Pipeline for numerical features: Scale them
     numeric_transformer = Pipeline(steps=[
@@ -76,15 +77,33 @@ def get_preprocessor():
     # Combine them
     preprocessor = ColumnTransformer(
         transformers=[
-            ('num', numeric_transformer, NUMERIC_FEATURES),
-            ('cat', categorical_transformer, CATEGORICAL_FEATURES),
-            ('bool', 'passthrough', BOOL_FEATURES) # Don't touch booleans
+            ('num', numeric_transformer, list(numeric)),
+            ('cat', categorical_transformer, list(categorical)),
+            ('bool', 'passthrough', list(boolean)) # Don't touch booleans
         ],
         remainder='drop' # Drop any columns not listed (sanity check)
     )
     
     return preprocessor
 
+def load_split():
+    """Raw (untransformed) X_train, X_test, y_train, y_test from the same stratified split as run_pipeline.
+
+    Row order matches the saved train_data.pkl / test_data.pkl, so predictions
+    on the processed matrices line up with these rows.
+    """
+    df = load_data()
+    X = df.drop(columns=[TARGET])
+    y = df[TARGET]
+    return train_test_split(
+        X, y, test_size=0.2, stratify=y, random_state=42
+    )
+
+def load_test_frame():
+    """Raw test rows and targets, in test_data.pkl order."""
+    _, X_test, _, y_test = load_split()
+    return X_test, y_test
+
 def run_pipeline(sample_fraction=1.0):
     """
     sample_fraction: Set to 0.1 to run on 10% of data for debugging/quick tests
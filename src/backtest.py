@@ -0,0 +1,302 @@
+import os
+import json
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import lightgbm as lgb
+import matplotlib.pyplot as plt
+from joblib import Parallel, delayed
+
+from preprocessing.transform import DATA_PATH, TARGET, load_data
+from src.binned_dataset import (
+    balanced_sample_weights, build_binned_dataset, load_binned_dataset, share_matrix, load_matrix,
+    subset, lgb_train_params
+)
+from src.cross_validation import registered_models
+from src.experiment_cache import data_fingerprint
+from src.registry import file_hash, _read_json
+from src.evaluation import confusion_matrix, metrics_from_confusion, iter_chunks, N_CLASSES
+from src.benchmark_report import peak_rss_mb
+
+# ---------------- CONFIG ----------------
+PREPROCESSOR_PATH = "preprocessing/new/preprocessor.pkl"
+STORE_DIR = "data/training_ready/backtest/"
+OUTPUT_DIR = "evaluations/backtest/"
+MODEL = "lightgbm_tuned"     # A LightGBM config from the training scripts
+MIN_TRAIN_MONTHS = 12        # History before the first test month
+STEP = 1                     # Test every STEP-th month
+WARM_ROUNDS = 100            # Trees added per window on top of the previous window's model
+N_WORKERS = 4                # Parallel chains of consecutive windows
+THREADS_PER_WORKER = max(1, (os.cpu_count() or 1) // N_WORKERS)
+TRANSFORM_CHUNK = 500_000    # Rows passed through the preprocessor at a time
+
+# ---------------- STORE ----------------
+
+def month_index(year, month):
+    """Months since year 0, so consecutive calendar months are consecutive integers."""
+    return np.asarray(year, dtype=np.int64) * 12 + np.asarray(month, dtype=np.int64) - 1
+
+def month_label(index):
+    return f"{index // 12}-{index % 12 + 1:02d}"
+
+def store_paths(store_dir=STORE_DIR):
+    return {
+        "matrix": os.path.join(store_dir, "matrix.pkl"),
+        "labels": os.path.join(store_dir, "labels.npz"),
+        "binned": os.path.join(store_dir, "backtest.bin"),
+        "meta": os.path.join(store_dir, "store.json"),
+    }
+
+def build_store(store_dir=STORE_DIR, rebuild=False):
+    """Every processed row in time order: CSR matrix, targets, month index and a binned Dataset.
+
+    Rows are sorted by (year, month), so the training rows of any window are
+    a prefix of the store and its test month is the contiguous block after
+    it. The matrix is memory-mapped by workers and the binned Dataset is
+    built once; each window trains on a prefix subset of it. Rebuilt when the
+    processed Parquet or the preprocessor change.
+    """
+    paths = store_paths(store_dir)
+    source = {"source_sha256": data_fingerprint(DATA_PATH), "preprocessor_sha256": file_hash(PREPROCESSOR_PATH)}
+    meta = _read_json(paths["meta"])
+    if not rebuild and meta and all(meta[k] == v for k, v in source.items()) and os.path.exists(paths["binned"]):
+        print(f"Using cached backtest store: {store_dir}")
+        return meta
+
+    df = load_data()
+    missing = {"year", "month"} - set(df.columns)
+    if missing:
+        raise ValueError(f"{DATA_PATH} has no {sorted(missing)} column; re-run preprocessing/cleaning.py")
+    periods = month_index(df["year"], df["month"])
+    order = np.argsort(periods, kind="stable")
+    df, periods = df.iloc[order], periods[order]
+    y = df[TARGET].to_numpy().astype(np.int8) - 1
+
+    # The saved preprocessor is unsupervised (scaling, one-hot), so it is applied as-is to every window.
+    preprocessor = joblib.load(PREPROCESSOR_PATH)
+    X = sp.vstack([sp.csr_matrix(preprocessor.transform(df.iloc[rows]))
+                   for rows in iter_chunks(len(df), TRANSFORM_CHUNK)], format="csr")
+    del df
+
+    os.makedirs(store_dir, exist_ok=True)
+    share_matrix(X, paths["matrix"], rebuild=True, source=DATA_PATH)
+    np.savez(paths["labels"], y=y, periods=periods)
+    # Weights are set per window (class balance drifts), not stored in the binary file.
+    build_binned_dataset(X, y, path=paths["binned"], rebuild=True, source=DATA_PATH)
+    meta = {**source, **paths, "n_rows": int(X.shape[0]), "n_features": int(X.shape[1]),
+            "first_month": month_label(periods[0]), "last_month": month_label(periods[-1])}
+    with open(paths["meta"], "w") as f:
+        json.dump(meta, f, indent=4)
+    return meta
+
+def load_labels(meta):
+    labels = np.load(meta["labels"])
+    return labels["y"], labels["periods"]
+
+# ---------------- WINDOWS ----------------
+
+def make_windows(periods, min_train_months=MIN_TRAIN_MONTHS, step=STEP):
+    """Expanding windows over time-sorted rows: train on months <= t, test on the next month with data.
+
+    Returns:
+        list of dicts with the month indices and row bounds of each window
+    """
+    months, starts = np.unique(periods, return_index=True)
+    stops = np.append(starts[1:], len(periods))
+    windows = []
+    for i in range(min_train_months - 1, len(months) - 1, step):
+        windows.append({
+            "train_end": int(months[i]), "test_month": int(months[i + 1]),
+            "train_stop": int(stops[i]), "test_start": int(starts[i + 1]), "test_stop": int(stops[i + 1]),
+        })
+    return windows
+
+def split_chains(windows, n_workers=N_WORKERS):
+    """Consecutive runs of windows, one per worker; each run warm-starts window to window."""
+    n_chains = max(1, min(n_workers, len(windows)))
+    return [list(chain) for chain in np.array_split(np.array(windows, dtype=object), n_chains)]
+
+# ---------------- TRAINING ----------------
+
+def _raw_scores(boosters, X, start, stop):
+    """Summed raw (pre-softmax) scores of the boosters on rows [start, stop)."""
+    raw = np.zeros((stop - start, N_CLASSES))
+    for rows in iter_chunks(stop - start):
+        block = X[start + rows.start:start + rows.stop]
+        for booster in boosters:
+            raw[rows] += booster.predict(block, raw_score=True)
+    return raw
+
+def run_chain(windows, params, meta, warm_rounds=WARM_ROUNDS, n_threads=THREADS_PER_WORKER):
+    """Train and test consecutive windows, each continuing from the previous window's model.
+
+    The first window trains the config's full round count; every later one
+    adds warm_rounds trees fitted on its expanded history, starting from the
+    previous model's raw scores (the same as LightGBM's init_model, which
+    needs raw data the binary Dataset does not keep).
+
+    Returns:
+        list of per-window result dicts
+    """
+    X = load_matrix(meta["matrix"])
+    y, _ = load_labels(meta)
+    dataset = load_binned_dataset(meta["binned"])
+    train_params, cold_rounds = lgb_train_params(params, n_threads)
+
+    boosters = []
+    raw = np.zeros((0, N_CLASSES))   # Current model's raw scores on the rows trained so far
+    results = []
+    for window in windows:
+        stop = window["train_stop"]
+        start = time.time()
+        if boosters:
+            # Only the month(s) added since the last window need scoring with the earlier trees.
+            raw = np.vstack([raw, _raw_scores(boosters, X, raw.shape[0], stop)])
+        init_time = time.time() - start
+
+        start = time.time()
+        train_set = subset(dataset, np.arange(stop)).construct()
+        # Set after construct(): a subset ignores weights and init scores given before it.
+        train_set.set_weight(balanced_sample_weights(y[:stop]))
+        if boosters:
+            train_set.set_init_score(raw)
+        rounds = warm_rounds if boosters else cold_rounds
+        booster = lgb.train(train_params, train_set, num_boost_round=rounds)
+        train_time = time.time() - start
+        new_raw = _raw_scores([booster], X, 0, stop)
+        raw = raw + new_raw if boosters else new_raw
+        boosters.append(booster)
+
+        start = time.time()
+        test = slice(window["test_start"], window["test_stop"])
+        preds = _raw_scores(boosters, X, test.start, test.stop).argmax(axis=1)
+        eval_time = time.time() - start
+        m = metrics_from_confusion(confusion_matrix(y[test], preds))
+        share = np.bincount(y[test], minlength=N_CLASSES) / (test.stop - test.start)
+
+        results.append({
+            "train_end": month_label(window["train_end"]),
+            "test_month": month_label(window["test_month"]),
+            "n_train": stop,
+            "n_test": test.stop - test.start,
+            "warm_start": len(boosters) > 1,
+            "rounds_added": rounds,
+            "total_trees": sum(b.current_iteration() for b in boosters),
+            "macro_f1": float(m["macro_f1"]),
+            "class_4_recall": float(m["class_4_recall"]),
+            **{f"severity_{c + 1}_recall": float(m["recall"][c]) for c in range(N_CLASSES)},
+            **{f"severity_{c + 1}_share": float(share[c]) for c in range(N_CLASSES)},
+            "init_score_time_s": init_time,
+            "train_time_s": train_time,
+            "eval_time_s": eval_time,
+            "peak_rss_mb": peak_rss_mb(),
+            "n_threads": n_threads,
+        })
+        print(f"  train <= {results[-1]['train_end']} | test {results[-1]['test_month']} | "
+              f"{stop} rows | Macro F1 {m['macro_f1']:.4f} | C4 Recall {m['class_4_recall']:.4f} | "
+              f"{train_time:.1f}s")
+    return results
+
+def backtest(params, meta, windows, n_workers=N_WORKERS, threads_per_worker=THREADS_PER_WORKER,
+             warm_rounds=WARM_ROUNDS):
+    """Run the window chains in parallel worker processes; one row per window, in time order."""
+    chains = split_chains(windows, n_workers)
+    print(f"Backtesting {len(windows)} windows as {len(chains)} chains x {threads_per_worker} threads")
+    start = time.time()
+    results = Parallel(n_jobs=len(chains))(
+        delayed(run_chain)(chain, params, meta, warm_rounds, threads_per_worker) for chain in chains
+    )
+    table = pd.DataFrame([row for chain in results for row in chain])
+    table.attrs["wall_time_s"] = time.time() - start
+    return table
+
+# ---------------- REPORT ----------------
+
+def drift_summary(table, reference=None):
+    """Trend of the test metrics over time (per year, by least squares) and the gap to the random split."""
+    months = pd.to_datetime(table["test_month"])
+    years = ((months - months.iloc[0]).dt.days / 365.25).to_numpy()
+    summary = {"n_windows": len(table), "wall_time_s": table.attrs.get("wall_time_s"),
+               "total_train_time_s": float(table["train_time_s"].sum())}
+    for metric in ("macro_f1", "class_4_recall"):
+        values = table[metric].to_numpy()
+        summary[metric] = {
+            "mean": float(values.mean()), "min": float(values.min()), "max": float(values.max()),
+            "first": float(values[0]), "last": float(values[-1]),
+            "slope_per_year": float(np.polyfit(years, values, 1)[0]) if len(values) > 1 else 0.0,
+        }
+        if reference is not None:
+            summary[metric]["random_split"] = reference[metric]
+            summary[metric]["gap_to_random_split"] = float(values.mean() - reference[metric])
+    return summary
+
+def plot_backtest(table, path, reference=None):
+    """Test-month metrics over time and the per-window training cost."""
+    fig, (top, bottom) = plt.subplots(2, 1, figsize=(14, 8), sharex=True)
+    x = np.arange(len(table))
+    for metric in ("macro_f1", "class_4_recall"):
+        line, = top.plot(x, table[metric], marker="o", label=metric)
+        if reference is not None:
+            top.axhline(reference[metric], color=line.get_color(), linestyle="--",
+                        label=f"{metric} (random split)")
+    top.set_ylabel("Test month score")
+    top.legend()
+    bottom.bar(x, table["train_time_s"], color=np.where(table["warm_start"], "tab:blue", "tab:orange"))
+    bottom.set_ylabel("Training time (s); orange = cold start")
+    bottom.set_xticks(x)
+    bottom.set_xticklabels(table["test_month"], rotation=90, fontsize=7)
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+# ---------------- MAIN ----------------
+
+def main(model=MODEL, min_train_months=MIN_TRAIN_MONTHS, step=STEP, n_workers=N_WORKERS,
+         warm_rounds=WARM_ROUNDS, rebuild=False):
+    configs = {name: (config, output_dir) for name, config, output_dir in registered_models()}
+    config, model_dir = configs[model]
+    if config["class"].__name__ != "LGBMClassifier":
+        raise ValueError(f"Backtests train on the binned LightGBM store; {model} is {config['class'].__name__}")
+
+    meta = build_store(rebuild=rebuild)
+    _, periods = load_labels(meta)
+    windows = make_windows(periods, min_train_months, step)
+    if not windows:
+        raise ValueError(f"Need more than {min_train_months} months of data ({meta['first_month']} "
+                         f"to {meta['last_month']})")
+
+    threads = max(1, (os.cpu_count() or 1) // min(n_workers, len(windows)))
+    table = backtest(config["params"], meta, windows, n_workers, threads, warm_rounds)
+    reference = _read_json(os.path.join(model_dir, "metrics.json"))
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    csv_path = os.path.join(OUTPUT_DIR, f"{model}_backtest.csv")
+    table.to_csv(csv_path, index=False)
+    summary = {"model": model, "min_train_months": min_train_months, "step": step,
+               "warm_rounds": warm_rounds, **drift_summary(table, reference)}
+    with open(os.path.join(OUTPUT_DIR, f"{model}_drift.json"), "w") as f:
+        json.dump(summary, f, indent=4)
+    plot_backtest(table, os.path.join(OUTPUT_DIR, f"{model}_backtest.png"), reference)
+
+    print("\n" + table[["test_month", "n_train", "warm_start", "macro_f1", "class_4_recall",
+                        "train_time_s"]].round(4).to_string(index=False))
+    for metric in ("macro_f1", "class_4_recall"):
+        s = summary[metric]
+        gap = f" | vs random split {s['gap_to_random_split']:+.4f}" if "gap_to_random_split" in s else ""
+        print(f"{metric}: mean {s['mean']:.4f} | {s['first']:.4f} -> {s['last']:.4f} | "
+              f"slope {s['slope_per_year']:+.4f}/year{gap}")
+    print(f"Wall time {summary['wall_time_s']:.1f}s | training {summary['total_train_time_s']:.1f}s | saved {csv_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest: train on months <= t, test on t+1")
+    parser.add_argument("--model", default=MODEL, help="LightGBM model name from the training scripts")
+    parser.add_argument("--min-train-months", type=int, default=MIN_TRAIN_MONTHS)
+    parser.add_argument("--step", type=int, default=STEP, help="test every STEP-th month")
+    parser.add_argument("--workers", type=int, default=N_WORKERS)
+    parser.add_argument("--warm-rounds", type=int, default=WARM_ROUNDS)
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the time-sorted store")
+    args = parser.parse_args()
+    main(args.model, args.min_train_months, args.step, args.workers, args.warm_rounds, args.rebuild)
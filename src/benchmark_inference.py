@@ -0,0 +1,142 @@
+import os
+import glob
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from threadpoolctl import threadpool_limits
+
+from preprocessing.transform import load_test_frame
+from src.benchmark_report import (
+    BENCHMARK_DIR, make_record, append_records, load_records, comparison_table
+)
+
+# ---------------- CONFIG ----------------
+ARTIFACT_DIRS = [
+    "model/lightgbm", "model/xgboost", "model/random_forest",
+    "model/fine/*", "models/final_comparison/*",
+]
+PREPROCESSOR_PATH = "preprocessing/new/preprocessor.pkl"  # The one the Streamlit app loads
+BATCH_SIZES = [1, 8, 64, 1_000, 100_000]
+N_THREADS = 1                # Pinned; the Streamlit page scores one request per thread
+WARMUP = 3                   # Untimed calls per cell (lazy init, caches)
+MIN_REPEATS = 5
+MAX_REPEATS = 500
+TIME_BUDGET_S = 10           # Stop repeating a cell after this long (once MIN_REPEATS are done)
+RANDOM_STATE = 42
+
+# ---------------- ARTIFACTS ----------------
+
+def discover_artifacts(patterns=ARTIFACT_DIRS):
+    """(name, path) of every saved model.pkl under the artifact directories."""
+    artifacts = []
+    for pattern in patterns:
+        for directory in sorted(glob.glob(pattern)):
+            path = os.path.join(directory, "model.pkl")
+            if os.path.exists(path):
+                artifacts.append((os.path.basename(os.path.normpath(directory)), path))
+    return artifacts
+
+def pin_threads(model, n_threads):
+    """Make predict() use n_threads; returns extra predict_proba kwargs."""
+    if type(model).__name__ == "CatBoostClassifier":
+        return {"thread_count": n_threads}
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=n_threads)
+    return {}
+
+# ---------------- TIMING ----------------
+
+def time_batches(predict, batches):
+    """Latencies in ms of predict(batch), cycling through batches under the repeat/time budget."""
+    for i in range(WARMUP):
+        predict(batches[i % len(batches)])
+
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < MAX_REPEATS:
+        batch = batches[len(latencies) % len(batches)]
+        t0 = time.perf_counter()
+        predict(batch)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        if len(latencies) >= MIN_REPEATS and time.perf_counter() - start > TIME_BUDGET_S:
+            break
+    return np.array(latencies)
+
+def make_batches(n_available, batch_size, rng, n_batches=20):
+    """Row index windows at random offsets, so repeated calls do not hit the same rows."""
+    batch_size = min(batch_size, n_available)
+    starts = rng.integers(0, n_available - batch_size + 1, size=n_batches)
+    return [np.arange(s, s + batch_size) for s in starts]
+
+def benchmark_model(name, path, raw, processed, preprocessor, batch_sizes, n_threads, run_id):
+    model = joblib.load(path)
+    predict_kwargs = pin_threads(model, n_threads)
+    model_size = os.path.getsize(path) / 1024 ** 2
+    rng = np.random.default_rng(RANDOM_STATE)
+
+    records = []
+    for batch_size in batch_sizes:
+        windows = make_batches(len(raw), batch_size, rng)
+        cells = {
+            False: ([processed[w] for w in windows],
+                    lambda X: model.predict_proba(X, **predict_kwargs)),
+            # The Streamlit path: raw frame -> preprocessor -> model.
+            True: ([raw.iloc[w] for w in windows],
+                   lambda df: model.predict_proba(preprocessor.transform(df), **predict_kwargs)),
+        }
+        for preprocessing, (batches, predict) in cells.items():
+            with threadpool_limits(limits=n_threads):
+                latencies = time_batches(predict, batches)
+            actual = len(windows[0])
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            records.append(make_record(
+                "inference", name, type(model).__name__, n_threads, run_id,
+                artifact=path, batch_size=actual, preprocessing=preprocessing,
+                n_repeats=len(latencies), p50_ms=p50, p95_ms=p95, p99_ms=p99,
+                mean_ms=float(latencies.mean()), rows_per_s=actual / (latencies.mean() / 1000),
+                model_size_mb=model_size,
+            ))
+            print(f"  {name:<20} batch {actual:>6} | preprocess={preprocessing!s:<5} | "
+                  f"p50 {p50:8.2f} ms | p99 {p99:8.2f} ms")
+    return records
+
+# ---------------- MAIN ----------------
+
+def main(models=None, batch_sizes=BATCH_SIZES, n_threads=N_THREADS):
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+    preprocessor = joblib.load(PREPROCESSOR_PATH)
+
+    # Enough raw test rows for the largest batch; transform them once for the no-preprocessing cells.
+    X_test, _ = load_test_frame()
+    n_rows = min(max(batch_sizes), len(X_test))
+    raw = X_test.sample(n=n_rows, random_state=RANDOM_STATE).reset_index(drop=True)
+    processed = sp.csr_matrix(preprocessor.transform(raw))
+
+    for name, path in discover_artifacts():
+        if models and name not in models:
+            continue
+        print(f"\nBenchmarking {name} ({path}) on {n_threads} thread(s)...")
+        append_records(benchmark_model(name, path, raw, processed, preprocessor,
+                                       batch_sizes, n_threads, run_id), "inference")
+
+    df = load_records("inference")
+    df = df[df["n_threads"] == n_threads]
+    tables = {value: comparison_table(df, value, columns=("preprocessing", "batch_size"))
+              for value in ("p50_ms", "p99_ms", "rows_per_s")}
+    table = pd.concat(tables, axis=1)
+    table.to_csv(os.path.join(BENCHMARK_DIR, "inference_comparison.csv"))
+    print("\n" + "="*30)
+    print(f"P50 / P99 LATENCY (ms, {n_threads} thread(s))")
+    print("="*30)
+    print(pd.concat({k: tables[k] for k in ("p50_ms", "p99_ms")}, axis=1).round(2).to_string())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inference latency benchmark of the saved models")
+    parser.add_argument("--models", nargs="+", help="artifact names to run (default: all found)")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=BATCH_SIZES)
+    parser.add_argument("--threads", type=int, default=N_THREADS)
+    args = parser.parse_args()
+    main(args.models, args.batch_sizes, args.threads)
@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import time
+import platform
+import importlib
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ---------------- CONFIG ----------------
+BENCHMARK_DIR = "evaluations/benchmarks/"
+# Bump when a field is renamed or removed; readers refuse records from other versions.
+SCHEMA_VERSION = 1
+
+COMMON_FIELDS = [
+    "schema_version", "kind", "run_id", "timestamp",
+    "model", "library", "library_version", "n_threads", "environment",
+]
+KIND_FIELDS = {
+    "training": [
+        "dataset", "n_rows", "n_features", "wall_time_s", "rows_per_s",
+        "baseline_rss_mb", "peak_rss_mb", "model_size_mb", "params",
+    ],
+    "inference": [
+        "artifact", "batch_size", "preprocessing", "n_repeats",
+        "p50_ms", "p95_ms", "p99_ms", "mean_ms", "rows_per_s", "model_size_mb",
+    ],
+}
+
+_LIBRARIES = ["numpy", "scipy", "pandas", "sklearn", "lightgbm", "xgboost", "catboost"]
+
+# ---------------- ENVIRONMENT ----------------
+
+def library_version(name):
+    try:
+        return importlib.import_module(name).__version__
+    except ImportError:
+        return None
+
+def environment():
+    """Machine and library versions, so regressions can be traced to an upgrade."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "libraries": {name: library_version(name) for name in _LIBRARIES},
+    }
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+# ---------------- RECORDS ----------------
+
+def make_record(kind, model, library, n_threads, run_id, **fields):
+    """One benchmark result in the standard schema; raises ValueError on missing or extra fields."""
+    record = {
+        "schema_version": SCHEMA_VERSION,
+        "kind": kind,
+        "run_id": run_id,
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "model": model,
+        "library": library,
+        "library_version": library_version(_module_of(library)),
+        "n_threads": n_threads,
+        "environment": environment(),
+        **fields,
+    }
+    validate_record(record)
+    return record
+
+def _module_of(library):
+    return {
+        "LGBMClassifier": "lightgbm",
+        "XGBClassifier": "xgboost",
+        "CatBoostClassifier": "catboost",
+    }.get(library, "sklearn")
+
+def validate_record(record):
+    if record.get("schema_version") != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported benchmark schema version: {record.get('schema_version')}")
+    if record.get("kind") not in KIND_FIELDS:
+        raise ValueError(f"Unknown benchmark kind: {record.get('kind')}")
+    expected = set(COMMON_FIELDS) | set(KIND_FIELDS[record["kind"]])
+    missing, extra = expected - set(record), set(record) - expected
+    if missing or extra:
+        raise ValueError(f"Benchmark record does not match schema v{SCHEMA_VERSION}: "
+                         f"missing={sorted(missing)} extra={sorted(extra)}")
+
+def append_records(records, kind, output_dir=BENCHMARK_DIR):
+    """Append records to <output_dir>/<kind>.jsonl (one JSON object per line)."""
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{kind}.jsonl")
+    with open(path, "a") as f:
+        for record in records:
+            validate_record(record)
+            f.write(json.dumps(record) + "\n")
+    return path
+
+def load_records(kind, output_dir=BENCHMARK_DIR):
+    """Every stored record of a kind as a flat DataFrame (nested dicts become dotted columns)."""
+    with open(os.path.join(output_dir, f"{kind}.jsonl")) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    for record in records:
+        validate_record(record)
+    return pd.json_normalize(records)
+
+def comparison_table(df, value, columns, index=("model",)):
+    """Latest value per (index, columns) cell, e.g. rows/sec per model and subsample size."""
+    latest = df.sort_values("timestamp").groupby(list(index) + list(columns)).tail(1)
+    return latest.pivot_table(index=list(index), columns=list(columns), values=value, aggfunc="last")
+
+# ---------------- LEGACY METRICS ----------------
+
+def normalize_metrics(metrics):
+    """Map the metrics.json layouts in the repo onto common field names.
+
+    The training scripts write macro_f1/weighted_f1/training_time with a
+    0-indexed classification report; the older evaluation scripts write
+    macro_avg_f1/f1_weighted/training_time_seconds with severities 1-4, and
+    src/train_model.py keeps a "classification_report" keyed by severity.
+    """
+    if "class_performance" in metrics:
+        class_4 = metrics["class_performance"].get("4", {})
+        return {
+            "macro_f1": metrics.get("macro_avg_f1"),
+            "weighted_f1": metrics.get("f1_weighted"),
+            "accuracy": metrics.get("accuracy"),
+            "class_4_recall": class_4.get("recall"),
+            "training_time_s": metrics.get("training_time_seconds"),
+        }
+    if "classification_report" in metrics:
+        report = metrics["classification_report"]
+        class_4_recall = report.get("4", {}).get("recall")
+    else:
+        report = metrics.get("report", {})
+        class_4_recall = metrics.get("class_4_recall")
+    return {
+        "macro_f1": metrics.get("macro_f1"),
+        "weighted_f1": metrics.get("weighted_f1"),
+        "accuracy": report.get("accuracy"),
+        "class_4_recall": class_4_recall,
+        "training_time_s": metrics.get("training_time", metrics.get("training_time_seconds")),
+    }
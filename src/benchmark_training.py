@@ -0,0 +1,140 @@
+import os
+import time
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import joblib
+import numpy as np
+import scipy.sparse as sp
+
+from src.binned_dataset import load_training_store, stratified_subsample
+from src.cross_validation import registered_models, build_model
+from src.benchmark_report import (
+    BENCHMARK_DIR, make_record, append_records, load_records, comparison_table, peak_rss_mb
+)
+
+# ---------------- CONFIG ----------------
+SIZES = [100_000, 1_000_000, None]   # None = full training store
+DATASETS = ["synthetic", "real"]
+N_THREADS = os.cpu_count() or 1
+CACHE_DIR = "data/training_ready/benchmark/"
+RANDOM_STATE = 42
+
+# Synthetic data mimics the training store: scaled numerics, one-hot blocks, Severity-like imbalance.
+SYNTHETIC_NUMERIC = 17
+SYNTHETIC_CLASS_PRIORS = [0.01, 0.80, 0.17, 0.02]
+
+# ---------------- DATA ----------------
+
+def synthetic_store(n_rows, n_features, random_state=RANDOM_STATE):
+    """Sparse matrix with the same width as the real store and a learnable 4-class target."""
+    rng = np.random.default_rng(random_state)
+    numeric = rng.normal(size=(n_rows, SYNTHETIC_NUMERIC)).astype(np.float32)
+
+    # Split the remaining columns into three categorical one-hot blocks.
+    n_onehot = max(n_features - SYNTHETIC_NUMERIC, 3)
+    sizes = np.array_split(np.arange(n_onehot), 3)
+    cols = np.column_stack([rng.choice(block, n_rows) for block in sizes])
+    onehot = sp.csr_matrix(
+        (np.ones(cols.size, dtype=np.float32), cols.ravel(), np.arange(0, cols.size + 1, 3)),
+        shape=(n_rows, n_onehot),
+    )
+
+    score = numeric[:, :3] @ np.array([1.0, -0.5, 0.3], dtype=np.float32)
+    score += rng.normal(scale=0.7, size=n_rows) + 0.5 * (cols[:, 0] % 2)
+    cut_points = np.quantile(score, np.cumsum(SYNTHETIC_CLASS_PRIORS)[:-1])
+    y = np.digitize(score, cut_points)
+    return sp.hstack([sp.csr_matrix(numeric), onehot], format="csr"), y
+
+def prepare_datasets(datasets=DATASETS, sizes=SIZES, cache_dir=CACHE_DIR):
+    """Write every (dataset, size) sample once so each benchmark process only loads its own."""
+    os.makedirs(cache_dir, exist_ok=True)
+    X_real, y_real = load_training_store()
+    full = X_real.shape[0]
+    row_counts = sorted({min(size or full, full) for size in sizes})
+
+    paths = []
+    for dataset in datasets:
+        for n_rows in row_counts:
+            path = os.path.join(cache_dir, f"{dataset}_{n_rows}.pkl")
+            if not os.path.exists(path):
+                if dataset == "real":
+                    idx = stratified_subsample(np.arange(full), y_real, n_rows, random_state=RANDOM_STATE)
+                    data = (X_real[np.sort(idx)], y_real[np.sort(idx)])
+                else:
+                    data = synthetic_store(n_rows, X_real.shape[1])
+                joblib.dump(data, path)
+            paths.append((dataset, n_rows, path))
+    return paths
+
+# ---------------- BENCHMARK ----------------
+
+def benchmark_one(name, config, dataset, data_path, n_threads, run_id):
+    """Fit one model on one sample; runs in a fresh process so peak RSS belongs to this fit."""
+    X, y = joblib.load(data_path)
+    baseline_rss = peak_rss_mb()
+    model, fit_kwargs = build_model(config, y, n_threads)
+
+    start = time.perf_counter()
+    model.fit(X, y, **fit_kwargs)
+    wall_time = time.perf_counter() - start
+    peak_rss = peak_rss_mb()
+
+    # Same serialisation as save_all, so the size is what lands on disk.
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.pkl")
+        joblib.dump(model, path)
+        model_size = os.path.getsize(path) / 1024 ** 2
+
+    return make_record(
+        "training", name, config["class"].__name__, n_threads, run_id,
+        dataset=dataset, n_rows=int(X.shape[0]), n_features=int(X.shape[1]),
+        wall_time_s=wall_time, rows_per_s=X.shape[0] / wall_time,
+        baseline_rss_mb=baseline_rss, peak_rss_mb=peak_rss, model_size_mb=model_size,
+        params={k: v for k, v in config["params"].items() if isinstance(v, (int, float, str, bool))},
+    )
+
+def run_benchmarks(models=None, datasets=DATASETS, sizes=SIZES, n_threads=N_THREADS):
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+    samples = prepare_datasets(datasets, sizes)
+    # "spawn" so no child inherits the parent's memory and every peak RSS starts clean.
+    context = multiprocessing.get_context("spawn")
+
+    records = []
+    for name, config, _ in registered_models():
+        if models and name not in models:
+            continue
+        for dataset, n_rows, path in samples:
+            print(f"Benchmarking {name} on {dataset} ({n_rows} rows, {n_threads} threads)...")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                record = pool.submit(benchmark_one, name, config, dataset, path, n_threads, run_id).result()
+            print(f"  {record['wall_time_s']:.1f}s | {record['rows_per_s']:.0f} rows/s | "
+                  f"peak RSS {record['peak_rss_mb']:.0f} MB | model {record['model_size_mb']:.1f} MB")
+            records.append(record)
+            # Append as we go so a crash late in the suite keeps the earlier results.
+            append_records([record], "training")
+    return run_id, records
+
+# ---------------- MAIN ----------------
+
+def main(models=None, datasets=DATASETS, sizes=SIZES, n_threads=N_THREADS):
+    run_benchmarks(models, datasets, sizes, n_threads)
+
+    df = load_records("training")
+    table = comparison_table(df, "rows_per_s", columns=("dataset", "n_rows"))
+    table.to_csv(os.path.join(BENCHMARK_DIR, "training_comparison.csv"))
+    print("\n" + "="*30)
+    print("ROWS / SEC (latest run per cell)")
+    print("="*30)
+    print(table.round(0))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Training throughput benchmark")
+    parser.add_argument("--models", nargs="+", help="model names to run (default: all)")
+    parser.add_argument("--datasets", nargs="+", default=DATASETS, choices=DATASETS)
+    parser.add_argument("--sizes", nargs="+", type=int, help="row counts, 0 = full store (default: 100k, 1M and full)")
+    parser.add_argument("--threads", type=int, default=N_THREADS)
+    args = parser.parse_args()
+    sizes = [size or None for size in args.sizes] if args.sizes else SIZES
+    main(args.models, args.datasets, sizes, args.threads)
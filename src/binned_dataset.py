@@ -0,0 +1,137 @@
+import os
+import json
+import hashlib
+import joblib
+import numpy as np
+import lightgbm as lgb
+from sklearn.model_selection import train_test_split
+from sklearn.utils.class_weight import compute_class_weight
+
+from src.experiment_cache import data_fingerprint
+from src.registry import _read_json
+
+# ---------------- CONFIG ----------------
+DATA_DIR = "data/training_ready/"
+BINNED_PATH = "data/training_ready/binned/train_data.bin"
+MATRIX_PATH = "data/training_ready/binned/train_matrix.pkl"
+SOURCE_PATH = os.path.join(DATA_DIR, "train_data.pkl")   # Store the cached files are built from
+# Binning parameters are frozen into the binary file; every loader must pass the same ones.
+DATASET_PARAMS = {"max_bin": 255, "verbose": -1}
+
+# Per-process cache so a worker only reads the binary file once.
+_LOADED = {}
+
+def load_training_store(data_dir=DATA_DIR):
+    """Load the sparse training matrix with 0-indexed targets [0, 1, 2, 3]."""
+    X_train, y_train = joblib.load(os.path.join(data_dir, "train_data.pkl"))
+    y_train = np.asarray(y_train)
+    if y_train.min() == 1:
+        y_train = y_train - 1
+    return X_train, y_train
+
+def balanced_sample_weights(y):
+    classes = np.unique(y)
+    weights = compute_class_weight("balanced", classes=classes, y=y)
+    return weights[np.searchsorted(classes, y)]
+
+def weights_signature(weight):
+    """sha256 of the per-row weights (None when unweighted)."""
+    if weight is None:
+        return None
+    return hashlib.sha256(np.ascontiguousarray(weight, dtype=np.float64).tobytes()).hexdigest()
+
+def _cache_key(X, source, **settings):
+    """What a cached file was built from: the source store's sha256 (if any), the shape and the settings."""
+    return {"source_sha256": data_fingerprint(source) if source else None,
+            "shape": [int(n) for n in X.shape], **settings}
+
+def _is_current(path, key):
+    meta = _read_json(path + ".json")
+    return bool(meta) and all(meta.get(k) == v for k, v in key.items()) and os.path.exists(path)
+
+def _write_key(path, key):
+    with open(path + ".json", "w") as f:
+        json.dump(key, f, indent=4)
+
+def build_binned_dataset(X, y, weight=None, path=BINNED_PATH, rebuild=False, source=SOURCE_PATH):
+    """Bin the training store once and save LightGBM's binary Dataset to disk.
+
+    Later runs (search trials, CV folds, learning curves) load the binary
+    file and take row subsets instead of re-binning the sparse matrix.
+    The file is rebuilt when the source store, the binning parameters or
+    the weights differ from the ones recorded next to it. Pass source=None
+    for matrices that do not come from a file.
+
+    Returns:
+        str: path to the binary file
+    """
+    key = _cache_key(X, source, dataset_params=DATASET_PARAMS, weights_sha256=weights_signature(weight))
+    if not rebuild and _is_current(path, key):
+        print(f"Using cached binned dataset: {path}")
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    print(f"Binning {X.shape[0]} rows x {X.shape[1]} features...")
+    dataset = lgb.Dataset(X, label=y, weight=weight, params=DATASET_PARAMS, free_raw_data=True)
+    dataset.construct().save_binary(path)
+    _write_key(path, key)
+    _LOADED.pop(path, None)
+    return path
+
+def load_binned_dataset(path=BINNED_PATH):
+    """Load (and memoize per process) the binned Dataset saved by build_binned_dataset."""
+    if path not in _LOADED:
+        _LOADED[path] = lgb.Dataset(path, params=DATASET_PARAMS).construct()
+    return _LOADED[path]
+
+def share_matrix(X, path=MATRIX_PATH, rebuild=False, source=SOURCE_PATH):
+    """Dump the sparse matrix once so worker processes can memory-map it; redone when the source changes."""
+    key = _cache_key(X, source)
+    if rebuild or not _is_current(path, key):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        joblib.dump(X, path)
+        _write_key(path, key)
+        _LOADED.pop(path, None)
+    return path
+
+def load_matrix(path=MATRIX_PATH):
+    """Memory-mapped training matrix (memoized per process); slicing reads only the rows used."""
+    if path not in _LOADED:
+        _LOADED[path] = joblib.load(path, mmap_mode="r")
+    return _LOADED[path]
+
+def subset(dataset, indices):
+    """Row subset that reuses the parent's bin mappers (no re-binning)."""
+    return dataset.subset(np.sort(np.asarray(indices)), params=DATASET_PARAMS)
+
+def stratified_subsample(indices, y, n_rows, random_state=42):
+    """Stratified sample of n_rows from indices (all of them if n_rows >= len)."""
+    indices = np.asarray(indices)
+    if n_rows >= len(indices):
+        return indices
+    sample, _ = train_test_split(
+        indices, train_size=n_rows, stratify=y[indices], random_state=random_state
+    )
+    return sample
+
+def lgb_train_params(params, num_threads=None):
+    """Translate LGBMClassifier keyword params into lgb.train params and round count.
+
+    Class weights are not translated: the binned dataset already carries
+    balanced per-row weights.
+    """
+    params = dict(params)
+    rounds = params.pop("n_estimators", 100)
+    params.pop("class_weight", None)
+    params.pop("importance_type", None)
+    if "random_state" in params:
+        params["seed"] = params.pop("random_state")
+    n_jobs = params.pop("n_jobs", -1)
+    params["num_threads"] = num_threads or (0 if n_jobs == -1 else n_jobs)
+    params.setdefault("verbose", -1)
+    return params, rounds
+
+def train_on_subset(indices, params, binned_path=BINNED_PATH, num_threads=None):
+    """Train LightGBM (LGBMClassifier params) on a row subset of the binned dataset."""
+    train_params, rounds = lgb_train_params(params, num_threads)
+    train_set = subset(load_binned_dataset(binned_path), indices)
+    return lgb.train(train_params, train_set, num_boost_round=rounds)
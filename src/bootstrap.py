@@ -0,0 +1,102 @@
+import itertools
+import numpy as np
+import pandas as pd
+
+from src.evaluation import N_CLASSES, metrics_from_confusion
+
+# ---------------- CONFIG ----------------
+N_BOOTSTRAP = 1000
+CONFIDENCE = 0.95
+RANDOM_STATE = 42
+SCALAR_METRICS = ["macro_f1", "weighted_f1", "accuracy", "class_4_recall"]
+PER_CLASS_METRICS = ["precision", "recall", "f1"]
+
+# Resampling rows with replacement only changes how many rows land in each
+# outcome cell, so a bootstrap replicate is a multinomial draw over the cell
+# counts. That replaces N x n_boot row indices with n_cells x n_boot counts.
+
+def _resample_counts(counts, n_boot, rng):
+    counts = np.asarray(counts, dtype=np.int64).ravel()
+    total = counts.sum()
+    return rng.multinomial(total, counts / total, size=n_boot)
+
+def bootstrap_confusion(cm, n_boot=N_BOOTSTRAP, random_state=RANDOM_STATE):
+    """(n_boot, n, n) replicate confusion matrices of a test set summarised by cm."""
+    cm = np.asarray(cm)
+    rng = np.random.default_rng(random_state)
+    return _resample_counts(cm, n_boot, rng).reshape(n_boot, *cm.shape)
+
+def _interval(estimate, replicates, confidence):
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(replicates, [alpha, 1 - alpha], axis=0)
+    return {"estimate": estimate, "low": low, "high": high}
+
+def _to_json(interval):
+    return {key: np.asarray(value).tolist() for key, value in interval.items()}
+
+def confidence_intervals(cm, n_boot=N_BOOTSTRAP, confidence=CONFIDENCE, random_state=RANDOM_STATE):
+    """Percentile bootstrap CIs for every metric derived from the confusion matrix.
+
+    Returns:
+        dict ready for metrics.json: scalar metrics map to
+        {estimate, low, high}; per_class maps class index -> metric -> same.
+    """
+    point = metrics_from_confusion(cm)
+    reps = metrics_from_confusion(bootstrap_confusion(cm, n_boot, random_state))
+    result = {"n_boot": n_boot, "confidence": confidence}
+    for name in SCALAR_METRICS:
+        result[name] = _to_json(_interval(point[name], reps[name], confidence))
+    result["per_class"] = {
+        str(c): {name: _to_json(_interval(point[name][c], reps[name][:, c], confidence))
+                 for name in PER_CLASS_METRICS}
+        for c in range(len(point["support"]))
+    }
+    return result
+
+# ---------------- PAIRED ----------------
+
+def joint_counts(y_true, pred_a, pred_b, n_classes=N_CLASSES):
+    """(n, n, n) counts of (true, prediction of A, prediction of B) over the same rows."""
+    codes = (np.asarray(y_true, dtype=np.int64) * n_classes + np.asarray(pred_a, dtype=np.int64)) \
+        * n_classes + np.asarray(pred_b, dtype=np.int64)
+    return np.bincount(codes, minlength=n_classes ** 3).reshape(n_classes, n_classes, n_classes)
+
+def paired_bootstrap(y_true, pred_a, pred_b, n_boot=N_BOOTSTRAP, confidence=CONFIDENCE,
+                     random_state=RANDOM_STATE):
+    """CI of metric(A) - metric(B) when both models scored the same rows.
+
+    Each replicate resamples rows once for both models (via the joint cell
+    counts), so row-level difficulty cancels out and the interval is much
+    tighter than comparing two independent CIs.
+
+    Returns:
+        {metric: {estimate, low, high, p_value}}; p_value is the two-sided
+        bootstrap probability of a difference of the opposite sign.
+    """
+    joint = joint_counts(y_true, pred_a, pred_b)
+    n = joint.shape[0]
+    rng = np.random.default_rng(random_state)
+    reps = _resample_counts(joint, n_boot, rng).reshape(n_boot, n, n, n)
+
+    point_a, point_b = metrics_from_confusion(joint.sum(axis=2)), metrics_from_confusion(joint.sum(axis=1))
+    reps_a, reps_b = metrics_from_confusion(reps.sum(axis=3)), metrics_from_confusion(reps.sum(axis=2))
+    result = {}
+    for name in SCALAR_METRICS:
+        diff = reps_a[name] - reps_b[name]
+        interval = _interval(point_a[name] - point_b[name], diff, confidence)
+        interval["p_value"] = min(1.0, 2 * min((diff <= 0).mean(), (diff >= 0).mean()))
+        result[name] = {key: float(value) for key, value in interval.items()}
+    return result
+
+def paired_comparisons(y_true, predictions, n_boot=N_BOOTSTRAP, confidence=CONFIDENCE):
+    """Paired bootstrap of every pair of models; predictions maps name -> labels on the same rows.
+
+    Returns:
+        DataFrame with one row per (model_a, model_b, metric).
+    """
+    rows = []
+    for a, b in itertools.combinations(predictions, 2):
+        result = paired_bootstrap(y_true, predictions[a], predictions[b], n_boot, confidence)
+        for metric, values in result.items():
+            rows.append({"model_a": a, "model_b": b, "metric": metric, **values})
+    return pd.DataFrame(rows)
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+from src.binned_dataset import stratified_subsample
+from src.distillation import load_served, predict_proba_in_chunks
+from src.registry import register_model
+from src.evaluation import confusion_matrix, metrics_from_confusion, evaluate_predictions
+from src.bootstrap import confidence_intervals
+from src.benchmark_inference import time_batches, make_batches
+
+# ---------------- CONFIG ----------------
+DATA_DIR = "data/training_ready/"
+FIRST_STAGE_DIR = "model/logistic_regression"     # Fast model that answers confident requests
+SECOND_STAGE_DIR = "model/fine/lightgbm_tuned"    # Full GBM the rest escalate to
+CASCADE_DIR = "model/cascade/"
+CONFIG_FILE = "cascade.json"
+OUTPUT_DIR = "evaluations/cascade/"
+THRESHOLDS = np.round(np.arange(0.25, 1.0, 0.01), 2)   # Max probability of 4 classes is >= 0.25
+CLASS_4_RECALL_TOLERANCE = 0.01  # Allowed drop vs the second stage when no absolute floor is given
+SELECTION_ROWS = 200_000         # Stratified test rows used to tune; the rest of the test set reports
+BATCH_SIZES = [1, 1_000]         # Latency benchmark; 1 row is the Streamlit request
+RANDOM_STATE = 42
+
+# ---------------- CASCADE ----------------
+
+class Cascade:
+    """First stage answers when its max probability clears the threshold; other rows escalate.
+
+    Exposes predict_proba / predict / classes_ like the single model and
+    counts the rows each stage has served since it was loaded.
+    """
+
+    def __init__(self, first, second, threshold, config=None):
+        self.first = first
+        self.second = second
+        self.threshold = threshold
+        self.config = config or {}
+        self.classes_ = np.asarray(second.classes_)
+        self.served = {"first": 0, "second": 0}
+
+    def predict_proba(self, X):
+        proba = np.asarray(self.first.predict_proba(X), dtype=np.float64)
+        escalate = np.flatnonzero(proba.max(axis=1) < self.threshold)
+        self.served["first"] += proba.shape[0] - len(escalate)
+        self.served["second"] += len(escalate)
+        if len(escalate) == proba.shape[0]:   # Single escalated request: no scatter needed
+            return self.second.predict_proba(X)
+        if len(escalate):
+            proba[escalate] = self.second.predict_proba(X[escalate])
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+def has_cascade(cascade_dir=CASCADE_DIR):
+    return os.path.exists(os.path.join(cascade_dir, CONFIG_FILE))
+
+def load_cascade(cascade_dir=CASCADE_DIR):
+    """Cascade from the config written by main()."""
+    with open(os.path.join(cascade_dir, CONFIG_FILE)) as f:
+        config = json.load(f)
+    return Cascade(load_served(config["first_stage"]), load_served(config["second_stage"]),
+                   config["threshold"], config)
+
+# ---------------- TUNING ----------------
+
+def cascade_predictions(first_proba, second_proba, threshold):
+    """(labels, answered by the first stage) for precomputed stage probabilities."""
+    confident = first_proba.max(axis=1) >= threshold
+    return np.where(confident, first_proba.argmax(axis=1), second_proba.argmax(axis=1)), confident
+
+def threshold_sweep(first_proba, second_proba, y, thresholds=THRESHOLDS):
+    """Share of rows the first stage answers and the cascade's metrics at every threshold."""
+    rows = []
+    for threshold in thresholds:
+        preds, confident = cascade_predictions(first_proba, second_proba, threshold)
+        m = metrics_from_confusion(confusion_matrix(y, preds))
+        rows.append({"threshold": float(threshold), "first_stage_share": float(confident.mean()),
+                     "macro_f1": float(m["macro_f1"]), "class_4_recall": float(m["class_4_recall"])})
+    return pd.DataFrame(rows)
+
+def choose_threshold(sweep, min_class_4_recall):
+    """Threshold sending the most traffic to the first stage while keeping class-4 recall >= the floor.
+
+    Returns:
+        the sweep row, or None if no threshold meets the floor
+    """
+    ok = sweep[sweep["class_4_recall"] >= min_class_4_recall]
+    if ok.empty:
+        return None
+    return ok.sort_values(["first_stage_share", "threshold"], ascending=[False, True]).iloc[0]
+
+# ---------------- LATENCY ----------------
+
+def latency_report(cascade, X, batch_sizes=BATCH_SIZES):
+    """Mean and p50/p99 single-thread latency of each stage alone and of the cascade, per batch size."""
+    rng = np.random.default_rng(RANDOM_STATE)
+    rows = []
+    for batch_size in batch_sizes:
+        batches = [X[w] for w in make_batches(X.shape[0], batch_size, rng)]
+        with threadpool_limits(limits=1):
+            timings = {"first": time_batches(cascade.first.predict_proba, batches),
+                       "second": time_batches(cascade.second.predict_proba, batches),
+                       "cascade": time_batches(cascade.predict_proba, batches)}
+        row = {"batch_size": batches[0].shape[0]}
+        for name, ms in timings.items():
+            row.update({f"{name}_mean_ms": float(ms.mean()), f"{name}_p50_ms": float(np.percentile(ms, 50)),
+                        f"{name}_p99_ms": float(np.percentile(ms, 99))})
+        rows.append(row)
+    latency = pd.DataFrame(rows)
+    latency["mean_speedup"] = latency["second_mean_ms"] / latency["cascade_mean_ms"]
+    return latency
+
+# ---------------- MAIN ----------------
+
+def main(first_stage=FIRST_STAGE_DIR, second_stage=SECOND_STAGE_DIR, min_class_4_recall=None,
+         tolerance=CLASS_4_RECALL_TOLERANCE):
+    first, second = load_served(first_stage), load_served(second_stage)
+
+    # Tune on a stratified slice of the test set; report on the rest.
+    X_test, y_test = joblib.load(os.path.join(DATA_DIR, "test_data.pkl"))
+    y_test = np.asarray(y_test) - 1
+    sel_idx = np.sort(stratified_subsample(np.arange(len(y_test)), y_test, min(SELECTION_ROWS, len(y_test) // 2),
+                                           random_state=RANDOM_STATE))
+    report_mask = np.ones(len(y_test), dtype=bool)
+    report_mask[sel_idx] = False
+
+    print(f"Scoring {len(y_test)} test rows with both stages...")
+    first_proba = predict_proba_in_chunks(first, X_test)
+    second_proba = predict_proba_in_chunks(second, X_test)
+
+    if min_class_4_recall is None:
+        second_sel = metrics_from_confusion(confusion_matrix(y_test[sel_idx], second_proba[sel_idx].argmax(axis=1)))
+        min_class_4_recall = float(second_sel["class_4_recall"]) - tolerance
+    sweep = threshold_sweep(first_proba[sel_idx], second_proba[sel_idx], y_test[sel_idx])
+    best = choose_threshold(sweep, min_class_4_recall)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    sweep.to_csv(os.path.join(OUTPUT_DIR, "threshold_sweep.csv"), index=False)
+    if best is None:
+        raise ValueError(f"No threshold keeps class-4 recall >= {min_class_4_recall:.4f}; "
+                         f"every request would escalate to {second_stage}")
+    threshold = float(best["threshold"])
+    print(f"Threshold {threshold:.2f}: first stage answers {best['first_stage_share']:.1%} of the tuning rows "
+          f"(C4 recall floor {min_class_4_recall:.4f})")
+
+    # Report rows: cascade against each stage alone
+    y_rep = y_test[report_mask]
+    start = time.time()
+    preds, confident = cascade_predictions(first_proba[report_mask], second_proba[report_mask], threshold)
+    metrics = evaluate_predictions(y_rep, preds, time.time() - start)
+    metrics["bootstrap"] = confidence_intervals(metrics["confusion_matrix"])
+    stages = {name: metrics_from_confusion(confusion_matrix(y_rep, proba[report_mask].argmax(axis=1)))
+              for name, proba in (("first_stage", first_proba), ("second_stage", second_proba))}
+
+    cascade = Cascade(first, second, threshold)
+    latency = latency_report(cascade, X_test[report_mask])
+    single_row = latency.iloc[0]
+    config = {
+        "first_stage": first_stage,
+        "second_stage": second_stage,
+        "threshold": threshold,
+        "min_class_4_recall": min_class_4_recall,
+        "traffic": {"first_stage": float(confident.mean()), "second_stage": float(1 - confident.mean())},
+        "single_row_mean_ms": {"first_stage": single_row["first_mean_ms"],
+                               "second_stage": single_row["second_mean_ms"],
+                               "cascade": single_row["cascade_mean_ms"]},
+        "n_tuning_rows": len(sel_idx),
+        "n_report_rows": int(report_mask.sum()),
+        "tuned_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    metrics["cascade"] = {**config["traffic"],
+                          **{f"{name}_macro_f1": float(m["macro_f1"]) for name, m in stages.items()},
+                          **{f"{name}_class_4_recall": float(m["class_4_recall"]) for name, m in stages.items()}}
+    os.makedirs(CASCADE_DIR, exist_ok=True)
+    with open(os.path.join(CASCADE_DIR, CONFIG_FILE), "w") as f:
+        json.dump(config, f, indent=4)
+    # metrics.json makes the cascade show up in the registry next to the single models
+    with open(os.path.join(CASCADE_DIR, "metrics.json"), "w") as f:
+        json.dump(metrics, f, indent=4)
+    register_model(CASCADE_DIR)
+    latency.to_csv(os.path.join(OUTPUT_DIR, "latency.csv"), index=False)
+
+    print("\n" + latency.round(3).to_string(index=False))
+    print("\n" + "="*30)
+    print("CASCADE SUMMARY")
+    print("="*30)
+    print(f"Traffic:  first stage {config['traffic']['first_stage']:.1%} | "
+          f"second stage {config['traffic']['second_stage']:.1%}")
+    print(f"Cascade:  Macro F1 {metrics['macro_f1']:.4f} | C4 Recall {metrics['class_4_recall']:.4f}")
+    for name, m in stages.items():
+        print(f"{name}: Macro F1 {m['macro_f1']:.4f} | C4 Recall {m['class_4_recall']:.4f}")
+    print(f"Single-row mean latency: {single_row['cascade_mean_ms']:.3f} ms vs "
+          f"{single_row['second_mean_ms']:.3f} ms for {second_stage} alone")
+    print(f"\nCascade saved to {CASCADE_DIR}; sweep and latency in {OUTPUT_DIR}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Confidence-gated cascade: fast model first, GBM on escalation")
+    parser.add_argument("--first-stage", default=FIRST_STAGE_DIR)
+    parser.add_argument("--second-stage", default=SECOND_STAGE_DIR)
+    parser.add_argument("--min-class-4-recall", type=float,
+                        help="absolute floor (default: second stage's recall minus --tolerance)")
+    parser.add_argument("--tolerance", type=float, default=CLASS_4_RECALL_TOLERANCE)
+    args = parser.parse_args()
+    main(args.first_stage, args.second_stage, args.min_class_4_recall, args.tolerance)
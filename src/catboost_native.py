@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from catboost import CatBoostClassifier, Pool
+from sklearn.model_selection import train_test_split
+
+from preprocessing.transform import (
+    DATA_PATH, NUMERIC_FEATURES, BOOL_FEATURES, CATEGORICAL_FEATURES, load_split, load_test_frame
+)
+from src.train_final import MODELS_CONFIG, RANDOM_STATE, PATIENCE, get_weights
+from src.early_stopping import VALIDATION_SIZE, LOG_EVERY
+from src.experiment_cache import data_fingerprint
+from src.registry import register_model, _read_json
+from src.evaluation import predict_in_chunks, evaluate_predictions
+from src.bootstrap import confidence_intervals
+
+# ---------------- CONFIG ----------------
+POOL_DIR = "data/training_ready/catboost_pools/"
+OUTPUT_DIR = "models/catboost_native/"   # Outside the one-hot artifact dirs the benchmark tools scan
+NAME = "catboost_tuned_native"
+BASELINE_METRICS = "models/final_comparison/catboost_tuned/metrics.json"
+FEATURES = NUMERIC_FEATURES + BOOL_FEATURES + CATEGORICAL_FEATURES
+MISSING = "missing"          # CatBoost rejects NaN categories
+# Frozen into the saved pools; changing it rebuilds them.
+QUANTIZATION = {"border_count": 254}
+
+# ---------------- FRAMES ----------------
+
+def native_frame(X):
+    """Raw columns CatBoost trains on: unscaled numerics (NaN kept), booleans, categories as-is."""
+    X = X[FEATURES].copy()
+    for col in CATEGORICAL_FEATURES:
+        X[col] = X[col].astype("category")
+        if X[col].isna().any():
+            X[col] = X[col].cat.add_categories([MISSING]).fillna(MISSING)
+    return X
+
+# ---------------- POOLS ----------------
+
+def pool_paths(pool_dir=POOL_DIR):
+    return {
+        "fit": os.path.join(pool_dir, "fit.qpool"),
+        "val": os.path.join(pool_dir, "val.qpool"),
+        "borders": os.path.join(pool_dir, "borders.tsv"),
+        "meta": os.path.join(pool_dir, "pools.json"),
+    }
+
+def build_pools(pool_dir=POOL_DIR, quantization=QUANTIZATION, rebuild=False):
+    """Quantize the training rows once into fit/validation Pools saved on disk.
+
+    The validation pool reuses the fit pool's borders, so both are in the
+    same bins. They are rebuilt only when the processed Parquet or the
+    quantization settings change.
+
+    Returns:
+        dict: the pools' metadata (paths, class weights, build time)
+    """
+    paths = pool_paths(pool_dir)
+    settings = {
+        "source_sha256": data_fingerprint(DATA_PATH),
+        "quantization": quantization,
+        "validation_size": VALIDATION_SIZE,
+        "random_state": RANDOM_STATE,
+        "features": FEATURES,
+        "cat_features": CATEGORICAL_FEATURES,
+    }
+    meta = _read_json(paths["meta"])
+    if (not rebuild and meta and all(meta[k] == v for k, v in settings.items())
+            and os.path.exists(paths["fit"]) and os.path.exists(paths["val"])):
+        print(f"Using cached quantized pools: {pool_dir}")
+        return meta
+
+    start = time.time()
+    X_train, _, y_train, _ = load_split()
+    X = native_frame(X_train)
+    y = np.asarray(y_train) - 1
+    del X_train
+    fit_idx, val_idx = train_test_split(
+        np.arange(len(y)), test_size=VALIDATION_SIZE, stratify=y, random_state=RANDOM_STATE
+    )
+
+    os.makedirs(pool_dir, exist_ok=True)
+    print(f"Quantizing {len(fit_idx)} fit + {len(val_idx)} validation rows...")
+    fit_pool = Pool(X.iloc[fit_idx], y[fit_idx], cat_features=CATEGORICAL_FEATURES)
+    fit_pool.quantize(**quantization)
+    fit_pool.save_quantization_borders(paths["borders"])
+    fit_pool.save(paths["fit"])
+    del fit_pool
+
+    val_pool = Pool(X.iloc[val_idx], y[val_idx], cat_features=CATEGORICAL_FEATURES)
+    val_pool.quantize(input_borders=paths["borders"])
+    val_pool.save(paths["val"])
+
+    # Balanced weights over the whole training split, as train_final computes them
+    meta = {**settings, **paths, "class_weights": get_weights(y).tolist(),
+            "n_fit": len(fit_idx), "n_val": len(val_idx), "build_time_s": time.time() - start}
+    with open(paths["meta"], "w") as f:
+        json.dump(meta, f, indent=4)
+    return meta
+
+def load_pools(meta):
+    """(fit_pool, val_pool) read back from disk; no re-quantization."""
+    return Pool("quantized://" + meta["fit"]), Pool("quantized://" + meta["val"])
+
+# ---------------- TRAIN ----------------
+
+def fit_native(params, meta, patience=PATIENCE, log_every=LOG_EVERY):
+    """CatBoost on the cached pools with early stopping on the validation pool.
+
+    Returns:
+        (model, best_iteration)
+    """
+    fit_pool, val_pool = load_pools(meta)
+    params = {**params, "class_weights": meta["class_weights"], "verbose": log_every,
+              "eval_metric": "MultiClass", "custom_metric": ["TotalF1:average=Macro"]}
+    model = CatBoostClassifier(**params)
+    model.fit(fit_pool, eval_set=val_pool, early_stopping_rounds=patience,
+              use_best_model=True)   # Shrinks the model to the best iteration
+    return model, model.get_best_iteration() + 1
+
+def save_native(model, metrics, meta, output_dir=OUTPUT_DIR, name=NAME):
+    path = os.path.join(output_dir, name)
+    os.makedirs(path, exist_ok=True)
+    joblib.dump(model, os.path.join(path, "model.pkl"))
+    model.save_model(os.path.join(path, "model.cbm"))
+    with open(os.path.join(path, "metrics.json"), "w") as f:
+        json.dump(metrics, f, indent=4)
+    with open(os.path.join(path, "class_weights.json"), "w") as f:
+        json.dump({i + 1: w for i, w in enumerate(meta["class_weights"])}, f, indent=4)
+    # Raw columns the model expects (it does not take the one-hot matrix)
+    with open(os.path.join(path, "features.json"), "w") as f:
+        json.dump({"features": FEATURES, "cat_features": CATEGORICAL_FEATURES, "missing": MISSING}, f, indent=4)
+    register_model(path)
+    return path
+
+# ---------------- MAIN ----------------
+
+def main(rebuild=False):
+    meta = build_pools(rebuild=rebuild)
+    params = MODELS_CONFIG["catboost_tuned"]["params"].copy()
+
+    print(f"\n>>> Starting: {NAME}")
+    start_train = time.time()
+    model, best_iteration = fit_native(params, meta)
+    train_time = time.time() - start_train
+
+    X_test, y_test = load_test_frame()
+    X_test, y_test = native_frame(X_test), np.asarray(y_test) - 1
+    preds, inference_time = predict_in_chunks(model, X_test)
+    metrics = evaluate_predictions(y_test, preds, inference_time)
+    metrics["training_time"] = train_time
+    metrics["pool_build_time"] = meta["build_time_s"]
+    metrics["bootstrap"] = confidence_intervals(metrics["confusion_matrix"])
+    metrics["early_stopping"] = {
+        "best_iteration": int(best_iteration),
+        "monitor": model.get_params()["eval_metric"],   # The metric fit_native stopped on
+        "patience": PATIENCE,
+        "validation_size": VALIDATION_SIZE,
+    }
+    path = save_native(model, metrics, meta)
+    print(f"Finished {NAME}. Macro F1: {metrics['macro_f1']:.4f} | C4 Recall: {metrics['class_4_recall']:.4f} | "
+          f"train {train_time:.1f}s (+{meta['build_time_s']:.1f}s one-off pool build) -> {path}")
+
+    baseline = _read_json(BASELINE_METRICS)
+    if baseline:
+        rows = [{"model": "catboost_tuned (one-hot)", "macro_f1": baseline["macro_f1"],
+                 "class_4_recall": baseline["class_4_recall"], "train_time": baseline["training_time"]},
+                {"model": f"{NAME} (cat_features)", "macro_f1": metrics["macro_f1"],
+                 "class_4_recall": metrics["class_4_recall"], "train_time": train_time}]
+        print("\n" + pd.DataFrame(rows).round(4).to_string(index=False))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CatBoost on native categorical columns with cached quantized pools")
+    parser.add_argument("--rebuild", action="store_true", help="re-quantize the pools even if cached")
+    args = parser.parse_args()
+    main(rebuild=args.rebuild)
@@ -0,0 +1,100 @@
+import os
+import json
+import time
+import shutil
+
+# ---------------- CONFIG ----------------
+CHECKPOINT_DIR = "models/checkpoints/"
+CHECKPOINT_ROUNDS = 100      # LightGBM / XGBoost: save every N boosting rounds
+CHECKPOINT_MINUTES = 10      # CatBoost: native snapshot every M minutes
+
+# Native formats that can be fed back as init_model / xgb_model.
+_MODEL_FILES = {
+    "LGBMClassifier": "model.txt",
+    "XGBClassifier": "model.ubj",
+}
+
+class Checkpointer:
+    """Periodic, resumable checkpoints for one boosting run.
+
+    LightGBM and XGBoost write the booster and early-stopping state from a
+    training callback every ``rounds`` rounds, inside a single fit() call
+    (see early_stopping.fit_with_early_stopping), so an uninterrupted run
+    trains exactly as it would without checkpoints. A resumed run continues
+    from the saved booster and is bit-identical to an uninterrupted run only
+    without row/column sampling. The sampling RNG is not checkpointed, so
+    with subsample / colsample_bytree < 1 -- which xgboost_tuned in
+    train_final.py and the LightGBM config in model/train.py both use --
+    the resumed rounds draw different rows and columns and the model (and
+    its metrics) can differ slightly. CatBoost's snapshot file restores the whole training
+    state, and is written every ``minutes`` minutes.
+
+    Checkpoints are only read back when resume=True; otherwise a stale
+    checkpoint is discarded at the start of the run.
+    """
+
+    def __init__(self, name, rounds=CHECKPOINT_ROUNDS, minutes=CHECKPOINT_MINUTES,
+                 resume=False, root=CHECKPOINT_DIR):
+        self.name = name
+        self.rounds = rounds
+        self.minutes = minutes
+        self.resume = resume
+        self.path = os.path.join(root, name)
+        if not resume:
+            self.clear()
+        os.makedirs(self.path, exist_ok=True)
+
+    @property
+    def state_path(self):
+        return os.path.join(self.path, "state.json")
+
+    def model_path(self, library):
+        return os.path.join(self.path, _MODEL_FILES[library])
+
+    def due(self, iteration):
+        """True when a checkpoint should be written after `iteration` completed rounds."""
+        return iteration % self.rounds == 0
+
+    def save(self, booster, library, iteration, patience):
+        """Atomically write the (in-training) booster and the state needed to continue after `iteration` rounds."""
+        path = self.model_path(library)
+        root, ext = os.path.splitext(path)
+        tmp = root + ".tmp" + ext   # XGBoost picks the format from the extension
+        if library == "LGBMClassifier":
+            booster.save_model(tmp, num_iteration=-1)
+        else:
+            booster.save_model(tmp)
+        os.replace(tmp, path)
+
+        state = {
+            "model": self.name,
+            "library": library,
+            "iteration": iteration,
+            "patience": patience.to_dict(),
+            "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with open(self.state_path + ".tmp", "w") as f:
+            json.dump(state, f, indent=4)
+        os.replace(self.state_path + ".tmp", self.state_path)
+        print(f"Checkpoint saved: {self.name} @ round {iteration}")
+
+    def load(self):
+        """Latest checkpoint state, or None when starting from scratch."""
+        if not self.resume or not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path) as f:
+            return json.load(f)
+
+    def catboost_fit_params(self, model):
+        """fit() arguments enabling CatBoost's native snapshot; it resumes from the file itself."""
+        # CatBoost refuses to snapshot when writing files is disabled.
+        model.set_params(allow_writing_files=True, train_dir=self.path)
+        return {
+            "save_snapshot": True,
+            "snapshot_file": os.path.abspath(os.path.join(self.path, "snapshot.cbs")),
+            "snapshot_interval": self.minutes * 60,
+        }
+
+    def clear(self):
+        """Remove this run's checkpoints (after a successful save, or a fresh start)."""
+        shutil.rmtree(self.path, ignore_errors=True)
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.model_selection import StratifiedKFold
+from sklearn.metrics import precision_recall_fscore_support, f1_score, accuracy_score
+
+from src.binned_dataset import (
+    load_training_store, balanced_sample_weights, build_binned_dataset,
+    share_matrix, load_matrix, train_on_subset
+)
+
+# ---------------- CONFIG ----------------
+N_FOLDS = 5
+RANDOM_STATE = 42
+N_WORKERS = min(N_FOLDS, 4)  # Folds trained at the same time
+THREADS_PER_WORKER = max(1, (os.cpu_count() or 1) // N_WORKERS)
+CV_FILENAME = "cv_metrics.json"  # Written next to each model's metrics.json
+SEVERITY_LABELS = [1, 2, 3, 4]
+
+# ---------------- MODELS ----------------
+
+def registered_models():
+    """(name, config, output dir) for every model the training scripts produce."""
+    from src import train_models, train_final
+    from model import train as train_tuned
+    for module in (train_models, train_final, train_tuned):
+        for name, config in module.MODELS_CONFIG.items():
+            yield name, config, os.path.join(module.MODELS_ROOT, name)
+
+def _with_threads(config, n_threads):
+    """Copy of the model params with the thread count capped for a single worker."""
+    params = dict(config["params"])
+    if config["class"].__name__ == "CatBoostClassifier":
+        params["thread_count"] = n_threads
+        params["verbose"] = 0
+    else:
+        params["n_jobs"] = n_threads
+    return params
+
+def build_model(config, y_fit, n_threads):
+    """Unfitted model plus fit() kwargs, with balanced class weights as the training scripts use.
+
+    Returns:
+        (model, fit_kwargs)
+    """
+    params = _with_threads(config, n_threads)
+    library = config["class"].__name__
+    classes = np.unique(y_fit)
+    weights = balanced_sample_weights(y_fit)
+    fit_kwargs = {}
+    if library == "XGBClassifier":
+        fit_kwargs["sample_weight"] = weights
+    elif library == "CatBoostClassifier":
+        params["class_weights"] = [weights[y_fit == c][0] for c in classes]
+    else:
+        params["class_weight"] = {c: weights[y_fit == c][0] for c in classes}
+    return config["class"](**params), fit_kwargs
+
+def _fit_predict(config, fit_idx, val_idx, y, matrix_path, binned_path, n_threads):
+    """Train on one fold and return predicted labels for the held-out rows."""
+    X = load_matrix(matrix_path)
+
+    if config["class"].__name__ == "LGBMClassifier":
+        # Row subset of the shared binned file; balanced weights are already in it.
+        params = _with_threads(config, n_threads)
+        booster = train_on_subset(fit_idx, params, binned_path, num_threads=n_threads)
+        return booster.predict(X[val_idx]).argmax(axis=1)
+
+    y_fit = y[fit_idx]
+    model, fit_kwargs = build_model(config, y_fit, n_threads)
+    model.fit(X[fit_idx], y_fit, **fit_kwargs)
+    return np.asarray(model.predict(X[val_idx])).ravel()
+
+# ---------------- METRICS ----------------
+
+def fold_metrics(y_true, y_pred):
+    """Overall and per-class scores for one fold (labels reported as severities 1-4)."""
+    labels = np.arange(len(SEVERITY_LABELS))
+    precision, recall, f1, support = precision_recall_fscore_support(
+        y_true, y_pred, labels=labels, zero_division=0
+    )
+    return {
+        "macro_f1": f1_score(y_true, y_pred, labels=labels, average="macro", zero_division=0),
+        "weighted_f1": f1_score(y_true, y_pred, labels=labels, average="weighted", zero_division=0),
+        "accuracy": accuracy_score(y_true, y_pred),
+        "class_4_recall": float(recall[3]),
+        "per_class": {
+            str(severity): {
+                "precision": float(precision[i]), "recall": float(recall[i]),
+                "f1": float(f1[i]), "support": int(support[i]),
+            }
+            for i, severity in enumerate(SEVERITY_LABELS)
+        },
+    }
+
+def _summary(values):
+    values = np.asarray(values, dtype=float)
+    return {"mean": float(values.mean()), "std": float(values.std(ddof=1)) if len(values) > 1 else 0.0,
+            "min": float(values.min()), "max": float(values.max())}
+
+def aggregate_folds(folds):
+    """Mean/std/min/max of every score across folds."""
+    summary = {key: _summary([f[key] for f in folds])
+               for key in ("macro_f1", "weighted_f1", "accuracy", "class_4_recall")}
+    summary["per_class"] = {
+        severity: {metric: _summary([f["per_class"][severity][metric] for f in folds])
+                   for metric in ("precision", "recall", "f1")}
+        for severity in folds[0]["per_class"]
+    }
+    return summary
+
+# ---------------- CROSS-VALIDATION ----------------
+
+def cross_validate(name, config, y, matrix_path, binned_path, n_folds=N_FOLDS,
+                   n_workers=N_WORKERS, threads_per_worker=THREADS_PER_WORKER):
+    """Stratified k-fold CV of one model config, folds trained in parallel.
+
+    Workers share the memory-mapped training matrix and the binned LightGBM
+    dataset on disk and only receive fold row indices.
+    """
+    folds = list(StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=RANDOM_STATE)
+                 .split(np.zeros(len(y)), y))
+    print(f"\nCross-validating {name}: {n_folds} folds on {n_workers} workers x {threads_per_worker} threads")
+    start = time.time()
+    predictions = Parallel(n_jobs=n_workers)(
+        delayed(_fit_predict)(config, fit_idx, val_idx, y, matrix_path, binned_path, threads_per_worker)
+        for fit_idx, val_idx in folds
+    )
+    results = [fold_metrics(y[val_idx], y_pred) for (_, val_idx), y_pred in zip(folds, predictions)]
+    wall_time = time.time() - start
+
+    summary = aggregate_folds(results)
+    print(f"{name} | Macro F1: {summary['macro_f1']['mean']:.4f} ± {summary['macro_f1']['std']:.4f} "
+          f"| Class 4 recall: {summary['class_4_recall']['mean']:.4f} ± {summary['class_4_recall']['std']:.4f}")
+    return {
+        "model": name,
+        "n_folds": n_folds,
+        "random_state": RANDOM_STATE,
+        "wall_time": wall_time,
+        "summary": summary,
+        "folds": results,
+    }
+
+# ---------------- MAIN ----------------
+
+def main(models=None, n_folds=N_FOLDS):
+    X_train, y_train = load_training_store()
+    # Bin and dump the training store once; every fold of every model reuses both files.
+    binned_path = build_binned_dataset(X_train, y_train, weight=balanced_sample_weights(y_train))
+    matrix_path = share_matrix(X_train)
+    del X_train
+
+    for name, config, output_dir in registered_models():
+        if models and name not in models:
+            continue
+        result = cross_validate(name, config, y_train, matrix_path, binned_path, n_folds=n_folds,
+                                n_workers=min(N_WORKERS, n_folds))
+        os.makedirs(output_dir, exist_ok=True)
+        with open(os.path.join(output_dir, CV_FILENAME), "w") as f:
+            json.dump(result, f, indent=4)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stratified k-fold CV of the registered models")
+    parser.add_argument("--models", nargs="+", help="model names to run (default: all)")
+    parser.add_argument("--folds", type=int, default=N_FOLDS)
+    args = parser.parse_args()
+    main(models=args.models, n_folds=args.folds)
@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMClassifier
+from sklearn.linear_model import LogisticRegression
+from threadpoolctl import threadpool_limits
+
+from src.binned_dataset import load_training_store, stratified_subsample
+from src.experiment_cache import data_fingerprint
+from src.native_export import export_native, has_native, load_native, feature_names_from
+from src.registry import register_model, file_hash, _read_json
+from src.evaluation import confusion_matrix, metrics_from_confusion, evaluate_predictions, iter_chunks, N_CLASSES
+from src.bootstrap import confidence_intervals
+from src.benchmark_inference import time_batches, make_batches
+
+# ---------------- CONFIG ----------------
+DATA_DIR = "data/training_ready/"
+PREPROCESSOR_PATH = "preprocessing/new/preprocessor.pkl"
+TEACHER_DIR = "model/fine/lightgbm_tuned"
+TEACHER_CACHE = "data/training_ready/distillation/teacher_proba.npy"
+STUDENT_ROOT = "models/distilled/"
+OUTPUT_DIR = "evaluations/distillation/"
+DISTILL_ROWS = 2_000_000     # Stratified training rows the students learn from
+MIN_PROB = 0.01              # Teacher probabilities below this get no soft-label row
+BATCH_SIZES = [1, 1_000]     # Latency benchmark; 1 row is the Streamlit request
+RANDOM_STATE = 42
+
+# No class weights: the teacher was trained with balanced weights, so its probabilities already carry them.
+STUDENTS = {
+    "lightgbm_student": {
+        "class": LGBMClassifier,
+        "params": {
+            "objective": "multiclass",
+            "num_class": 4,
+            "n_estimators": 100,
+            "learning_rate": 0.1,
+            "num_leaves": 31,
+            "max_depth": 8,
+            "min_child_samples": 200,
+            "colsample_bytree": 0.8,
+            "n_jobs": -1,
+            "random_state": RANDOM_STATE,
+            "verbose": -1
+        }
+    },
+    "logistic_student": {
+        "class": LogisticRegression,
+        "params": {
+            "solver": "saga",
+            "max_iter": 200,
+            "n_jobs": -1,
+            "random_state": RANDOM_STATE
+        }
+    }
+}
+
+# ---------------- TEACHER ----------------
+
+def load_served(model_dir):
+    """A model as served: its native export when there is one, model.pkl otherwise."""
+    if has_native(model_dir):
+        return load_native(model_dir)
+    return joblib.load(os.path.join(model_dir, "model.pkl"))
+
+def _served_file(model_dir):
+    meta = _read_json(os.path.join(model_dir, "model_meta.json"))
+    return os.path.join(model_dir, meta["file"] if meta else "model.pkl")
+
+def predict_proba_in_chunks(model, X):
+    proba = np.empty((X.shape[0], N_CLASSES), dtype=np.float32)
+    for rows in iter_chunks(X.shape[0]):
+        proba[rows] = model.predict_proba(X[rows])
+    return proba
+
+def teacher_probabilities(teacher, X, teacher_dir=TEACHER_DIR, data_dir=DATA_DIR, cache_path=TEACHER_CACHE):
+    """Teacher class probabilities for every training row, cached while the teacher and the store are unchanged."""
+    key = {"teacher_sha256": file_hash(_served_file(teacher_dir)),
+           "source_sha256": data_fingerprint(os.path.join(data_dir, "train_data.pkl"))}
+    meta = _read_json(cache_path + ".json")
+    if meta and all(meta.get(k) == v for k, v in key.items()) and os.path.exists(cache_path):
+        print(f"Using cached teacher probabilities: {cache_path}")
+        return np.load(cache_path)
+
+    start = time.time()
+    print(f"Scoring {X.shape[0]} training rows with the teacher...")
+    proba = predict_proba_in_chunks(teacher, X)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    np.save(cache_path, proba)
+    with open(cache_path + ".json", "w") as f:
+        json.dump({**key, "teacher": teacher_dir, "shape": list(proba.shape),
+                   "predict_time_s": time.time() - start}, f, indent=4)
+    return proba
+
+# ---------------- STUDENT ----------------
+
+def soft_label_rows(X, proba, min_prob=MIN_PROB):
+    """One weighted row per (row, class) with teacher probability >= min_prob.
+
+    Fitting a classifier on these rows with the probabilities as sample
+    weights minimises the cross-entropy to the teacher's distribution,
+    which lets estimators that only take hard labels learn soft targets.
+
+    Returns:
+        (X_soft, y_soft, weight)
+    """
+    rows, classes = np.nonzero(proba >= min_prob)   # Row-major: rows stay sorted for CSR slicing
+    return X[rows], classes, proba[rows, classes].astype(np.float64)
+
+def fit_student(config, X, proba, min_prob=MIN_PROB):
+    X_soft, y_soft, weight = soft_label_rows(X, proba, min_prob)
+    print(f"  {X.shape[0]} rows -> {X_soft.shape[0]} soft-label rows")
+    return config["class"](**config["params"]).fit(X_soft, y_soft, sample_weight=weight)
+
+# ---------------- REPORT ----------------
+
+def agreement_report(y_true, teacher_preds, student_preds):
+    """Agreement with the teacher and the per-class metric gap (student - teacher) on the same rows.
+
+    Returns:
+        (summary dict, per-class DataFrame)
+    """
+    teacher = metrics_from_confusion(confusion_matrix(y_true, teacher_preds))
+    student = metrics_from_confusion(confusion_matrix(y_true, student_preds))
+    agree = teacher_preds == student_preds
+    per_class = pd.DataFrame({"severity": np.arange(N_CLASSES) + 1})
+    per_class["agreement"] = [float(agree[teacher_preds == c].mean()) if (teacher_preds == c).any() else np.nan
+                              for c in range(N_CLASSES)]
+    for metric in ("precision", "recall", "f1"):
+        per_class[f"teacher_{metric}"] = np.asarray(teacher[metric], dtype=float)
+        per_class[f"student_{metric}"] = np.asarray(student[metric], dtype=float)
+        per_class[f"{metric}_gap"] = per_class[f"student_{metric}"] - per_class[f"teacher_{metric}"]
+    summary = {
+        "agreement": float(agree.mean()),
+        "macro_f1_gap": float(student["macro_f1"] - teacher["macro_f1"]),
+        "class_4_recall_gap": float(student["class_4_recall"] - teacher["class_4_recall"]),
+    }
+    return summary, per_class
+
+def artifact_footprint(model_dir):
+    """Size on disk and load time of the file the model is served from."""
+    start = time.time()
+    load_served(model_dir)
+    load_ms = (time.time() - start) * 1000
+    return {"size_mb": os.path.getsize(_served_file(model_dir)) / 1024 ** 2, "load_ms": load_ms}
+
+def latency_report(teacher, student, X, batch_sizes=BATCH_SIZES):
+    """p50/p99 predict_proba latency of teacher and student on one thread, per batch size."""
+    rng = np.random.default_rng(RANDOM_STATE)
+    rows = []
+    for batch_size in batch_sizes:
+        batches = [X[w] for w in make_batches(X.shape[0], batch_size, rng)]
+        with threadpool_limits(limits=1):
+            teacher_ms = time_batches(teacher.predict_proba, batches)
+            student_ms = time_batches(student.predict_proba, batches)
+        rows.append({"batch_size": batches[0].shape[0],
+                     "teacher_p50_ms": float(np.percentile(teacher_ms, 50)),
+                     "student_p50_ms": float(np.percentile(student_ms, 50)),
+                     "teacher_p99_ms": float(np.percentile(teacher_ms, 99)),
+                     "student_p99_ms": float(np.percentile(student_ms, 99))})
+    latency = pd.DataFrame(rows)
+    latency["p50_speedup"] = latency["teacher_p50_ms"] / latency["student_p50_ms"]
+    return latency
+
+def save_student(model, metrics, report, name, output_dir=STUDENT_ROOT):
+    path = os.path.join(output_dir, name)
+    os.makedirs(path, exist_ok=True)
+    joblib.dump(model, os.path.join(path, "model.pkl"))
+    with open(os.path.join(path, "metrics.json"), "w") as f:
+        json.dump(metrics, f, indent=4)
+    with open(os.path.join(path, "distillation.json"), "w") as f:
+        json.dump(report, f, indent=4)
+    export_native(model, path, feature_names_from(PREPROCESSOR_PATH), PREPROCESSOR_PATH)
+    register_model(path)
+    return path
+
+# ---------------- MAIN ----------------
+
+def main(students=None, teacher_dir=TEACHER_DIR, n_rows=DISTILL_ROWS, min_prob=MIN_PROB):
+    teacher = load_served(teacher_dir)
+    X_train, y_train = load_training_store()
+    proba = teacher_probabilities(teacher, X_train, teacher_dir)
+    idx = np.sort(stratified_subsample(np.arange(len(y_train)), y_train, n_rows, random_state=RANDOM_STATE))
+    X_fit, proba_fit = X_train[idx], proba[idx]
+    del X_train, proba
+
+    X_test, y_test = joblib.load(os.path.join(DATA_DIR, "test_data.pkl"))
+    y_test = np.asarray(y_test) - 1
+    teacher_preds = predict_proba_in_chunks(teacher, X_test).argmax(axis=1)
+    teacher_footprint = artifact_footprint(teacher_dir)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    rows = []
+    for name, config in STUDENTS.items():
+        if students and name not in students:
+            continue
+        print(f"\n>>> Distilling {name} from {teacher_dir}")
+        start = time.time()
+        student = fit_student(config, X_fit, proba_fit, min_prob)
+        train_time = time.time() - start
+
+        start = time.time()
+        student_preds = predict_proba_in_chunks(student, X_test).argmax(axis=1)
+        metrics = evaluate_predictions(y_test, student_preds, time.time() - start)
+        metrics["training_time"] = train_time
+        metrics["bootstrap"] = confidence_intervals(metrics["confusion_matrix"])
+        summary, per_class = agreement_report(y_test, teacher_preds, student_preds)
+        report = {"teacher": teacher_dir, "n_rows": len(idx), "min_prob": min_prob, **summary}
+        path = save_student(student, metrics, report, name)
+
+        served = load_served(path)   # Time the student as it would be served
+        latency = latency_report(teacher, served, X_test)
+        footprint = artifact_footprint(path)
+        report.update({"size_mb": {"teacher": teacher_footprint["size_mb"], "student": footprint["size_mb"]},
+                       "load_ms": {"teacher": teacher_footprint["load_ms"], "student": footprint["load_ms"]},
+                       "latency": latency.to_dict(orient="records")})
+        with open(os.path.join(path, "distillation.json"), "w") as f:
+            json.dump(report, f, indent=4)
+        per_class.to_csv(os.path.join(OUTPUT_DIR, f"{name}_per_class.csv"), index=False)
+        latency.to_csv(os.path.join(OUTPUT_DIR, f"{name}_latency.csv"), index=False)
+
+        print("\n" + per_class.round(4).to_string(index=False))
+        print("\n" + latency.round(3).to_string(index=False))
+        rows.append({"student": name, "agreement": summary["agreement"], "macro_f1": metrics["macro_f1"],
+                     "macro_f1_gap": summary["macro_f1_gap"], "class_4_recall": metrics["class_4_recall"],
+                     "class_4_recall_gap": summary["class_4_recall_gap"],
+                     "size_ratio": teacher_footprint["size_mb"] / footprint["size_mb"],
+                     "single_row_speedup": float(latency["p50_speedup"].iloc[0]),
+                     "train_time_s": train_time})
+
+    table = pd.DataFrame(rows)
+    table.to_csv(os.path.join(OUTPUT_DIR, "summary.csv"), index=False)
+    print("\n" + "="*30)
+    print("DISTILLATION SUMMARY")
+    print("="*30)
+    print(table.round(4).to_string(index=False))
+    print(f"\nStudents saved under {STUDENT_ROOT}; reports in {OUTPUT_DIR}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distil the tuned LightGBM into compact student models")
+    parser.add_argument("--students", nargs="+", choices=list(STUDENTS), help="default: all")
+    parser.add_argument("--teacher-dir", default=TEACHER_DIR)
+    parser.add_argument("--rows", type=int, default=DISTILL_ROWS)
+    parser.add_argument("--min-prob", type=float, default=MIN_PROB)
+    args = parser.parse_args()
+    main(args.students, args.teacher_dir, args.rows, args.min_prob)
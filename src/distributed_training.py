@@ -0,0 +1,289 @@
+import os
+import json
+import time
+import socket
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.binned_dataset import (
+    load_training_store, balanced_sample_weights, stratified_subsample, lgb_train_params, DATASET_PARAMS
+)
+from src.cross_validation import registered_models
+from src.evaluation import evaluate_model
+from src.native_export import export_booster, load_native, feature_names_from, NATIVE_FORMATS
+from src.registry import register_model
+from src.benchmark_report import BENCHMARK_DIR, make_record, append_records, peak_rss_mb
+
+# ---------------- CONFIG ----------------
+DATA_DIR = "data/training_ready/"
+SHARD_DIR = "data/training_ready/shards/"
+OUTPUT_ROOT = "model/distributed/"
+MODELS = ["lightgbm_tuned", "xgboost_tuned"]   # GBMs with socket-based distributed learners
+N_WORKERS = 4
+TREE_LEARNER = "data"        # LightGBM: "data" (share histograms) or "voting" (top-k features per worker)
+TOP_K = 20                   # Features each worker votes for with tree_learner="voting"
+THREADS_PER_WORKER = max(1, (os.cpu_count() or 1) // N_WORKERS)
+HOST = "127.0.0.1"           # Localhost launcher; real clusters start `worker` on each machine
+TIME_OUT_MIN = 120           # LightGBM socket timeout
+BENCHMARK_WORKERS = [1, 2, 4]
+RANDOM_STATE = 42
+
+# ---------------- SHARDS ----------------
+
+def write_shards(n_workers, n_rows=None, shard_dir=SHARD_DIR):
+    """Split the training store into n_workers contiguous row shards (X, y, weight) on disk.
+
+    Balanced weights are computed over the whole store before splitting,
+    so every worker weights its rows as a single-process fit would.
+    The train split is already shuffled, so contiguous ranges are random samples.
+    """
+    directory = os.path.join(shard_dir, str(n_rows or "full"))
+    paths = [os.path.join(directory, f"shard_{rank}_of_{n_workers}.pkl") for rank in range(n_workers)]
+    if all(os.path.exists(path) for path in paths):
+        return paths
+
+    X, y = load_training_store()
+    if n_rows:
+        idx = np.sort(stratified_subsample(np.arange(len(y)), y, n_rows, random_state=RANDOM_STATE))
+        X, y = X[idx], y[idx]
+    weight = balanced_sample_weights(y)
+    os.makedirs(directory, exist_ok=True)
+    for path, rows in zip(paths, np.array_split(np.arange(len(y)), n_workers)):
+        sl = slice(rows[0], rows[-1] + 1)
+        joblib.dump((X[sl], y[sl], weight[sl]), path)
+    return paths
+
+# ---------------- PARAMS ----------------
+
+def xgb_train_params(params, num_threads=None):
+    """Translate XGBClassifier keyword params into xgb.train params and round count."""
+    params = dict(params)
+    rounds = params.pop("n_estimators", 100)
+    if "random_state" in params:
+        params["seed"] = params.pop("random_state")
+    n_jobs = params.pop("n_jobs", -1)
+    params["nthread"] = num_threads or (0 if n_jobs == -1 else n_jobs)
+    return params, rounds
+
+def lgb_network_params(rank, machines, tree_learner=TREE_LEARNER):
+    """Socket-parallel settings of one LightGBM worker; machines is a list of "host:port"."""
+    return {
+        "tree_learner": tree_learner,
+        "top_k": TOP_K,
+        "num_machines": len(machines),
+        "machines": ",".join(machines),
+        "local_listen_port": int(machines[rank].rsplit(":", 1)[1]),
+        "time_out": TIME_OUT_MIN,
+        "pre_partition": True,   # Each worker already holds only its shard
+    }
+
+def free_ports(n, host=HOST):
+    """n currently unused TCP ports on host (for the localhost launcher)."""
+    sockets = [socket.socket() for _ in range(n)]
+    for s in sockets:
+        s.bind((host, 0))
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return ports
+
+# ---------------- WORKER ----------------
+
+def run_worker(library, params, shard_path, rank, machines=None, tree_learner=TREE_LEARNER,
+               tracker_args=None, num_threads=THREADS_PER_WORKER):
+    """Train on one shard as one member of the group; every rank ends up with the same booster.
+
+    Returns:
+        dict with the rank's timings and memory, plus the booster on rank 0
+    """
+    X, y, weight = joblib.load(shard_path)
+    baseline_rss = peak_rss_mb()
+    start = time.perf_counter()
+
+    if library == "LGBMClassifier":
+        import lightgbm as lgb
+        train_params, rounds = lgb_train_params(params, num_threads)
+        if machines and len(machines) > 1:
+            train_params.update(lgb_network_params(rank, machines, tree_learner))
+        train_set = lgb.Dataset(X, label=y, weight=weight, params=DATASET_PARAMS)
+        booster = lgb.train(train_params, train_set, num_boost_round=rounds)
+    elif library == "XGBClassifier":
+        import xgboost as xgb
+        train_params, rounds = xgb_train_params(params, num_threads)
+        with xgb.collective.CommunicatorContext(**(tracker_args or {})):
+            booster = xgb.train(train_params, xgb.DMatrix(X, label=y, weight=weight), num_boost_round=rounds)
+    else:
+        raise ValueError(f"No distributed learner for {library}")
+
+    return {
+        "rank": rank,
+        "n_rows": int(X.shape[0]),
+        "train_time_s": time.perf_counter() - start,
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": peak_rss_mb(),
+        "booster": booster if rank == 0 else None,
+    }
+
+# ---------------- LAUNCHER ----------------
+
+def launch(config, n_workers=N_WORKERS, tree_learner=TREE_LEARNER, n_rows=None,
+           threads_per_worker=THREADS_PER_WORKER):
+    """Run all workers of one distributed fit as local processes.
+
+    Returns:
+        (booster, per-worker results, wall time including process start and shard loading)
+    """
+    library = config["class"].__name__
+    shards = write_shards(n_workers, n_rows)
+    machines = [f"{HOST}:{port}" for port in free_ports(n_workers)]
+    tracker = None
+    tracker_args = None
+    if library == "XGBClassifier":
+        from xgboost.tracker import RabitTracker
+        tracker = RabitTracker(n_workers=n_workers, host_ip=HOST)
+        tracker.start()
+        tracker_args = tracker.worker_args()
+
+    # "spawn" so workers do not inherit the launcher's memory or thread pools.
+    context = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=context) as pool:
+        futures = [pool.submit(run_worker, library, config["params"], shard, rank, machines,
+                               tree_learner, tracker_args, threads_per_worker)
+                   for rank, shard in enumerate(shards)]
+        results = [future.result() for future in futures]
+    wall_time = time.perf_counter() - start
+    if tracker is not None:
+        tracker.wait_for()
+    return results[0].pop("booster"), results, wall_time
+
+def learner_name(library, tree_learner):
+    """tree_learner only applies to LightGBM; XGBoost always syncs histograms through its collective."""
+    return tree_learner if library == "LGBMClassifier" else "xgboost_collective"
+
+def _configs(models):
+    return {name: config for name, config, _ in registered_models()
+            if name in models and config["class"].__name__ in ("LGBMClassifier", "XGBClassifier")}
+
+# ---------------- TRAIN ----------------
+
+def train_distributed(name, config, n_workers=N_WORKERS, tree_learner=TREE_LEARNER):
+    """Distributed fit on the full store; saves the native booster, metrics.json and registers it."""
+    library = config["class"].__name__
+    booster, results, wall_time = launch(config, n_workers, tree_learner)
+
+    path = os.path.join(OUTPUT_ROOT, f"{name}_{n_workers}w")
+    export_booster(booster, library, np.arange(config["params"].get("num_class", 4)),
+                   int(booster.num_feature() if library == "LGBMClassifier" else booster.num_features()),
+                   path, feature_names_from())
+
+    X_test, y_test = joblib.load(os.path.join(DATA_DIR, "test_data.pkl"))
+    metrics = evaluate_model(load_native(path), X_test, np.asarray(y_test) - 1)
+    metrics["training_time"] = wall_time
+    metrics["distributed"] = {
+        "n_workers": n_workers,
+        "tree_learner": learner_name(library, tree_learner),
+        "threads_per_worker": THREADS_PER_WORKER,
+        "workers": [{k: v for k, v in r.items() if k != "booster"} for r in results],
+    }
+    with open(os.path.join(path, "metrics.json"), "w") as f:
+        json.dump(metrics, f, indent=4)
+    register_model(path)
+    print(f"Finished {name} on {n_workers} workers in {wall_time:.1f}s. "
+          f"Macro F1: {metrics['macro_f1']:.4f} | C4 Recall: {metrics['class_4_recall']:.4f}")
+    return path
+
+# ---------------- BENCHMARK ----------------
+
+def benchmark_scaling(name, config, worker_counts=BENCHMARK_WORKERS, tree_learner=TREE_LEARNER,
+                      n_rows=None):
+    """Wall time, speedup and test macro F1 from 1 to N workers (fixed threads per worker)."""
+    library = config["class"].__name__
+    learner = learner_name(library, tree_learner)
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+    X_test, y_test = joblib.load(os.path.join(DATA_DIR, "test_data.pkl"))
+    y_test = np.asarray(y_test) - 1
+
+    rows = []
+    for n_workers in worker_counts:
+        print(f"\n>>> {name}: {n_workers} worker(s) x {THREADS_PER_WORKER} thread(s), {tree_learner}")
+        booster, results, wall_time = launch(config, n_workers, tree_learner, n_rows)
+        path = os.path.join(BENCHMARK_DIR, "distributed", f"{name}_{n_workers}w")
+        export_booster(booster, library, np.arange(config["params"].get("num_class", 4)),
+                       X_test.shape[1], path)
+        metrics = evaluate_model(load_native(path), X_test, y_test)
+        size_mb = os.path.getsize(os.path.join(path, NATIVE_FORMATS[library][1])) / 1024 ** 2
+        total_rows = sum(r["n_rows"] for r in results)
+
+        append_records([make_record(
+            "training", f"{name}_{n_workers}w", library, n_workers * THREADS_PER_WORKER, run_id,
+            dataset="real", n_rows=total_rows, n_features=int(X_test.shape[1]),
+            wall_time_s=wall_time, rows_per_s=total_rows / wall_time,
+            baseline_rss_mb=max(r["baseline_rss_mb"] or 0 for r in results),
+            peak_rss_mb=max(r["peak_rss_mb"] or 0 for r in results), model_size_mb=size_mb,
+            params={"n_workers": n_workers, "tree_learner": learner,
+                    **{k: v for k, v in config["params"].items() if isinstance(v, (int, float, str, bool))}},
+        )], "training")
+        rows.append({"model": name, "n_workers": n_workers,
+                     "tree_learner": learner,
+                     "wall_time_s": wall_time,
+                     "max_worker_train_s": max(r["train_time_s"] for r in results),
+                     "peak_rss_mb_per_worker": max(r["peak_rss_mb"] or 0 for r in results),
+                     "macro_f1": metrics["macro_f1"], "class_4_recall": metrics["class_4_recall"]})
+        print(f"  {wall_time:.1f}s | Macro F1 {metrics['macro_f1']:.4f} | C4 Recall {metrics['class_4_recall']:.4f}")
+
+    df = pd.DataFrame(rows)
+    df["speedup"] = df["wall_time_s"].iloc[0] / df["wall_time_s"]
+    df["efficiency"] = df["speedup"] / (df["n_workers"] / df["n_workers"].iloc[0])
+    return df
+
+# ---------------- MAIN ----------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed GBM training over socket-connected workers")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = sub.add_parser("train", help="distributed fit on the full store, all workers on localhost")
+    bench_parser = sub.add_parser("benchmark", help="scaling from 1 to N local workers")
+    for p in (train_parser, bench_parser):
+        p.add_argument("--models", nargs="+", default=MODELS)
+        p.add_argument("--tree-learner", default=TREE_LEARNER, choices=["data", "voting"])
+    train_parser.add_argument("--workers", type=int, default=N_WORKERS)
+    bench_parser.add_argument("--workers", nargs="+", type=int, default=BENCHMARK_WORKERS)
+    bench_parser.add_argument("--rows", type=int, help="stratified training subsample (default: full store)")
+
+    worker_parser = sub.add_parser("worker", help="one LightGBM worker, for runs spanning several machines")
+    worker_parser.add_argument("--model", default="lightgbm_tuned")
+    worker_parser.add_argument("--shard", required=True, help="this machine's shard (see write_shards)")
+    worker_parser.add_argument("--rank", type=int, required=True)
+    worker_parser.add_argument("--machines", required=True, help="comma-separated host:port of every worker")
+    worker_parser.add_argument("--tree-learner", default=TREE_LEARNER, choices=["data", "voting"])
+    worker_parser.add_argument("--output", default=os.path.join(OUTPUT_ROOT, "lightgbm_tuned_cluster"))
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        config = _configs([args.model])[args.model]
+        result = run_worker(config["class"].__name__, config["params"], args.shard, args.rank,
+                            args.machines.split(","), args.tree_learner)
+        if args.rank == 0:
+            booster = result["booster"]
+            export_booster(booster, config["class"].__name__, np.arange(config["params"].get("num_class", 4)),
+                           int(booster.num_feature()), args.output, feature_names_from())
+        print(f"Rank {args.rank} done in {result['train_time_s']:.1f}s")
+    elif args.command == "train":
+        for name, config in _configs(args.models).items():
+            train_distributed(name, config, args.workers, args.tree_learner)
+    else:
+        tables = [benchmark_scaling(name, config, args.workers, args.tree_learner, args.rows)
+                  for name, config in _configs(args.models).items()]
+        table = pd.concat(tables, ignore_index=True)
+        os.makedirs(BENCHMARK_DIR, exist_ok=True)
+        table.to_csv(os.path.join(BENCHMARK_DIR, "distributed_scaling.csv"), index=False)
+        print("\n" + "="*30)
+        print("DISTRIBUTED SCALING")
+        print("="*30)
+        print(table.round(3).to_string(index=False))
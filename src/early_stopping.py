@@ -0,0 +1,260 @@
+import numpy as np
+import scipy.sparse as sp
+import lightgbm as lgb
+import xgboost as xgb
+from sklearn.metrics import f1_score, log_loss
+from sklearn.model_selection import train_test_split
+
+# ---------------- CONFIG ----------------
+VALIDATION_SIZE = 0.1        # Fraction of the training store held out for early stopping
+PATIENCE = 50                # Rounds without improvement before we stop
+MONITOR = "multi_logloss"    # "multi_logloss" or "macro_f1"
+LOG_EVERY = 50               # Print validation metrics every N rounds
+RANDOM_STATE = 42
+
+# ---------------- SPLIT ----------------
+
+def split_validation(X_train, y_train, sample_weight=None,
+                     val_size=VALIDATION_SIZE, random_state=RANDOM_STATE):
+    """Carve a stratified validation set out of the training data.
+
+    Works on row indices so the sparse matrix is sliced once per side.
+
+    Returns:
+        (X_fit, X_val, y_fit, y_val, w_fit, w_val); weights are None
+        when no sample_weight is given.
+    """
+    y = np.asarray(y_train)
+    fit_idx, val_idx = train_test_split(
+        np.arange(len(y)), test_size=val_size, stratify=y, random_state=random_state
+    )
+    w_fit = w_val = None
+    if sample_weight is not None:
+        sample_weight = np.asarray(sample_weight)
+        w_fit, w_val = sample_weight[fit_idx], sample_weight[val_idx]
+    return _rows(X_train, fit_idx), _rows(X_train, val_idx), y[fit_idx], y[val_idx], w_fit, w_val
+
+def _rows(X, indices):
+    """Row subset; sparse results get sorted indices.
+
+    Row indexing a CSC matrix leaves its row indices unsorted, which
+    LightGBM silently misreads.
+    """
+    subset = X[indices]
+    if sp.issparse(subset) and not subset.has_sorted_indices:
+        subset.sort_indices()
+    return subset
+
+# ---------------- METRICS ----------------
+# Same metrics for every library so the streamed numbers are comparable.
+
+def macro_f1(y_true, y_prob, sample_weight=None):
+    return f1_score(y_true, np.asarray(y_prob).argmax(axis=1), average="macro",
+                    sample_weight=sample_weight)
+
+def multi_logloss(y_true, y_prob, sample_weight=None):
+    return log_loss(y_true, y_prob, labels=np.arange(np.asarray(y_prob).shape[1]),
+                    sample_weight=sample_weight)
+
+def _lgb_macro_f1(y_true, y_prob):
+    return "macro_f1", macro_f1(y_true, y_prob), True
+
+def _lgb_multi_logloss(y_true, y_prob):
+    return "multi_logloss", multi_logloss(y_true, y_prob), False
+
+# ---------------- PATIENCE ----------------
+
+class Patience:
+    """Early-stopping state kept outside the libraries so a checkpoint can restore it."""
+
+    def __init__(self, patience, maximize, best_score=None, best_iteration=-1, wait=0):
+        self.patience = patience
+        self.maximize = maximize
+        self.best_score = best_score
+        self.best_iteration = best_iteration
+        self.wait = wait
+
+    def update(self, score, iteration):
+        """Record the score of a 0-based global iteration; True means stop."""
+        improved = (self.best_score is None
+                    or (score > self.best_score if self.maximize else score < self.best_score))
+        if improved:
+            self.best_score, self.best_iteration, self.wait = float(score), int(iteration), 0
+        else:
+            self.wait += 1
+        return self.stopped
+
+    @property
+    def stopped(self):
+        return self.wait >= self.patience
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(**state)
+
+def _lgb_patience_callback(patience, monitor, checkpoint=None):
+    def _callback(env):
+        for data_name, name, score, _ in env.evaluation_result_list:
+            if data_name == "validation" and name == monitor and patience.update(score, env.iteration):
+                raise lgb.callback.EarlyStopException(
+                    patience.best_iteration,
+                    [("validation", name, patience.best_score, patience.maximize)],
+                )
+        # env.iteration counts from the init_model's rounds, so checkpoints stay on the global schedule
+        done = env.iteration + 1
+        if checkpoint is not None and done < env.end_iteration and checkpoint.due(done):
+            checkpoint.save(env.model, "LGBMClassifier", done, patience)
+    return _callback
+
+class _XGBPatienceCallback(xgb.callback.TrainingCallback):
+    def __init__(self, patience, monitor, checkpoint=None):
+        self.patience = patience
+        self.metric = "mlogloss" if monitor == "multi_logloss" else monitor
+        self.checkpoint = checkpoint
+        super().__init__()
+
+    def before_training(self, model):
+        self.start = model.num_boosted_rounds()  # > 0 when resuming from a checkpoint
+        return model
+
+    def after_iteration(self, model, epoch, evals_log):
+        iteration = self.start + epoch
+        if self.patience.update(evals_log["validation_0"][self.metric][-1], iteration):
+            return True
+        if self.checkpoint is not None and self.checkpoint.due(iteration + 1):
+            self.checkpoint.save(model, "XGBClassifier", iteration + 1, self.patience)
+        return False
+
+    def after_training(self, model):
+        return model[: self.patience.best_iteration + 1]
+
+# ---------------- FIT ----------------
+
+def _fit_lightgbm(model, X_fit, y_fit, X_val, y_val, w_fit, w_val,
+                  patience, monitor, log_every, init_model, checkpoint):
+    # Built-in metrics are always evaluated before custom ones, so switch them off.
+    model.set_params(metric="None")
+    model.fit(
+        X_fit, y_fit, sample_weight=w_fit,
+        eval_set=[(X_val, y_val)], eval_sample_weight=None if w_val is None else [w_val],
+        eval_names=["validation"], eval_metric=[_lgb_multi_logloss, _lgb_macro_f1],
+        init_model=init_model,
+        callbacks=[lgb.log_evaluation(log_every), _lgb_patience_callback(patience, monitor, checkpoint)],
+    )
+    # Drop the trees grown after the best round so the saved model stays small.
+    booster = model.booster_
+    booster.model_from_string(booster.model_to_string(num_iteration=patience.best_iteration + 1))
+
+def _fit_xgboost(model, X_fit, y_fit, X_val, y_val, w_fit, w_val,
+                 patience, monitor, log_every, init_model, checkpoint):
+    model.set_params(
+        eval_metric=["mlogloss", macro_f1],
+        callbacks=[_XGBPatienceCallback(patience, monitor, checkpoint)],
+    )
+    model.fit(
+        X_fit, y_fit, sample_weight=w_fit,
+        eval_set=[(X_val, y_val)], sample_weight_eval_set=None if w_val is None else [w_val],
+        xgb_model=init_model, verbose=log_every,
+    )
+    # set_params() on a fitted model is pushed into the booster, which cannot hold a callable metric.
+    model.set_params(eval_metric=None, callbacks=None)
+
+def _fit_boosting(model, fitter, data, patience, monitor, log_every, checkpoint):
+    """One fit() call; a checkpoint (if any) is written from the training callback every N rounds.
+
+    The Dataset / DMatrix is built once. When resuming, fit() continues from
+    the checkpointed booster for the remaining rounds, with the seed offset by
+    the rounds already done so row/column sampling does not repeat the first
+    rounds' draws.
+    """
+    params = model.get_params()
+    total, random_state = params["n_estimators"], params["random_state"]
+    tracker = Patience(patience, maximize=monitor == "macro_f1")
+    init_model, done = None, 0
+
+    if checkpoint is not None:
+        state = checkpoint.load()
+        if state is not None:
+            tracker = Patience.from_dict(state["patience"])
+            init_model, done = checkpoint.model_path(type(model).__name__), state["iteration"]
+            seed = RANDOM_STATE if random_state is None else random_state
+            model.set_params(n_estimators=total - done, random_state=seed + done)
+            print(f"Resuming {checkpoint.name} from round {done}")
+
+    fitter(model, *data, tracker, monitor, log_every, init_model, checkpoint)
+    model.set_params(n_estimators=total, random_state=random_state)
+    return tracker.best_iteration + 1
+
+def _fit_catboost(model, X_fit, y_fit, X_val, y_val, w_fit, w_val,
+                  patience, monitor, log_every, checkpoint):
+    from catboost import Pool
+    model.set_params(
+        eval_metric="TotalF1:average=Macro" if monitor == "macro_f1" else "MultiClass",
+        custom_metric=["MultiClass", "TotalF1:average=Macro"],
+        verbose=log_every,
+    )
+    # CatBoost snapshots hold the full training state, so it resumes natively.
+    snapshot = checkpoint.catboost_fit_params(model) if checkpoint is not None else {}
+    model.fit(
+        Pool(X_fit, y_fit, weight=w_fit), eval_set=Pool(X_val, y_val, weight=w_val),
+        early_stopping_rounds=patience,
+        use_best_model=True,  # CatBoost shrinks the model to the best iteration
+        **snapshot,
+    )
+    return model.get_best_iteration() + 1
+
+_BOOSTING_FITTERS = {
+    "LGBMClassifier": _fit_lightgbm,
+    "XGBClassifier": _fit_xgboost,
+}
+
+def supports_early_stopping(model):
+    return type(model).__name__ in _BOOSTING_FITTERS or type(model).__name__ == "CatBoostClassifier"
+
+def fit_with_early_stopping(model, X_train, y_train, sample_weight=None,
+                            val_size=VALIDATION_SIZE, patience=PATIENCE,
+                            monitor=MONITOR, log_every=LOG_EVERY, checkpoint=None):
+    """Fit a GBM on a stratified train/validation carve-out with early stopping.
+
+    Args:
+        model: unfitted LGBMClassifier, XGBClassifier or CatBoostClassifier
+        X_train, y_train: training store (0-indexed targets)
+        sample_weight (array, optional): per-row weights, split alongside the rows
+        val_size (float): fraction held out for validation
+        patience (int): rounds without improvement before stopping
+        monitor (str): "multi_logloss" or "macro_f1"
+        log_every (int): print validation metrics every N rounds
+        checkpoint (Checkpointer, optional): save progress periodically and
+            continue from the latest checkpoint if one exists
+
+    Returns:
+        dict with best_iteration and the validation metrics at that iteration.
+        The model is truncated to best_iteration in place.
+    """
+    if monitor not in ("multi_logloss", "macro_f1"):
+        raise ValueError(f"Unknown monitor metric: {monitor}")
+    if not supports_early_stopping(model):
+        raise TypeError(f"Early stopping not supported for {type(model).__name__}")
+
+    X_fit, X_val, y_fit, y_val, w_fit, w_val = split_validation(
+        X_train, y_train, sample_weight=sample_weight, val_size=val_size
+    )
+    data = (X_fit, y_fit, X_val, y_val, w_fit, w_val)
+    if type(model).__name__ == "CatBoostClassifier":
+        best_iteration = _fit_catboost(model, *data, patience, monitor, log_every, checkpoint)
+    else:
+        fitter = _BOOSTING_FITTERS[type(model).__name__]
+        best_iteration = _fit_boosting(model, fitter, data, patience, monitor, log_every, checkpoint)
+
+    val_prob = model.predict_proba(X_val)
+    return {
+        "best_iteration": int(best_iteration),
+        "monitor": monitor,
+        "patience": patience,
+        "validation_size": val_size,
+        "val_multi_logloss": multi_logloss(y_val, val_prob),
+        "val_macro_f1": macro_f1(y_val, val_prob),
+    }
@@ -0,0 +1,137 @@
+import time
+import numpy as np
+
+# ---------------- CONFIG ----------------
+N_CLASSES = 4                # Severity 1-4 as 0-indexed labels
+CHUNK_SIZE = 200_000         # Rows predicted per chunk when streaming
+CLASS_4 = 3                  # index 3 is Severity 4
+
+# ---------------- CONFUSION MATRIX ----------------
+
+def confusion_matrix(y_true, y_pred, n_classes=N_CLASSES):
+    """n_classes x n_classes counts (rows = true, columns = predicted) in one bincount pass."""
+    y_true = np.asarray(y_true, dtype=np.int64).ravel()
+    y_pred = np.asarray(y_pred, dtype=np.int64).ravel()
+    return np.bincount(y_true * n_classes + y_pred, minlength=n_classes * n_classes) \
+        .reshape(n_classes, n_classes)
+
+def _safe_divide(num, den):
+    return np.divide(num, den, out=np.zeros(np.broadcast(num, den).shape), where=den != 0)
+
+def metrics_from_confusion(cm):
+    """Every reported metric derived from a confusion matrix.
+
+    Works on a single (n, n) matrix or a stack (..., n, n), e.g. one matrix
+    per bootstrap replicate or per slice; metrics then have the leading shape.
+    Undefined ratios (no support / no predictions) are 0, as in sklearn's
+    zero_division=0.
+    """
+    cm = np.asarray(cm, dtype=np.float64)
+    tp = np.diagonal(cm, axis1=-2, axis2=-1)
+    support = cm.sum(axis=-1)
+    predicted = cm.sum(axis=-2)
+    total = support.sum(axis=-1)
+
+    precision = _safe_divide(tp, predicted)
+    recall = _safe_divide(tp, support)
+    f1 = _safe_divide(2 * precision * recall, precision + recall)
+    return {
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "support": support,
+        "accuracy": _safe_divide(tp.sum(axis=-1), total),
+        "macro_f1": f1.mean(axis=-1),
+        "weighted_f1": _safe_divide((f1 * support).sum(axis=-1), total),
+        "class_4_recall": recall[..., CLASS_4],
+    }
+
+def classification_report(cm):
+    """Same layout as sklearn's classification_report(output_dict=True), built from the matrix."""
+    m = metrics_from_confusion(cm)
+    report = {}
+    for i in range(len(m["support"])):
+        report[str(i)] = {
+            "precision": float(m["precision"][i]), "recall": float(m["recall"][i]),
+            "f1-score": float(m["f1"][i]), "support": float(m["support"][i]),
+        }
+    total = float(m["support"].sum())
+    report["accuracy"] = float(m["accuracy"])
+    report["macro avg"] = {
+        "precision": float(m["precision"].mean()), "recall": float(m["recall"].mean()),
+        "f1-score": float(m["macro_f1"]), "support": total,
+    }
+    weights = m["support"] / total if total else m["support"]
+    report["weighted avg"] = {
+        "precision": float((m["precision"] * weights).sum()), "recall": float((m["recall"] * weights).sum()),
+        "f1-score": float(m["weighted_f1"]), "support": total,
+    }
+    return report
+
+# ---------------- STREAMING ----------------
+
+class StreamingConfusion:
+    """Accumulates the confusion matrix chunk by chunk, so predictions never need to be held in full."""
+
+    def __init__(self, n_classes=N_CLASSES):
+        self.n_classes = n_classes
+        self.matrix = np.zeros((n_classes, n_classes), dtype=np.int64)
+
+    def update(self, y_true, y_pred):
+        self.matrix += confusion_matrix(y_true, y_pred, self.n_classes)
+        return self
+
+    def metrics(self):
+        return metrics_from_confusion(self.matrix)
+
+def predict_labels(model, X):
+    # CatBoost predict often returns a 2D array [[res]], flatten it.
+    return np.asarray(model.predict(X)).ravel()
+
+def iter_chunks(n_rows, chunk_size=CHUNK_SIZE):
+    for start in range(0, n_rows, chunk_size):
+        yield slice(start, min(start + chunk_size, n_rows))
+
+# ---------------- EVALUATE ----------------
+
+def evaluate_confusion(cm, inference_time=None):
+    """The metrics.json dict the training scripts save, from a confusion matrix."""
+    m = metrics_from_confusion(cm)
+    return {
+        "macro_f1": float(m["macro_f1"]),
+        "weighted_f1": float(m["weighted_f1"]),
+        "inference_time_cpu": inference_time,
+        "class_4_recall": float(m["class_4_recall"]),
+        "report": classification_report(cm),
+        "confusion_matrix": np.asarray(cm).tolist(),
+    }
+
+def predict_in_chunks(model, X, chunk_size=CHUNK_SIZE):
+    """Predicted labels as a compact int8 array, plus the total predict time."""
+    preds = np.empty(X.shape[0], dtype=np.int8)
+    inference_time = 0.0
+    for rows in iter_chunks(X.shape[0], chunk_size):
+        start_time = time.time()
+        preds[rows] = predict_labels(model, X[rows])
+        inference_time += time.time() - start_time
+    return preds, inference_time
+
+def evaluate_predictions(y_true, y_pred, inference_time=None):
+    return evaluate_confusion(confusion_matrix(y_true, y_pred), inference_time)
+
+def evaluate_model(model, X_test, y_test, chunk_size=CHUNK_SIZE):
+    """Predict X_test in chunks, accumulate one confusion matrix and derive every metric from it.
+
+    Returns the same keys as the training scripts always saved: macro_f1,
+    weighted_f1, inference_time_cpu (predict time only), class_4_recall,
+    report and confusion_matrix.
+    """
+    y_test = np.asarray(y_test)
+    stream = StreamingConfusion()
+    inference_time = 0.0
+    for rows in iter_chunks(X_test.shape[0], chunk_size):
+        start_time = time.time()
+        preds = predict_labels(model, X_test[rows])
+        inference_time += time.time() - start_time
+        stream.update(y_test[rows], preds)
+    return evaluate_confusion(stream.matrix, inference_time)
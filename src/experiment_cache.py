@@ -0,0 +1,103 @@
+import os
+import json
+import hashlib
+import inspect
+import joblib
+import numpy as np
+
+from src.registry import file_hash, _read_json
+from src.benchmark_report import library_version
+
+# ---------------- CONFIG ----------------
+KEY_FILE = "train_key.json"
+# Shared code that changes what a training script fits or reports, besides the script itself.
+# Paths are relative to the repository root, not the working directory.
+CODE_FILES = ["src/early_stopping.py", "src/evaluation.py", "src/bootstrap.py",
+              "src/checkpoint.py", "src/matrix_format.py"]
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ---------------- KEY PARTS ----------------
+
+def data_fingerprint(path):
+    """sha256 of the training store, cached next to it and keyed by size + mtime.
+
+    The store is several GB; hashing it is only redone when the file changes.
+    """
+    stat = os.stat(path)
+    cache_path = path + ".sha256.json"
+    cached = _read_json(cache_path)
+    if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+        return cached["sha256"]
+    digest = file_hash(path)
+    with open(cache_path, "w") as f:
+        json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}, f)
+    return digest
+
+def code_version(code=(), code_files=CODE_FILES):
+    """Hash of the training code: functions (by source) plus the shared modules that shape results.
+
+    Scripts pass their training functions rather than their own file, so
+    editing one entry of MODELS_CONFIG only changes that model's key.
+    """
+    digest = hashlib.sha256()
+    for obj in code:
+        digest.update(inspect.getsource(obj).encode())
+    for path in code_files:
+        full_path = os.path.join(REPO_ROOT, path)
+        if not os.path.exists(full_path):
+            raise FileNotFoundError(f"{path} is listed in CODE_FILES but missing from {REPO_ROOT}")
+        digest.update(file_hash(full_path).encode())
+    return digest.hexdigest()
+
+def _canonical(value):
+    """JSON-safe, order-independent form of a params dict (numpy keys/values, nested dicts, lists)."""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return repr(value)
+
+def experiment_key(data_path, model_class, params, code=(), settings=None, test_path=None):
+    """(key, components): the key changes when the data, model class/version, params or code change.
+
+    settings holds script-level switches that affect the fit but are not
+    model params (e.g. early stopping and its patience). A hit reuses the
+    saved metrics.json, which is scored on the test store, so test_path
+    is part of the key too. The matrix layout matrix_format picked for the
+    model class is included, since a new format_choice.json changes what
+    the model is fit on.
+    """
+    from src.matrix_format import select_format   # matrix_format imports this module
+    components = {
+        "data_sha256": data_fingerprint(data_path),
+        "test_sha256": data_fingerprint(test_path) if test_path else None,
+        "model_class": f"{model_class.__module__}.{model_class.__qualname__}",
+        "library_version": library_version(model_class.__module__.split(".")[0]),
+        "params": _canonical(params),
+        "settings": _canonical(settings or {}),
+        "matrix_format": select_format(model_class),
+        "code_version": code_version(code),
+    }
+    key = hashlib.sha256(json.dumps(components, sort_keys=True).encode()).hexdigest()
+    return key, components
+
+# ---------------- LOOKUP ----------------
+
+def load_cached(model_dir, key, force=False):
+    """(model, metrics) saved by an earlier run with the same key, else None (always None when forced)."""
+    if force:
+        return None
+    stored = _read_json(os.path.join(model_dir, KEY_FILE))
+    model_path = os.path.join(model_dir, "model.pkl")
+    metrics = _read_json(os.path.join(model_dir, "metrics.json"))
+    if not stored or stored["key"] != key or metrics is None or not os.path.exists(model_path):
+        return None
+    return joblib.load(model_path), metrics
+
+def save_key(model_dir, key, components):
+    with open(os.path.join(model_dir, KEY_FILE), "w") as f:
+        json.dump({"key": key, **components}, f, indent=4)
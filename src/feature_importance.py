@@ -1,54 +1,228 @@
-import joblib
+import os
 import json
+import hashlib
+import argparse
+import joblib
+import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 import matplotlib.pyplot as plt
 import seaborn as sns
-import os
+from joblib import Parallel, delayed
+
+from src.binned_dataset import stratified_subsample
+from src.evaluation import confusion_matrix, metrics_from_confusion, predict_labels
+from src.benchmark_inference import pin_threads
+from src.registry import file_hash
 
 # --- PATHS ---
-MODEL_PATH = "model/fine/lightgbm_tuned/model.pkl" # Adjust if you renamed it
-PREPROCESSOR_PATH = "models/preprocessor.pkl"
-OUTPUT_DIR = "models/lightgbm_tuned/"
+MODEL_PATH = "model/fine/lightgbm_tuned/model.pkl"
+# The preprocessor that produced data/training_ready/ (and that the Streamlit app loads)
+PREPROCESSOR_PATH = "preprocessing/new/preprocessor.pkl"
+TEST_DATA_PATH = "data/training_ready/test_data.pkl"
+CACHE_DIR = "evaluations/importance_cache/"
+
+# --- SETTINGS ---
+PERMUTATION_ROWS = 100_000   # Stratified test subsample scored for every permutation
+SHAP_ROWS = 20_000           # TreeSHAP is costlier per row than predict
+N_REPEATS = 5                # Shuffles per feature
+N_WORKERS = 4
+RANDOM_STATE = 42
+
+# Per-process cache of the model and sample a permutation worker scores.
+_LOADED = {}
+
+# ---------------- FEATURE GROUPS ----------------
+
+def feature_groups(preprocessor):
+    """{original feature: (start, stop)} column range of each input feature in the transformed matrix.
+
+    One-hot columns of a categorical (e.g. ~49 State dummies) form a single
+    group, so importance is reported for the feature the user actually sets.
+    """
+    groups = {}
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == "remainder":
+            continue
+        start = preprocessor.output_indices_[name].start
+        encoder = transformer.steps[-1][1] if hasattr(transformer, "steps") else transformer
+        widths = [len(c) for c in encoder.categories_] if hasattr(encoder, "categories_") else [1] * len(columns)
+        for column, width in zip(columns, widths):
+            groups[column] = (start, start + width)
+            start += width
+    return groups
+
+# ---------------- CACHE ----------------
+
+def _cache_path(model_path, kind, settings):
+    """Results are keyed by the model file's hash plus every setting that changes them."""
+    key = hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:12]
+    return os.path.join(CACHE_DIR, f"{file_hash(model_path)[:16]}_{kind}_{key}.pkl")
+
+def _cached(model_path, kind, settings, compute, force=False):
+    path = _cache_path(model_path, kind, settings)
+    if os.path.exists(path) and not force:
+        print(f"Using cached {kind} importance: {path}")
+        return pd.read_pickle(path)
+    result = compute()
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    result.to_pickle(path)
+    return result
+
+# ---------------- PERMUTATION ----------------
+
+def permute_group(X, start, stop, perm):
+    """X with columns [start, stop) shuffled together across rows; stays sparse."""
+    return sp.hstack([X[:, :start], X[perm, start:stop], X[:, stop:]], format="csr")
+
+def _score(model, X, y):
+    metrics = metrics_from_confusion(confusion_matrix(y, predict_labels(model, X)))
+    return float(metrics["macro_f1"]), float(metrics["class_4_recall"])
+
+def _permutation_task(task_path, feature, start, stop, seeds):
+    """Runs in a worker: score the sample with one feature group shuffled, once per seed."""
+    if task_path not in _LOADED:
+        model, X, y = joblib.load(task_path)
+        pin_threads(model, 1)
+        _LOADED[task_path] = (model, X, y)
+    model, X, y = _LOADED[task_path]
+    return [(feature, seed, *_score(model, permute_group(X, start, stop,
+                                                         np.random.default_rng(seed).permutation(X.shape[0])), y))
+            for seed in seeds]
+
+def permutation_importance(model, X, y, groups, n_repeats=N_REPEATS, n_workers=N_WORKERS):
+    """Drop in macro F1 / class-4 recall when each original feature is shuffled.
+
+    Returns:
+        DataFrame (feature, macro_f1_drop, macro_f1_drop_std, class_4_recall_drop, ...)
+    """
+    base_f1, base_recall = _score(model, X, y)
+
+    # Workers load the model and sample once from disk instead of receiving them per task.
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    task_path = os.path.join(CACHE_DIR, f"permutation_task_{os.getpid()}.pkl")
+    joblib.dump((model, X, y), task_path)
+    seeds = [RANDOM_STATE + i for i in range(n_repeats)]
+    try:
+        results = Parallel(n_jobs=n_workers)(
+            delayed(_permutation_task)(task_path, feature, start, stop, seeds)
+            for feature, (start, stop) in groups.items()
+        )
+    finally:
+        os.remove(task_path)
+
+    scores = pd.DataFrame([row for rows in results for row in rows],
+                          columns=["feature", "seed", "macro_f1", "class_4_recall"])
+    scores["macro_f1_drop"] = base_f1 - scores["macro_f1"]
+    scores["class_4_recall_drop"] = base_recall - scores["class_4_recall"]
+    summary = scores.groupby("feature")[["macro_f1_drop", "class_4_recall_drop"]].agg(["mean", "std"])
+    summary.columns = [f"{metric}{'' if stat == 'mean' else '_std'}" for metric, stat in summary.columns]
+    return summary.reset_index().sort_values("macro_f1_drop", ascending=False)
+
+# ---------------- TREESHAP ----------------
+
+def shap_values(model, X):
+    """(n_rows, n_classes, n_features + 1) TreeSHAP values from the library's native implementation.
+
+    The last column is the expected value. Returns None for non-tree models.
+    """
+    library = type(model).__name__
+    if library == "LGBMClassifier":
+        contrib = model.booster_.predict(X, pred_contrib=True)
+        # Sparse input gives one sparse matrix per class.
+        if isinstance(contrib, list):
+            return np.stack([c.toarray() for c in contrib], axis=1)
+        return contrib.reshape(X.shape[0], -1, X.shape[1] + 1)
+    if library == "XGBClassifier":
+        import xgboost as xgb
+        return model.get_booster().predict(xgb.DMatrix(X), pred_contribs=True)
+    if library == "CatBoostClassifier":
+        from catboost import Pool
+        return model.get_feature_importance(Pool(X), type="ShapValues")
+    return None
+
+def shap_importance(model, X, groups):
+    """Mean |SHAP| per original feature and class (dummy contributions summed within a group first)."""
+    values = shap_values(model, X)
+    if values is None:
+        return None
+    rows = []
+    for feature, (start, stop) in groups.items():
+        per_class = np.abs(values[:, :, start:stop].sum(axis=2)).mean(axis=0)
+        rows.append({"feature": feature, **{f"class_{c + 1}": v for c, v in enumerate(per_class)},
+                     "mean_abs_shap": per_class.mean()})
+    return pd.DataFrame(rows).sort_values("mean_abs_shap", ascending=False)
+
+# ---------------- REPORT ----------------
+
+def _plot(df, value, title, path):
+    plt.figure(figsize=(12, 8))
+    sns.barplot(x=value, y='feature', data=df.head(20))
+    plt.title(title)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+def generate_feature_importance(model_path=MODEL_PATH, with_shap=True, force=False):
+    output_dir = os.path.dirname(model_path)  # Reports sit next to the model they describe
 
-def generate_feature_importance():
     # 1. Load Artifacts
-    model = joblib.load(MODEL_PATH)
+    model = joblib.load(model_path)
     preprocessor = joblib.load(PREPROCESSOR_PATH)
-    
-    # 2. Get Feature Names from Preprocessor
-    # This handles the OneHotEncoded column names (e.g., 'State_CA', 'State_NY')
     feature_names = preprocessor.get_feature_names_out()
-    
-    # 3. Get Importance (Gain)
-    importances = model.feature_importances_
-    
-    # 4. Create DataFrame
-    fi_df = pd.DataFrame({
-        'feature': feature_names,
-        'importance': importances
-    }).sort_values('importance', ascending=False)
-    
-    # 5. Save as JSON Feature Map
-    # Map index to feature name
+    groups = feature_groups(preprocessor)
+
+    # 2. Save Feature Map (index -> transformed column name)
     feature_map = {str(i): name for i, name in enumerate(feature_names)}
-    with open(os.path.join(OUTPUT_DIR, "feature_map.json"), "w") as f:
+    with open(os.path.join(output_dir, "feature_map.json"), "w") as f:
         json.dump(feature_map, f, indent=4)
-    
-    # 6. Save as CSV for easy reading
-    fi_df.to_csv(os.path.join(OUTPUT_DIR, "feature_importance.csv"), index=False)
-    
-    # 7. Visualize Top 20
-    plt.figure(figsize=(12, 8))
-    sns.barplot(x='importance', y='feature', data=fi_df.head(20))
-    plt.title('Top 20 Features by Gain (LightGBM Tuned)')
-    plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_DIR, "feature_importance.png"))
-    
-    print(f"Feature map and importance plot saved to {OUTPUT_DIR}")
-    print("\nTop 15 Most Important Features:")
-    print(fi_df.head(15))
-    print("\nTop 15 least Important Features:")
-    print(fi_df.tail(15))
+
+    # 3. Built-in importance (gain for LightGBM), per transformed column
+    if hasattr(model, "feature_importances_"):
+        fi_df = pd.DataFrame({'feature': feature_names, 'importance': model.feature_importances_}) \
+            .sort_values('importance', ascending=False)
+        fi_df.to_csv(os.path.join(output_dir, "feature_importance.csv"), index=False)
+
+    # 4. Stratified test subsample shared by permutation and SHAP
+    X_test, y_test = joblib.load(TEST_DATA_PATH)
+    y_test = np.asarray(y_test) - 1
+    all_idx = np.arange(len(y_test))
+    perm_idx = np.sort(stratified_subsample(all_idx, y_test, PERMUTATION_ROWS, random_state=RANDOM_STATE))
+    X_sample, y_sample = X_test[perm_idx], y_test[perm_idx]
+    del X_test
+
+    # 5. Grouped permutation importance
+    settings = {"rows": PERMUTATION_ROWS, "repeats": N_REPEATS, "seed": RANDOM_STATE,
+                "groups": groups, "test_data": file_hash(TEST_DATA_PATH)}
+    perm_df = _cached(model_path, "permutation", settings,
+                      lambda: permutation_importance(model, X_sample, y_sample, groups), force)
+    perm_df.to_csv(os.path.join(output_dir, "permutation_importance.csv"), index=False)
+    _plot(perm_df, "macro_f1_drop", "Top 20 Features by Permutation Importance (Macro F1 drop)",
+          os.path.join(output_dir, "permutation_importance.png"))
+    print("\nTop 15 Features by Permutation Importance:")
+    print(perm_df.head(15))
+
+    # 6. TreeSHAP summary
+    if with_shap:
+        shap_idx = stratified_subsample(np.arange(len(y_sample)), y_sample, SHAP_ROWS, random_state=RANDOM_STATE)
+        settings = {**settings, "shap_rows": SHAP_ROWS}
+        shap_df = _cached(model_path, "shap", settings,
+                          lambda: shap_importance(model, X_sample[np.sort(shap_idx)], groups), force)
+        if shap_df is None:
+            print(f"TreeSHAP not available for {type(model).__name__}")
+        else:
+            shap_df.to_csv(os.path.join(output_dir, "shap_importance.csv"), index=False)
+            _plot(shap_df, "mean_abs_shap", "Top 20 Features by Mean |SHAP|",
+                  os.path.join(output_dir, "shap_importance.png"))
+            print("\nTop 15 Features by Mean |SHAP|:")
+            print(shap_df.head(15))
+
+    print(f"\nFeature map and importance reports saved to {output_dir}")
 
 if __name__ == "__main__":
-    generate_feature_importance()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Feature importance report for a saved model")
+    parser.add_argument("--model", default=MODEL_PATH, help="path to a saved model.pkl")
+    parser.add_argument("--no-shap", action="store_true", help="skip the TreeSHAP summary")
+    parser.add_argument("--force", action="store_true", help="recompute instead of using the cache")
+    args = parser.parse_args()
+    generate_feature_importance(args.model, with_shap=not args.no_shap, force=args.force)
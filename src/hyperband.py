@@ -0,0 +1,211 @@
+import os
+import json
+import math
+import time
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+from joblib import Parallel, delayed
+from sklearn.metrics import f1_score, recall_score
+
+from src.binned_dataset import (
+    load_training_store, balanced_sample_weights, build_binned_dataset,
+    load_binned_dataset, subset, stratified_subsample
+)
+
+# ---------------- CONFIG ----------------
+OUTPUT_DIR = "evaluations/hyperband/"
+RANDOM_STATE = 42
+MODE = "hyperband"           # "hyperband" or "successive_halving"
+N_CONFIGS = 27               # Starting configs for plain successive halving
+ETA = 3                      # Keep the best 1/ETA configs at every rung
+MIN_ROWS = 50_000            # Rows at the first rung
+MAX_ROWS = None              # Rows at the last rung (None = whole training store)
+MIN_ROUNDS = 50
+MAX_ROUNDS = 1000
+VALIDATION_ROWS = 200_000    # Fixed stratified hold-out shared by every trial
+N_WORKERS = 4
+THREADS_PER_WORKER = max(1, (os.cpu_count() or 1) // N_WORKERS)
+
+BASE_PARAMS = {
+    "objective": "multiclass",
+    "num_class": 4,
+    "subsample_freq": 1,     # subsample is ignored by LightGBM without it
+    "verbose": -1,
+    "seed": RANDOM_STATE,
+}
+
+# (kind, low, high) or ("choice", options); centred on the hand-picked lightgbm_tuned values
+SEARCH_SPACE = {
+    "learning_rate": ("log", 0.02, 0.2),
+    "num_leaves": ("int_log", 31, 255),
+    "max_depth": ("choice", [-1, 8, 10, 12, 16]),
+    "min_child_samples": ("int_log", 20, 1000),
+    "colsample_bytree": ("uniform", 0.5, 1.0),
+    "subsample": ("uniform", 0.5, 1.0),
+    "reg_alpha": ("log", 1e-3, 10.0),
+    "reg_lambda": ("log", 1e-3, 10.0),
+}
+
+# ---------------- SEARCH SPACE ----------------
+
+def sample_config(rng, space=SEARCH_SPACE):
+    config = {}
+    for name, spec in space.items():
+        kind = spec[0]
+        if kind == "choice":
+            config[name] = spec[1][rng.integers(len(spec[1]))]
+        elif kind == "uniform":
+            config[name] = float(rng.uniform(spec[1], spec[2]))
+        elif kind == "log":
+            config[name] = float(np.exp(rng.uniform(np.log(spec[1]), np.log(spec[2]))))
+        elif kind == "int_log":
+            config[name] = int(round(np.exp(rng.uniform(np.log(spec[1]), np.log(spec[2])))))
+        else:
+            raise ValueError(f"Unknown search space kind: {kind}")
+    return config
+
+def hyperband_brackets(min_rows, max_rows, eta=ETA):
+    """Yield (s, n_configs) per Hyperband bracket, most exploratory first."""
+    s_max = int(math.floor(math.log(max_rows / min_rows, eta) + 1e-9))
+    for s in range(s_max, -1, -1):
+        yield s, int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+
+def rung_budget(rung, s, max_rows, eta=ETA):
+    """Rows and boosting rounds for a rung; both grow by eta per rung."""
+    fraction = eta ** (rung - s)
+    return int(max_rows * fraction), max(MIN_ROUNDS, int(MAX_ROUNDS * fraction))
+
+# ---------------- TRIAL ----------------
+
+def _feval(preds, data):
+    y_true = data.get_label()
+    y_pred = preds.argmax(axis=1)
+    return [
+        ("macro_f1", f1_score(y_true, y_pred, average="macro"), True),
+        ("class_4_recall", recall_score(y_true, y_pred, labels=[3], average="macro"), True),
+    ]
+
+def run_trial(binned_path, fit_idx, val_idx, config, n_rounds, num_threads):
+    """Train one config on a row subset of the shared binned dataset.
+
+    Runs inside a worker process; the binary Dataset is loaded once per worker.
+    """
+    dataset = load_binned_dataset(binned_path)
+    train_set = subset(dataset, fit_idx)
+    valid_set = subset(dataset, val_idx)
+    params = {**BASE_PARAMS, **config, "num_threads": num_threads}
+
+    history = {}
+    start = time.time()
+    booster = lgb.train(
+        params, train_set, num_boost_round=n_rounds,
+        valid_sets=[valid_set], valid_names=["validation"], feval=_feval,
+        callbacks=[
+            lgb.early_stopping(max(10, n_rounds // 10), first_metric_only=True, verbose=False),
+            lgb.record_evaluation(history),
+        ],
+    )
+    train_time = time.time() - start
+
+    best = booster.best_iteration or booster.current_iteration()
+    scores = {name: float(values[best - 1]) for name, values in history["validation"].items()}
+    return {**scores, "best_iteration": best, "train_time": train_time}
+
+# ---------------- SUCCESSIVE HALVING ----------------
+
+def successive_halving(configs, s, bracket, binned_path, y, fit_pool, val_idx, max_rows,
+                       log_path, run_id):
+    """Run one bracket: evaluate every config on a small budget, promote the top 1/ETA."""
+    survivors = configs
+    results = []
+    for rung in range(s + 1):
+        n_rows, n_rounds = rung_budget(rung, s, max_rows)
+        # Every config in the rung sees the same stratified sample.
+        fit_idx = stratified_subsample(fit_pool, y, n_rows, random_state=RANDOM_STATE + rung)
+        print(f"Bracket {bracket} rung {rung}: {len(survivors)} configs x {len(fit_idx)} rows x {n_rounds} rounds")
+
+        # joblib memory-maps the large index arrays for the workers.
+        scores = Parallel(n_jobs=N_WORKERS)(
+            delayed(run_trial)(binned_path, fit_idx, val_idx, config, n_rounds, THREADS_PER_WORKER)
+            for _, config in survivors
+        )
+        results = []
+        for (config_id, config), score in zip(survivors, scores):
+            record = {
+                "run_id": run_id, "config_id": config_id, "bracket": bracket, "rung": rung,
+                "n_rows": int(len(fit_idx)), "n_rounds": n_rounds,
+                **score, "params": config,
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            results.append(record)
+            with open(log_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+        results.sort(key=lambda r: (r["macro_f1"], r["class_4_recall"]), reverse=True)
+        keep = {r["config_id"] for r in results[:max(1, len(results) // ETA)]}
+        survivors = [(cid, cfg) for cid, cfg in survivors if cid in keep]
+    return results[0]
+
+def load_trials(log_path=os.path.join(OUTPUT_DIR, "trials.jsonl")):
+    """Trial log as a flat DataFrame (params become params.<name> columns) for querying."""
+    with open(log_path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return pd.json_normalize(records)
+
+# ---------------- MAIN ----------------
+
+def main():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    log_path = os.path.join(OUTPUT_DIR, "trials.jsonl")
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+
+    X_train, y_train = load_training_store()
+    binned_path = build_binned_dataset(X_train, y_train, weight=balanced_sample_weights(y_train))
+    del X_train
+
+    all_idx = np.arange(len(y_train))
+    val_idx = stratified_subsample(all_idx, y_train, VALIDATION_ROWS, random_state=RANDOM_STATE)
+    fit_pool = np.setdiff1d(all_idx, val_idx)
+    max_rows = min(MAX_ROWS or len(fit_pool), len(fit_pool))
+
+    if MODE == "hyperband":
+        brackets = list(hyperband_brackets(MIN_ROWS, max_rows))
+    elif MODE == "successive_halving":
+        s = int(math.floor(math.log(max_rows / MIN_ROWS, ETA) + 1e-9))
+        brackets = [(s, N_CONFIGS)]
+    else:
+        raise ValueError(f"Unknown search mode: {MODE}")
+
+    rng = np.random.default_rng(RANDOM_STATE)
+    next_id = 0
+    bracket_winners = []
+    for bracket, (s, n_configs) in enumerate(brackets):
+        configs = [(next_id + i, sample_config(rng)) for i in range(n_configs)]
+        next_id += n_configs
+        winner = successive_halving(configs, s, bracket, binned_path, y_train,
+                                    fit_pool, val_idx, max_rows, log_path, run_id)
+        bracket_winners.append(winner)
+        print(f"Bracket {bracket} winner: config {winner['config_id']} | Macro F1: {winner['macro_f1']:.4f}")
+
+    # Every bracket's last rung runs on the full budget, so winners are comparable.
+    best = max(bracket_winners, key=lambda r: (r["macro_f1"], r["class_4_recall"]))
+    with open(os.path.join(OUTPUT_DIR, "best_params.json"), "w") as f:
+        json.dump({
+            "run_id": run_id,
+            "config_id": best["config_id"],
+            "params": {**BASE_PARAMS, **best["params"], "n_estimators": best["best_iteration"]},
+            "validation": {"macro_f1": best["macro_f1"], "class_4_recall": best["class_4_recall"]},
+        }, f, indent=4)
+
+    print("\n" + "="*30)
+    print("TOP TRIALS")
+    print("="*30)
+    trials = load_trials(log_path)
+    trials = trials[trials["run_id"] == run_id]
+    print(trials.sort_values(["n_rows", "macro_f1"], ascending=False).head(10)[
+        ["config_id", "bracket", "rung", "n_rows", "n_rounds", "macro_f1", "class_4_recall", "train_time"]
+    ])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from joblib import Parallel, delayed
+
+from src.binned_dataset import (
+    load_training_store, balanced_sample_weights, build_binned_dataset, share_matrix,
+    load_matrix, stratified_subsample, train_on_subset
+)
+from src.cross_validation import registered_models, build_model
+from src.evaluation import confusion_matrix, metrics_from_confusion, iter_chunks, predict_labels, N_CLASSES
+from src.benchmark_report import peak_rss_mb
+
+# ---------------- CONFIG ----------------
+DATA_DIR = "data/training_ready/"
+OUTPUT_DIR = "evaluations/learning_curve/"
+MIN_ROWS = 50_000
+GROWTH = 2.0                 # Each point trains on GROWTH x the rows of the previous one
+CORE_BUDGET = os.cpu_count() or 1
+N_WORKERS = 4                # Points trained at the same time; each gets CORE_BUDGET // N_WORKERS threads
+RANDOM_STATE = 42
+
+# ---------------- SIZES ----------------
+
+def curve_sizes(n_total, min_rows=MIN_ROWS, growth=GROWTH):
+    """Geometric row counts from min_rows up to (and always including) the full store."""
+    sizes = []
+    n_rows = min_rows
+    while n_rows < n_total:
+        sizes.append(int(n_rows))
+        n_rows *= growth
+    return sizes + [n_total]
+
+def worker_layout(n_points, core_budget=CORE_BUDGET, n_workers=N_WORKERS):
+    """(workers, threads per worker) that keep workers x threads within the core budget."""
+    workers = max(1, min(n_workers, n_points, core_budget))
+    return workers, max(1, core_budget // workers)
+
+# ---------------- POINTS ----------------
+
+def _predict_test(model, test_path):
+    """Test-store confusion matrix, predicted chunk by chunk from the memory-mapped store."""
+    X_test, y_test = load_matrix(test_path)
+    y_test = np.asarray(y_test)
+    y_test = y_test - 1 if y_test.min() == 1 else y_test
+    cm = np.zeros((N_CLASSES, N_CLASSES), dtype=np.int64)
+    for rows in iter_chunks(X_test.shape[0]):
+        if hasattr(model, "predict_proba"):
+            preds = predict_labels(model, X_test[rows])
+        else:   # lgb.Booster returns class probabilities
+            preds = model.predict(X_test[rows]).argmax(axis=1)
+        cm += confusion_matrix(y_test[rows], preds)
+    return cm
+
+def fit_point(config, indices, y, matrix_path, binned_path, test_path, n_threads):
+    """Train one curve point on the given training rows and score it on the test store."""
+    start = time.time()
+    if config["class"].__name__ == "LGBMClassifier":
+        # Row subset of the shared binned file; balanced weights are already in it.
+        model = train_on_subset(indices, dict(config["params"]), binned_path, num_threads=n_threads)
+    else:
+        indices = np.sort(indices)
+        model, fit_kwargs = build_model(config, y[indices], n_threads)
+        model.fit(load_matrix(matrix_path)[indices], y[indices], **fit_kwargs)
+    train_time = time.time() - start
+
+    m = metrics_from_confusion(_predict_test(model, test_path))
+    return {
+        "n_rows": len(indices),
+        "train_time_s": train_time,
+        "macro_f1": float(m["macro_f1"]),
+        "class_4_recall": float(m["class_4_recall"]),
+        **{f"severity_{c + 1}_recall": float(m["recall"][c]) for c in range(N_CLASSES)},
+        "peak_rss_mb": peak_rss_mb(),
+        "n_threads": n_threads,
+    }
+
+def learning_curve(name, config, y, matrix_path, binned_path, test_path, sizes,
+                   core_budget=CORE_BUDGET, n_workers=N_WORKERS):
+    """One point per size, trained in parallel worker processes within the core budget.
+
+    Workers share the memory-mapped training matrix and the binned LightGBM
+    dataset on disk and only receive row indices. The largest points are
+    submitted first so the longest fits do not start last.
+    """
+    all_idx = np.arange(len(y))
+    samples = [stratified_subsample(all_idx, y, n_rows, random_state=RANDOM_STATE)
+               for n_rows in sorted(sizes, reverse=True)]
+    workers, threads = worker_layout(len(samples), core_budget, n_workers)
+    print(f"Learning curve for {name}: {len(samples)} points on {workers} workers x {threads} threads")
+
+    start = time.time()
+    points = Parallel(n_jobs=workers)(
+        delayed(fit_point)(config, idx, y, matrix_path, binned_path, test_path, threads)
+        for idx in samples
+    )
+    wall_time = time.time() - start
+    table = pd.DataFrame(points).sort_values("n_rows").reset_index(drop=True)
+    table.insert(0, "model", name)
+    table.attrs["wall_time_s"] = wall_time
+    return table
+
+# ---------------- REPORT ----------------
+
+def cheapest_size(table, min_macro_f1=None, min_class_4_recall=None):
+    """Row of the fastest-to-train point that meets the quality bar (None if none does)."""
+    ok = np.ones(len(table), dtype=bool)
+    if min_macro_f1 is not None:
+        ok &= table["macro_f1"] >= min_macro_f1
+    if min_class_4_recall is not None:
+        ok &= table["class_4_recall"] >= min_class_4_recall
+    if not ok.any():
+        return None
+    return table[ok].sort_values("train_time_s").iloc[0]
+
+def plot_curve(table, path, min_macro_f1=None, min_class_4_recall=None):
+    """Macro F1 and class-4 recall against training time, each point labelled with its row count."""
+    fig, axes = plt.subplots(1, 2, figsize=(14, 5))
+    for ax, metric, bar in zip(axes, ["macro_f1", "class_4_recall"], [min_macro_f1, min_class_4_recall]):
+        ax.plot(table["train_time_s"], table[metric], marker="o")
+        for _, row in table.iterrows():
+            ax.annotate(f"{int(row['n_rows']):,}", (row["train_time_s"], row[metric]),
+                        textcoords="offset points", xytext=(4, -10), fontsize=8)
+        if bar is not None:
+            ax.axhline(bar, color="grey", linestyle="--")
+        ax.set_xscale("log")
+        ax.set_xlabel("Training time (s)")
+        ax.set_ylabel(metric)
+    fig.suptitle(f"Learning curve - {table['model'].iloc[0]}")
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+# ---------------- MAIN ----------------
+
+def main(model="lightgbm_tuned", min_rows=MIN_ROWS, growth=GROWTH, core_budget=CORE_BUDGET,
+         min_macro_f1=None, min_class_4_recall=None):
+    configs = {name: config for name, config, _ in registered_models()}
+    X_train, y_train = load_training_store()
+    # Bin and dump the training store once; every point reuses both files.
+    binned_path = build_binned_dataset(X_train, y_train, weight=balanced_sample_weights(y_train))
+    matrix_path = share_matrix(X_train)
+    del X_train
+    test_path = os.path.join(DATA_DIR, "test_data.pkl")
+
+    sizes = curve_sizes(len(y_train), min_rows, growth)
+    table = learning_curve(model, configs[model], y_train, matrix_path, binned_path, test_path,
+                           sizes, core_budget=core_budget)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    csv_path = os.path.join(OUTPUT_DIR, f"{model}_learning_curve.csv")
+    png_path = os.path.join(OUTPUT_DIR, f"{model}_learning_curve.png")
+    table.to_csv(csv_path, index=False)
+    plot_curve(table, png_path, min_macro_f1, min_class_4_recall)
+
+    print("\n" + table[["n_rows", "train_time_s", "macro_f1", "class_4_recall"]].round(4).to_string(index=False))
+    print(f"Wall time {table.attrs['wall_time_s']:.1f}s | saved {csv_path} and {png_path}")
+    if min_macro_f1 is not None or min_class_4_recall is not None:
+        best = cheapest_size(table, min_macro_f1, min_class_4_recall)
+        if best is None:
+            print("No training size meets the quality bar.")
+        else:
+            print(f"Cheapest size meeting the bar: {int(best['n_rows']):,} rows "
+                  f"({best['train_time_s']:.1f}s, Macro F1 {best['macro_f1']:.4f}, "
+                  f"C4 Recall {best['class_4_recall']:.4f})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Learning curve over geometric stratified subsamples")
+    parser.add_argument("--model", default="lightgbm_tuned", help="name of a model in the training scripts")
+    parser.add_argument("--min-rows", type=int, default=MIN_ROWS)
+    parser.add_argument("--growth", type=float, default=GROWTH)
+    parser.add_argument("--cores", type=int, default=CORE_BUDGET, help="total cores shared by the workers")
+    parser.add_argument("--min-macro-f1", type=float, help="quality bar: report the cheapest size meeting it")
+    parser.add_argument("--min-class-4-recall", type=float)
+    args = parser.parse_args()
+    main(args.model, args.min_rows, args.growth, args.cores, args.min_macro_f1, args.min_class_4_recall)
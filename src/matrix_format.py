@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from src.binned_dataset import load_training_store, stratified_subsample
+from src.cross_validation import registered_models, build_model
+from src.experiment_cache import data_fingerprint
+from src.registry import _read_json
+from src.benchmark_report import BENCHMARK_DIR
+
+# ---------------- CONFIG ----------------
+DATA_DIR = "data/training_ready/"
+FORMAT_DIR = "data/training_ready/formats/"
+CHOICE_PATH = "data/training_ready/formats/format_choice.json"
+BENCHMARK_PATH = os.path.join(BENCHMARK_DIR, "matrix_format.csv")
+DEFAULT_FORMAT = "csr"       # What the ColumnTransformer store already is
+BENCH_ROWS = 200_000         # Stratified training rows per micro-benchmark fit
+BENCH_ESTIMATORS = 50        # Trees/rounds per micro-benchmark fit (full configs take hours)
+N_REPEATS = 2                # Best of N fits per (model, format)
+MAX_DENSE_GB = 8.0           # Skip dense float32 when the full store would not fit
+N_THREADS = os.cpu_count() or 1
+RANDOM_STATE = 42
+
+# Layouts each library can train on without changing what it learns. XGBoost treats entries
+# missing from a sparse matrix as missing values, but explicit zeros in a dense one as 0.0,
+# so a dense-trained booster would disagree with the CSR inputs it is evaluated and served on.
+CANDIDATES = {
+    "LogisticRegression": ["csr", "dense32"],
+    "RandomForestClassifier": ["csr", "csc", "dense32"],
+    "LGBMClassifier": ["csr", "csc", "dense32"],
+    "XGBClassifier": ["csr", "csc"],
+    "CatBoostClassifier": ["csr", "dense32"],
+}
+
+# ---------------- FORMATS ----------------
+
+def density(X):
+    """Fraction of stored (non-zero) entries."""
+    if sp.issparse(X):
+        return X.nnz / (X.shape[0] * X.shape[1])
+    return float(np.count_nonzero(X)) / X.size
+
+def dense_size_gb(X):
+    return X.shape[0] * X.shape[1] * np.dtype(np.float32).itemsize / 1024 ** 3
+
+def convert(X, fmt):
+    """X in the given layout: "csr", "csc" or "dense32" (C-ordered float32 array)."""
+    if fmt == "csr":
+        return X.tocsr() if sp.issparse(X) else sp.csr_matrix(X)
+    if fmt == "csc":
+        return X.tocsc() if sp.issparse(X) else sp.csc_matrix(X)
+    if fmt == "dense32":
+        dense = X.toarray() if sp.issparse(X) else X
+        return np.ascontiguousarray(dense, dtype=np.float32)
+    raise ValueError(f"Unknown matrix format: {fmt}")
+
+def matrix_size_mb(X):
+    if sp.issparse(X):
+        parts = [X.data, X.indices, X.indptr]
+        return sum(a.nbytes for a in parts) / 1024 ** 2
+    return X.nbytes / 1024 ** 2
+
+def cached_store(X, fmt, data_dir=DATA_DIR, format_dir=FORMAT_DIR):
+    """Training store converted to fmt, written once to format_dir and reused while train_data.pkl is unchanged."""
+    if fmt == DEFAULT_FORMAT:
+        return convert(X, fmt)
+    path = os.path.join(format_dir, f"train_{fmt}.pkl")
+    source = data_fingerprint(os.path.join(data_dir, "train_data.pkl"))
+    meta = _read_json(path + ".json")
+    if meta and meta["source_sha256"] == source and os.path.exists(path):
+        return joblib.load(path)
+
+    start = time.time()
+    converted = convert(X, fmt)
+    os.makedirs(format_dir, exist_ok=True)
+    joblib.dump(converted, path)
+    with open(path + ".json", "w") as f:
+        json.dump({"source_sha256": source, "format": fmt, "shape": list(converted.shape),
+                   "convert_time_s": time.time() - start}, f, indent=4)
+    return converted
+
+# ---------------- SELECTION ----------------
+
+def select_format(model_class, choice_path=CHOICE_PATH):
+    """Layout picked by the micro-benchmark for this model class (CSR until one has been run)."""
+    choices = _read_json(choice_path) or {}
+    return choices.get(model_class.__name__, {}).get("format", DEFAULT_FORMAT)
+
+def training_matrix(X, model_class, data_dir=DATA_DIR):
+    """The training store in the layout selected for model_class, converted and cached on first use."""
+    fmt = select_format(model_class)
+    if fmt != DEFAULT_FORMAT:
+        print(f"Training {model_class.__name__} on {fmt} input")
+    return cached_store(X, fmt, data_dir)
+
+# ---------------- MICRO-BENCHMARK ----------------
+
+def _short_config(config, n_estimators=BENCH_ESTIMATORS):
+    params = dict(config["params"])
+    for key in ("n_estimators", "iterations"):
+        if key in params:
+            params[key] = min(params[key], n_estimators)
+    if "max_iter" in params:
+        params["max_iter"] = min(params["max_iter"], n_estimators)
+    return {**config, "params": params}
+
+def time_fit(config, X, y, n_repeats=N_REPEATS, n_threads=N_THREADS):
+    """Best wall time of n_repeats fits."""
+    times = []
+    for _ in range(n_repeats):
+        model, fit_kwargs = build_model(config, y, n_threads)
+        start = time.time()
+        model.fit(X, y, **fit_kwargs)
+        times.append(time.time() - start)
+    return min(times)
+
+def benchmark_formats(models=None, n_rows=BENCH_ROWS, n_threads=N_THREADS):
+    """Time one short fit per (model class, candidate layout) on the same stratified sample.
+
+    Returns:
+        DataFrame with one row per (model, format)
+    """
+    X, y = load_training_store()
+    store_density = density(X)
+    dense_ok = dense_size_gb(X) <= MAX_DENSE_GB
+    rows_idx = np.sort(stratified_subsample(np.arange(len(y)), y, n_rows, random_state=RANDOM_STATE))
+    X_sample, y_sample = X[rows_idx], y[rows_idx]
+    print(f"Store density {store_density:.3f}; dense float32 needs {dense_size_gb(X):.1f} GB")
+
+    seen, rows = set(), []
+    for name, config, _ in registered_models():
+        library = config["class"].__name__
+        if (models and name not in models) or library in seen or library not in CANDIDATES:
+            continue
+        seen.add(library)   # One representative config per library
+        short = _short_config(config)
+        for fmt in CANDIDATES[library]:
+            if fmt == "dense32" and not dense_ok:
+                continue
+            start = time.time()
+            X_fmt = convert(X_sample, fmt)
+            convert_time = time.time() - start
+            fit_time = time_fit(short, X_fmt, y_sample, n_threads=n_threads)
+            print(f"{library:<24} {fmt:<8} fit {fit_time:7.2f}s | convert {convert_time:.2f}s")
+            rows.append({"model": name, "library": library, "format": fmt, "n_rows": len(y_sample),
+                         "density": store_density, "fit_time_s": fit_time,
+                         "convert_time_s": convert_time, "size_mb": matrix_size_mb(X_fmt)})
+    return pd.DataFrame(rows)
+
+def choose_formats(results):
+    """Fastest layout per library; CSR wins ties within 5% since it needs no converted copy."""
+    choices = {}
+    for library, group in results.groupby("library"):
+        csr_time = group.loc[group["format"] == DEFAULT_FORMAT, "fit_time_s"].min()
+        best = group.loc[group["fit_time_s"].idxmin()]
+        fmt = best["format"] if best["fit_time_s"] < 0.95 * csr_time else DEFAULT_FORMAT
+        choices[library] = {
+            "format": fmt,
+            "speedup_vs_csr": float(csr_time / group.loc[group["format"] == fmt, "fit_time_s"].min()),
+            "fit_time_s": {r["format"]: float(r["fit_time_s"]) for _, r in group.iterrows()},
+            "density": float(group["density"].iloc[0]),
+            "n_rows": int(group["n_rows"].iloc[0]),
+        }
+    return choices
+
+# ---------------- MAIN ----------------
+
+def main(models=None, n_rows=BENCH_ROWS):
+    results = benchmark_formats(models, n_rows)
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    results.to_csv(BENCHMARK_PATH, index=False)
+
+    choices = choose_formats(results)
+    os.makedirs(os.path.dirname(CHOICE_PATH), exist_ok=True)
+    with open(CHOICE_PATH, "w") as f:
+        json.dump(choices, f, indent=4)
+
+    print("\n" + results.pivot(index="library", columns="format", values="fit_time_s").round(2).to_string())
+    for library, choice in choices.items():
+        print(f"{library}: {choice['format']} ({choice['speedup_vs_csr']:.2f}x vs csr)")
+    print(f"\nSaved {BENCHMARK_PATH} and {CHOICE_PATH}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark and select the training matrix layout per model")
+    parser.add_argument("--models", nargs="+", help="restrict to these model names")
+    parser.add_argument("--rows", type=int, default=BENCH_ROWS)
+    args = parser.parse_args()
+    main(args.models, args.rows)
@@ -0,0 +1,309 @@
+import os
+import copy
+import json
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.special import softmax
+
+from preprocessing.transform import get_preprocessor, load_split, load_test_frame
+from src.binned_dataset import stratified_subsample
+from src.evaluation import metrics_from_confusion, confusion_matrix, predict_in_chunks, evaluate_predictions
+from src.feature_importance import feature_groups
+from src.cross_validation import build_model
+from src.benchmark_inference import benchmark_model
+from src.benchmark_report import append_records
+from src.native_export import export_native, NATIVE_FORMATS
+from src.registry import ModelRegistry
+
+# ---------------- CONFIG ----------------
+DATA_DIR = "data/training_ready/"
+MODEL_DIR = "model/fine/lightgbm_tuned"
+PREPROCESSOR_PATH = "preprocessing/new/preprocessor.pkl"
+# Outside the benchmark / slice tools' artifact dirs: a slimmed model may take fewer columns than test_data.pkl
+SLIM_ROOT = "models/slim/"
+MACRO_F1_TOLERANCE = 0.005       # Allowed absolute drop vs the full model
+CLASS_4_RECALL_TOLERANCE = 0.01
+PREFIX_STEP = 25                 # Candidate prefixes: every PREFIX_STEP rounds
+SELECTION_ROWS = 200_000         # Stratified test rows used to choose; the rest of the test set reports
+SEARCH_TRAIN_ROWS = 1_000_000    # Training rows for each feature-subset candidate refit
+LATENCY_BATCH_SIZES = [1, 1_000]
+N_THREADS = -1
+RANDOM_STATE = 42
+
+# ---------------- TREE PREFIX ----------------
+
+def n_rounds(model):
+    library = type(model).__name__
+    if library == "LGBMClassifier":
+        return model.booster_.current_iteration()
+    if library == "XGBClassifier":
+        return model.get_booster().num_boosted_rounds()
+    if library == "CatBoostClassifier":
+        return model.tree_count_
+    raise ValueError(f"{library} is not a boosted model; nothing to slim")
+
+def prefix_probabilities(model, X, prefixes):
+    """Yields (k, probabilities of the first k rounds) for ascending k.
+
+    LightGBM scores only the new rounds of each step and adds their raw
+    scores, so every prefix together costs one full prediction.
+    """
+    library = type(model).__name__
+    if library == "LGBMClassifier":
+        raw, done = 0, 0
+        for k in prefixes:
+            raw = raw + model.booster_.predict(X, start_iteration=done, num_iteration=k - done, raw_score=True)
+            done = k
+            yield k, softmax(raw, axis=1)
+    elif library == "XGBClassifier":
+        for k in prefixes:
+            yield k, model.predict_proba(X, iteration_range=(0, k))
+    else:
+        for k in prefixes:
+            yield k, model.predict_proba(X, ntree_end=k)
+
+def truncate(model, k):
+    """Copy of a fitted booster keeping only its first k rounds."""
+    library = type(model).__name__
+    slim = copy.deepcopy(model)
+    if library == "LGBMClassifier":
+        import lightgbm as lgb
+        slim._Booster = lgb.Booster(model_str=model.booster_.model_to_string(num_iteration=k))
+    elif library == "XGBClassifier":
+        slim._Booster = model.get_booster()[:k]
+    else:
+        slim.shrink(ntree_end=k)
+    return slim
+
+def _metrics(y_true, y_pred):
+    metrics = metrics_from_confusion(confusion_matrix(y_true, y_pred))
+    return {"macro_f1": float(metrics["macro_f1"]), "class_4_recall": float(metrics["class_4_recall"])}
+
+def within_tolerance(metrics, baseline, f1_tolerance=MACRO_F1_TOLERANCE,
+                     recall_tolerance=CLASS_4_RECALL_TOLERANCE):
+    return (baseline["macro_f1"] - metrics["macro_f1"] <= f1_tolerance and
+            baseline["class_4_recall"] - metrics["class_4_recall"] <= recall_tolerance)
+
+def smallest_prefix(model, X, y, step=PREFIX_STEP, **tolerances):
+    """Fewest rounds whose macro F1 and class-4 recall stay within tolerance of the full model.
+
+    Returns:
+        (k, DataFrame with the metrics of every candidate prefix)
+    """
+    total = n_rounds(model)
+    prefixes = sorted(set(range(step, total, step)) | {total})
+    rows = [{"rounds": k, **_metrics(y, model.classes_[proba.argmax(axis=1)])}
+            for k, proba in prefix_probabilities(model, X, prefixes)]
+    curve = pd.DataFrame(rows)
+    baseline = rows[-1]
+    k = next(row["rounds"] for row in rows if within_tolerance(row, baseline, **tolerances))
+    return int(k), curve
+
+# ---------------- FEATURE SUBSET ----------------
+
+def group_gain(model, groups):
+    """Total split gain of each original feature (its one-hot columns summed), highest first."""
+    library = type(model).__name__
+    if library == "LGBMClassifier":
+        gain = model.booster_.feature_importance(importance_type="gain")
+    elif library == "XGBClassifier":
+        scores = model.get_booster().get_score(importance_type="total_gain")
+        gain = np.array([scores.get(f"f{i}", 0.0) for i in range(model.n_features_in_)])
+    else:
+        gain = model.get_feature_importance()
+    totals = {feature: float(np.sum(gain[start:stop])) for feature, (start, stop) in groups.items()}
+    return sorted(totals, key=totals.get, reverse=True)
+
+def group_columns(groups, features):
+    """Transformed column indices of the given original features, in preprocessor order."""
+    return np.sort(np.concatenate([np.arange(*groups[feature]) for feature in features]))
+
+def refit(model, rounds, X, y, n_threads=N_THREADS):
+    """Same hyperparameters and balanced weights, first `rounds` rounds only, on X."""
+    params = model.get_params()
+    params["iterations" if type(model).__name__ == "CatBoostClassifier" else "n_estimators"] = rounds
+    for key in ("class_weight", "class_weights"):
+        params.pop(key, None)   # build_model recomputes them for y
+    fresh, fit_kwargs = build_model({"class": type(model), "params": params}, y, n_threads)
+    return fresh.fit(X, y, **fit_kwargs)
+
+def smallest_feature_subset(model, rounds, groups, X_fit, y_fit, X_sel, y_sel, **tolerances):
+    """Fewest top-gain original features whose refit stays within tolerance of an all-feature refit.
+
+    Candidates keep the k highest-gain features; k is binary-searched, so
+    about log2(n_features) models are trained on the X_fit sample.
+
+    Returns:
+        (kept features, DataFrame of the candidates tried)
+    """
+    ranked = group_gain(model, groups)
+    tried = {}
+
+    def score(k):
+        if k not in tried:
+            columns = group_columns(groups, ranked[:k])
+            candidate = refit(model, rounds, X_fit[:, columns], y_fit)
+            preds, _ = predict_in_chunks(candidate, X_sel[:, columns])
+            tried[k] = _metrics(y_sel, preds)
+            print(f"  top {k:>2} features | macro F1 {tried[k]['macro_f1']:.4f} | "
+                  f"C4 recall {tried[k]['class_4_recall']:.4f}")
+        return tried[k]
+
+    baseline = score(len(ranked))
+    low, high = 1, len(ranked)
+    while low < high:
+        mid = (low + high) // 2
+        if within_tolerance(score(mid), baseline, **tolerances):
+            high = mid
+        else:
+            low = mid + 1
+    candidates = pd.DataFrame([{"n_features": k, **m} for k, m in sorted(tried.items())])
+    return ranked[:low], candidates
+
+def reduced_preprocessor(preprocessor, features, X_train_raw):
+    """Preprocessor producing only the columns of `features`, refit on the same training rows.
+
+    The imputer medians, scaler moments and one-hot categories are per column,
+    so the refit reproduces the kept columns of the full preprocessor exactly.
+    """
+    subsets = {name: [c for c in columns if c in features]
+               for name, _, columns in preprocessor.transformers_ if name != "remainder"}
+    reduced = get_preprocessor(subsets["num"], subsets["cat"], subsets["bool"])
+    return reduced.fit(X_train_raw[[c for cols in subsets.values() for c in cols]])
+
+# ---------------- REPORT ----------------
+
+def _sizes(output_dir):
+    files = ["model.pkl", "preprocessor.pkl"] + [NATIVE_FORMATS[k][1] for k in NATIVE_FORMATS]
+    return {f: os.path.getsize(os.path.join(output_dir, f)) for f in files
+            if os.path.exists(os.path.join(output_dir, f))}
+
+def latency_report(model_dir, slim_dir, raw, n_threads=1):
+    """p50 latency of the original and slimmed model (with their own preprocessors) per batch size."""
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+    records = []
+    for name, directory, preprocessor_path in [
+        (os.path.basename(model_dir), model_dir, PREPROCESSOR_PATH),
+        (os.path.basename(slim_dir), slim_dir, os.path.join(slim_dir, "preprocessor.pkl")),
+    ]:
+        preprocessor = joblib.load(preprocessor_path)
+        processed = sp.csr_matrix(preprocessor.transform(raw))
+        records += benchmark_model(name, os.path.join(directory, "model.pkl"), raw, processed,
+                                   preprocessor, LATENCY_BATCH_SIZES, n_threads, run_id)
+    append_records(records, "inference")
+    df = pd.DataFrame(records)
+    return df.pivot_table(index=["batch_size", "preprocessing"], columns="model", values="p50_ms")
+
+# ---------------- MAIN ----------------
+
+def slim_model(model_dir=MODEL_DIR, with_features=False, **tolerances):
+    model = joblib.load(os.path.join(model_dir, "model.pkl"))
+    preprocessor = joblib.load(PREPROCESSOR_PATH)
+    groups = feature_groups(preprocessor)
+    slim_dir = os.path.join(SLIM_ROOT, os.path.basename(os.path.normpath(model_dir)) + "_slim")
+    os.makedirs(slim_dir, exist_ok=True)
+
+    # Choose on a stratified slice of the test set; report on the rest.
+    X_test, y_test = joblib.load(os.path.join(DATA_DIR, "test_data.pkl"))
+    y_test = np.asarray(y_test) - 1
+    sel_idx = np.sort(stratified_subsample(np.arange(len(y_test)), y_test, min(SELECTION_ROWS, len(y_test) // 2),
+                                           random_state=RANDOM_STATE))
+    report_mask = np.ones(len(y_test), dtype=bool)
+    report_mask[sel_idx] = False
+    X_sel, y_sel = X_test[sel_idx], y_test[sel_idx]
+    original_preds, _ = predict_in_chunks(model, X_test[report_mask])
+    original_metrics = _metrics(y_test[report_mask], original_preds)
+
+    # 1. Tree prefix
+    print(f"Scoring tree prefixes of {model_dir} ({n_rounds(model)} rounds)...")
+    rounds, curve = smallest_prefix(model, X_sel, y_sel, **tolerances)
+    curve.to_csv(os.path.join(slim_dir, "prefix_curve.csv"), index=False)
+    print(f"Smallest prefix within tolerance: {rounds} of {n_rounds(model)} rounds")
+    slim = truncate(model, rounds)
+    slim_preprocessor = preprocessor
+    kept = list(groups)
+
+    # 2. Feature subset (refits the prefix-sized model on fewer input features)
+    if with_features:
+        X_train, y_train = joblib.load(os.path.join(DATA_DIR, "train_data.pkl"))
+        y_train = np.asarray(y_train) - 1
+        fit_idx = np.sort(stratified_subsample(np.arange(len(y_train)), y_train, SEARCH_TRAIN_ROWS,
+                                               random_state=RANDOM_STATE))
+        print(f"Searching feature subsets on {len(fit_idx)} training rows...")
+        kept, candidates = smallest_feature_subset(slim, rounds, groups, X_train[fit_idx], y_train[fit_idx],
+                                                   X_sel, y_sel, **tolerances)
+        candidates.to_csv(os.path.join(slim_dir, "feature_candidates.csv"), index=False)
+        if len(kept) < len(groups):
+            columns = group_columns(groups, kept)
+            print(f"Refitting on {len(kept)} of {len(groups)} features ({len(columns)} columns)...")
+            slim = refit(model, rounds, X_train[:, columns], y_train)
+            X_train_raw, _, _, _ = load_split()
+            slim_preprocessor = reduced_preprocessor(preprocessor, kept, X_train_raw)
+            del X_train_raw
+            X_test = X_test[:, columns]
+        del X_train
+
+    # 3. Save: model, its preprocessor, metrics on the report rows, native export
+    joblib.dump(slim, os.path.join(slim_dir, "model.pkl"))
+    joblib.dump(slim_preprocessor, os.path.join(slim_dir, "preprocessor.pkl"))
+    feature_names = [str(n) for n in slim_preprocessor.get_feature_names_out()]
+    with open(os.path.join(slim_dir, "feature_map.json"), "w") as f:
+        json.dump({str(i): name for i, name in enumerate(feature_names)}, f, indent=4)
+
+    preds, inference_time = predict_in_chunks(slim, X_test[report_mask])
+    metrics = evaluate_predictions(y_test[report_mask], preds, inference_time)
+    with open(os.path.join(slim_dir, "metrics.json"), "w") as f:
+        json.dump(metrics, f, indent=4)
+    export_native(slim, slim_dir, feature_names, os.path.join(slim_dir, "preprocessor.pkl"))
+
+    # 4. Latency and size against the original
+    raw, _ = load_test_frame()
+    check = sp.csr_matrix(slim_preprocessor.transform(raw.iloc[:1000]))
+    if abs(check - X_test[:1000]).max() > 1e-3:  # float32 source columns
+        raise ValueError("Slim preprocessor output does not match the training columns")
+    raw = raw.sample(n=min(max(LATENCY_BATCH_SIZES), len(raw)), random_state=RANDOM_STATE).reset_index(drop=True)
+    latency = latency_report(model_dir, slim_dir, raw)
+    original_sizes, slim_sizes = _sizes(model_dir), _sizes(slim_dir)
+    original_sizes["preprocessor.pkl"] = os.path.getsize(PREPROCESSOR_PATH)
+    report = {
+        "source": model_dir,
+        "tolerance": {"macro_f1": tolerances.get("f1_tolerance", MACRO_F1_TOLERANCE),
+                      "class_4_recall": tolerances.get("recall_tolerance", CLASS_4_RECALL_TOLERANCE)},
+        "rounds": {"original": n_rounds(model), "slim": rounds},
+        "features": {"original": len(groups), "slim": len(kept), "kept": kept,
+                     "columns": len(feature_names)},
+        "metrics": {"original": original_metrics,
+                    "slim": {k: metrics[k] for k in ("macro_f1", "class_4_recall")},
+                    "n_rows": int(report_mask.sum())},
+        "size_bytes": {"original": original_sizes, "slim": slim_sizes},
+        "p50_ms": {f"batch_{b}_preprocess_{p}": row.to_dict() for (b, p), row in latency.iterrows()},
+    }
+    with open(os.path.join(slim_dir, "slim_report.json"), "w") as f:
+        json.dump(report, f, indent=4)
+    ModelRegistry().register(slim_dir, preprocessor_path=os.path.join(slim_dir, "preprocessor.pkl"))
+
+    print("\n" + "="*30)
+    print("SLIMMING SUMMARY")
+    print("="*30)
+    print(f"Rounds:   {n_rounds(model)} -> {rounds}")
+    print(f"Features: {len(groups)} -> {len(kept)}")
+    print(f"Macro F1: {original_metrics['macro_f1']:.4f} -> {metrics['macro_f1']:.4f} | "
+          f"C4 Recall: {original_metrics['class_4_recall']:.4f} -> {metrics['class_4_recall']:.4f}")
+    print(f"model.pkl: {original_sizes['model.pkl'] / 1024**2:.1f} MB -> {slim_sizes['model.pkl'] / 1024**2:.1f} MB")
+    print(latency.round(3).to_string())
+    print(f"\nSlimmed model saved to {slim_dir}")
+    return slim_dir
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Smallest tree prefix / feature subset within a metric tolerance")
+    parser.add_argument("--model-dir", default=MODEL_DIR, help="directory holding model.pkl")
+    parser.add_argument("--features", action="store_true", help="also search for a smaller feature subset")
+    parser.add_argument("--f1-tolerance", type=float, default=MACRO_F1_TOLERANCE)
+    parser.add_argument("--recall-tolerance", type=float, default=CLASS_4_RECALL_TOLERANCE)
+    args = parser.parse_args()
+    slim_model(args.model_dir, args.features,
+               f1_tolerance=args.f1_tolerance, recall_tolerance=args.recall_tolerance)
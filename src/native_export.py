@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import argparse
+import joblib
+import numpy as np
+
+from src.registry import file_hash, PREPROCESSOR_PATH
+from src.benchmark_report import library_version
+
+# ---------------- CONFIG ----------------
+META_FILE = "model_meta.json"
+# library -> (python module, native file, format)
+NATIVE_FORMATS = {
+    "LGBMClassifier": ("lightgbm", "model.lgb.txt", "lightgbm_model_string"),
+    "XGBClassifier": ("xgboost", "model.ubj", "xgboost_ubjson"),
+    "CatBoostClassifier": ("catboost", "model.cbm", "catboost_cbm"),
+}
+
+# ---------------- EXPORT ----------------
+
+def feature_names_from(preprocessor_path=PREPROCESSOR_PATH):
+    """Transformed column names of the preprocessor, or None if it is not on disk."""
+    if not os.path.exists(preprocessor_path):
+        return None
+    return [str(name) for name in joblib.load(preprocessor_path).get_feature_names_out()]
+
+def supports_native(model):
+    return type(model).__name__ in NATIVE_FORMATS
+
+def export_native(model, output_dir, feature_names=None, preprocessor_path=PREPROCESSOR_PATH):
+    """Write the booster in its library's own format plus a metadata sidecar.
+
+    Native files load without unpickling sklearn wrappers, so they start
+    faster and survive Python / wrapper upgrades that break model.pkl.
+
+    Returns:
+        path of the sidecar, or None for models without a native format
+        (random forest, logistic regression keep model.pkl only).
+    """
+    library = type(model).__name__
+    if library not in NATIVE_FORMATS:
+        return None
+    if library == "LGBMClassifier":
+        booster = model.booster_
+    elif library == "XGBClassifier":
+        booster = model.get_booster()
+    else:
+        booster = model  # CatBoost saves from the estimator itself
+    return export_booster(booster, library, model.classes_, int(model.n_features_in_),
+                          output_dir, feature_names, preprocessor_path)
+
+def export_booster(booster, library, classes, n_features, output_dir, feature_names=None,
+                   preprocessor_path=PREPROCESSOR_PATH):
+    """export_native for a bare booster (lgb.train / xgb.train output), e.g. from distributed training.
+
+    `library` is the sklearn wrapper name the booster corresponds to, so
+    load_native knows how to read it back.
+    """
+    module, filename, fmt = NATIVE_FORMATS[library]
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, filename)
+    if library == "CatBoostClassifier":
+        booster.save_model(path, format="cbm")
+    else:
+        booster.save_model(path)
+
+    classes = np.asarray(classes).ravel().astype(int).tolist()
+    meta = {
+        "library": library,
+        "library_version": library_version(module),
+        "format": fmt,
+        "file": filename,
+        "sha256": file_hash(path),
+        "classes": classes,
+        "severity_labels": [c + 1 for c in classes],  # model classes are 0-indexed Severity 1-4
+        "n_features": n_features,
+        "feature_map": {str(i): name for i, name in enumerate(feature_names)} if feature_names else None,
+        "preprocessor": {
+            "path": preprocessor_path,
+            "sha256": file_hash(preprocessor_path) if os.path.exists(preprocessor_path) else None,
+        },
+        "exported_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    meta_path = os.path.join(output_dir, META_FILE)
+    with open(meta_path, "w") as f:
+        json.dump(meta, f, indent=4)
+    return meta_path
+
+# ---------------- LOAD ----------------
+
+class NativeModel:
+    """predict_proba / predict / classes_ over a natively loaded booster.
+
+    Enough of the sklearn classifier interface for the Streamlit app and the
+    evaluation tools, without the sklearn wrapper classes.
+    """
+
+    def __init__(self, booster, library, meta):
+        self.booster = booster
+        self.library = library
+        self.meta = meta
+        self.classes_ = np.asarray(meta["classes"])
+        self.n_features_in_ = meta["n_features"]
+
+    def predict_proba(self, X):
+        if self.library == "LGBMClassifier":
+            return self.booster.predict(X)
+        if self.library == "XGBClassifier":
+            return self.booster.inplace_predict(X)
+        return self.booster.predict(X, prediction_type="Probability")
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+def has_native(model_dir):
+    return os.path.exists(os.path.join(model_dir, META_FILE))
+
+def load_native(model_dir, verify=True):
+    """Load a model exported by export_native; checks the file's sha256 against the sidecar."""
+    with open(os.path.join(model_dir, META_FILE)) as f:
+        meta = json.load(f)
+    path = os.path.join(model_dir, meta["file"])
+    if verify and file_hash(path) != meta["sha256"]:
+        raise ValueError(f"Checksum mismatch for {path}; re-export the model")
+
+    library = meta["library"]
+    if library == "LGBMClassifier":
+        import lightgbm as lgb
+        booster = lgb.Booster(model_file=path)
+    elif library == "XGBClassifier":
+        import xgboost as xgb
+        booster = xgb.Booster()
+        booster.load_model(path)
+    elif library == "CatBoostClassifier":
+        from catboost import CatBoost
+        booster = CatBoost().load_model(path)
+    else:
+        raise ValueError(f"Unknown native library: {library}")
+    return NativeModel(booster, library, meta)
+
+# ---------------- MAIN ----------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export saved model.pkl files to native booster formats")
+    parser.add_argument("model_dirs", nargs="+", help="directories holding model.pkl")
+    args = parser.parse_args()
+
+    feature_names = feature_names_from()
+    for model_dir in args.model_dirs:
+        model = joblib.load(os.path.join(model_dir, "model.pkl"))
+        meta_path = export_native(model, model_dir, feature_names)
+        print(f"{model_dir}: " + (f"exported ({meta_path})" if meta_path else
+                                  f"no native format for {type(model).__name__}, keeping model.pkl"))
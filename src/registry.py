@@ -0,0 +1,176 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import argparse
+import joblib
+import pandas as pd
+
+from src.benchmark_report import normalize_metrics
+
+# ---------------- CONFIG ----------------
+REGISTRY_PATH = "models/registry.json"
+PREPROCESSOR_PATH = "preprocessing/new/preprocessor.pkl"
+# Every place the training / evaluation scripts have written artifacts to.
+SCAN_DIRS = ["model/*", "model/fine/*", "models/*", "models/final_comparison/*", "evaluations/*"]
+MODEL_FILE = "model.pkl"
+NATIVE_META_FILE = "model_meta.json"     # Written by native_export
+FAMILY_MANIFEST_FILE = "family.json"     # Written by state_models
+CASCADE_CONFIG_FILE = "cascade.json"     # Written by cascade
+
+# ---------------- HASHING ----------------
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _read_json(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+# ---------------- REGISTRY ----------------
+
+class ModelRegistry:
+    """JSON manifest of every trained model; listing and ranking never open an artifact.
+
+    Each entry is keyed by the artifact directory (e.g.
+    "models/final_comparison/xgboost_tuned") and records the model file's
+    path, sha256 and size, normalized test metrics (plus CV summary when
+    present), the feature map, the preprocessor hash and train time.
+    load() unpickles lazily, verifies the checksum first and memoizes.
+    """
+
+    def __init__(self, path=REGISTRY_PATH):
+        self.path = path
+        self.entries = _read_json(path) or {}
+        self._loaded = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(self.entries, f, indent=4)
+        os.replace(self.path + ".tmp", self.path)
+
+    def register(self, model_dir, preprocessor_path=PREPROCESSOR_PATH, save=True):
+        """Add or refresh the entry for a directory holding metrics.json and (optionally) model.pkl."""
+        model_dir = os.path.normpath(model_dir)
+        metrics = _read_json(os.path.join(model_dir, "metrics.json"))
+        if metrics is None:
+            raise FileNotFoundError(f"No metrics.json in {model_dir}")
+        model_path = os.path.join(model_dir, MODEL_FILE)
+        has_model = os.path.exists(model_path)
+        summary = normalize_metrics(metrics)
+        if "bootstrap" in metrics:
+            summary["macro_f1_ci"] = [metrics["bootstrap"]["macro_f1"]["low"],
+                                      metrics["bootstrap"]["macro_f1"]["high"]]
+        cv = _read_json(os.path.join(model_dir, "cv_metrics.json"))
+        if cv is not None:
+            summary["cv_macro_f1_mean"] = cv["summary"]["macro_f1"]["mean"]
+            summary["cv_macro_f1_std"] = cv["summary"]["macro_f1"]["std"]
+        feature_map_path = os.path.join(model_dir, "feature_map.json")
+        native_meta_path = os.path.join(model_dir, NATIVE_META_FILE)
+        family_path = os.path.join(model_dir, FAMILY_MANIFEST_FILE)
+        cascade_path = os.path.join(model_dir, CASCADE_CONFIG_FILE)
+
+        entry = {
+            "id": model_dir,
+            # evaluations/ folders carry a "_metrics" suffix (e.g. lightgbm_tuned_metrics)
+            "name": os.path.basename(model_dir).removesuffix("_metrics"),
+            "path": model_path if has_model else None,
+            "sha256": file_hash(model_path) if has_model else None,
+            "size_bytes": os.path.getsize(model_path) if has_model else None,
+            "metrics": summary,
+            "train_time": summary.pop("training_time_s"),
+            "native": native_meta_path if os.path.exists(native_meta_path) else None,
+            "family": family_path if os.path.exists(family_path) else None,
+            "cascade": cascade_path if os.path.exists(cascade_path) else None,
+            "feature_map": feature_map_path if os.path.exists(feature_map_path) else None,
+            "preprocessor": {
+                "path": preprocessor_path,
+                "sha256": file_hash(preprocessor_path) if os.path.exists(preprocessor_path) else None,
+            },
+            "registered_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self.entries[entry["id"]] = entry
+        if save:
+            self.save()
+        return entry
+
+    def scan(self, patterns=SCAN_DIRS):
+        """Register every artifact directory that has a metrics.json."""
+        for pattern in patterns:
+            for metrics_path in sorted(glob.glob(os.path.join(pattern, "metrics.json"))):
+                self.register(os.path.dirname(metrics_path), save=False)
+        self.save()
+        return self
+
+    def list(self, loadable_only=False):
+        """Index as a flat DataFrame (metrics.* columns); reads only the manifest."""
+        entries = [e for e in self.entries.values() if e["path"] or not loadable_only]
+        if not entries:
+            return pd.DataFrame()
+        return pd.json_normalize(entries).set_index("id")
+
+    def best(self, metric="macro_f1", loadable_only=True):
+        """Entry with the highest metric (e.g. macro_f1, class_4_recall)."""
+        df = self.list(loadable_only)
+        return self.entries[df[f"metrics.{metric}"].astype(float).idxmax()]
+
+    def get(self, model_id):
+        """Entry by id (artifact directory) or by name when that is unambiguous."""
+        if model_id not in self.entries:
+            matches = [e for e in self.entries.values() if e["name"] == model_id]
+            if len(matches) > 1:
+                # evaluations/ keeps metrics of older runs under the same name; prefer the saved model.
+                matches = [e for e in matches if e["path"]]
+            if len(matches) != 1:
+                raise KeyError(f"Unknown or ambiguous model: {model_id}")
+            return matches[0]
+        return self.entries[model_id]
+
+    def load(self, model_id):
+        """Unpickle a registered model once, after checking its sha256 against the index."""
+        entry = self.get(model_id)
+        if entry["path"] is None:
+            raise FileNotFoundError(f"{entry['id']} has metrics but no saved model")
+        if entry["sha256"] not in self._loaded:
+            actual = file_hash(entry["path"])
+            if actual != entry["sha256"]:
+                raise ValueError(f"Checksum mismatch for {entry['path']}: "
+                                 f"registry {entry['sha256'][:12]}, file {actual[:12]}; re-register it")
+            self._loaded[entry["sha256"]] = joblib.load(entry["path"])
+        return self._loaded[entry["sha256"]]
+
+def register_model(model_dir, registry_path=REGISTRY_PATH):
+    """Convenience hook for the training scripts' save_all."""
+    return ModelRegistry(registry_path).register(model_dir)
+
+# ---------------- MAIN ----------------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model registry")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("scan", help="index every artifact directory with a metrics.json")
+    list_parser = sub.add_parser("list", help="compare registered models (index only)")
+    list_parser.add_argument("--sort", default="macro_f1")
+    best_parser = sub.add_parser("best", help="best loadable model by a metric")
+    best_parser.add_argument("--metric", default="macro_f1")
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    if args.command == "scan":
+        registry.scan()
+        print(f"Indexed {len(registry.entries)} models in {registry.path}")
+    elif args.command == "list":
+        df = registry.list()
+        columns = ["name", "metrics.macro_f1", "metrics.class_4_recall", "metrics.weighted_f1",
+                   "train_time", "size_bytes"]
+        print(df.sort_values(f"metrics.{args.sort}", ascending=False)[columns].to_string())
+    else:
+        print(json.dumps(registry.best(args.metric), indent=4))
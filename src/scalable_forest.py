@@ -0,0 +1,253 @@
+import os
+import time
+import argparse
+import tempfile
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.utils import check_array
+
+from src.train_models import MODELS_CONFIG, MODELS_ROOT, load_data, get_weights, save_all
+from src.binned_dataset import stratified_subsample
+from src.evaluation import confusion_matrix, metrics_from_confusion, predict_in_chunks, evaluate_predictions
+from src.bootstrap import confidence_intervals
+
+# ---------------- CONFIG ----------------
+NAME = "random_forest_scalable"
+MAX_SAMPLES = 500_000        # Bootstrap rows per tree (int) or fraction of the store (float)
+BATCH_TREES = 10             # Trees added per warm_start round
+MAX_TREES = 500
+TIME_BUDGET_S = 3600         # Stop before a batch would overrun this
+MEMORY_BUDGET_MB = 4096      # ...or push the in-memory forest past this
+MIN_OOB_GAIN = 0.0005        # ...or when a batch improves OOB macro F1 by less than this
+OOB_ROWS = 200_000           # Stratified training rows the running OOB score is measured on
+COMPACT = True               # Save the float32 CompactForest as model.pkl instead of the sklearn forest
+RANDOM_STATE = 42
+
+# sklearn's tree Node struct (children, feature, threshold, impurity, n_node_samples, ...) is 64 bytes.
+SKLEARN_NODE_BYTES = 64
+
+# ---------------- OUT-OF-BAG ----------------
+
+def in_bag_counts(forest, tree):
+    """Bootstrap draw counts per training row for one fitted tree of the forest.
+
+    Uses sklearn's own sampler with the weights the forest stored at fit
+    time, as forest.estimators_samples_ does: with class_weight the draws
+    are weighted, so re-deriving them as uniform randint draws would
+    mislabel in-bag rows as out-of-bag. estimators_samples_ itself
+    regenerates every tree's sample on each access, so only new trees are
+    drawn here.
+    """
+    from sklearn.ensemble._forest import _generate_sample_indices
+    draws = _generate_sample_indices(tree.random_state, forest._n_samples,
+                                     forest._n_samples_bootstrap, forest._sample_weight)
+    return np.bincount(draws, minlength=forest._n_samples)
+
+class RunningOOB:
+    """Out-of-bag probabilities on a fixed row sample, updated only with the newest trees.
+
+    sklearn's oob_score re-scores every tree on every row after each
+    warm_start fit; accumulating per tree keeps each batch's cost constant.
+    """
+
+    def __init__(self, X_rows, y_rows, rows, n_classes):
+        self.X = X_rows
+        self.y = y_rows
+        self.rows = rows
+        self.proba = np.zeros((len(rows), n_classes), dtype=np.float32)
+        self.votes = np.zeros(len(rows), dtype=np.int32)
+        self.n_trees = 0
+
+    def update(self, forest):
+        for tree in forest.estimators_[self.n_trees:]:
+            oob = in_bag_counts(forest, tree)[self.rows] == 0
+            if oob.any():
+                self.proba[oob] += tree.predict_proba(self.X[oob]).astype(np.float32)
+                self.votes[oob] += 1
+        self.n_trees = len(forest.estimators_)
+
+    def metrics(self):
+        covered = self.votes > 0
+        cm = confusion_matrix(self.y[covered], self.proba[covered].argmax(axis=1))
+        metrics = metrics_from_confusion(cm)
+        return {"oob_macro_f1": float(metrics["macro_f1"]),
+                "oob_class_4_recall": float(metrics["class_4_recall"]),
+                "oob_coverage": float(covered.mean())}
+
+# ---------------- COMPACT STORAGE ----------------
+
+class CompactForest(ClassifierMixin, BaseEstimator):
+    """Random forest flattened into a few typed arrays for inference.
+
+    Node children are int32, split features the smallest int type that
+    fits, thresholds float32 and leaf class probabilities float32; all
+    trees share one set of arrays. Leaves point to themselves, so every
+    tree is walked the same fixed number of steps, vectorized over rows
+    and trees at once.
+    """
+
+    @classmethod
+    def from_forest(cls, forest):
+        compact = cls()
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        offsets = np.cumsum([0] + [t.node_count for t in trees])
+        feature_dtype = np.int16 if forest.n_features_in_ < np.iinfo(np.int16).max else np.int32
+
+        left, right, feature, threshold, value = [], [], [], [], []
+        for t, offset in zip(trees, offsets):
+            nodes = np.arange(t.node_count)
+            is_leaf = t.children_left == -1
+            left.append(np.where(is_leaf, nodes, t.children_left) + offset)
+            right.append(np.where(is_leaf, nodes, t.children_right) + offset)
+            feature.append(np.where(is_leaf, 0, t.feature))
+            # Largest float32 <= the float64 threshold: sklearn compares float32 inputs,
+            # so `x <= t` gives the same branch as before for every possible x.
+            t32 = t.threshold.astype(np.float32)
+            t32 = np.where(t32 > t.threshold, np.nextafter(t32, np.float32(-np.inf)), t32)
+            threshold.append(np.where(is_leaf, np.float32(np.inf), t32))
+            leaf_value = t.value[:, 0, :]
+            value.append(leaf_value / leaf_value.sum(axis=1, keepdims=True))
+
+        compact.roots_ = offsets[:-1].astype(np.int32)
+        compact.children_left_ = np.concatenate(left).astype(np.int32)
+        compact.children_right_ = np.concatenate(right).astype(np.int32)
+        compact.feature_ = np.concatenate(feature).astype(feature_dtype)
+        compact.threshold_ = np.concatenate(threshold).astype(np.float32)
+        compact.value_ = np.concatenate(value).astype(np.float32)
+        compact.max_depth_ = max(t.max_depth for t in trees)
+        compact.classes_ = forest.classes_
+        compact.n_features_in_ = forest.n_features_in_
+        return compact
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in
+                   ("roots_", "children_left_", "children_right_", "feature_", "threshold_", "value_"))
+
+    def predict_proba(self, X, chunk_size=None):
+        X = check_array(X, accept_sparse="csr", dtype=np.float32)
+        n_trees = len(self.roots_)
+        # Keep the (rows x trees) node-index matrix around a couple of million entries.
+        chunk_size = chunk_size or max(1, 2_000_000 // n_trees)
+        proba = np.empty((X.shape[0], self.value_.shape[1]), dtype=np.float32)
+        for start in range(0, X.shape[0], chunk_size):
+            batch = X[start:start + chunk_size]
+            dense = batch.toarray() if hasattr(batch, "toarray") else batch
+            rows = np.arange(dense.shape[0])[:, None]
+            nodes = np.broadcast_to(self.roots_, (dense.shape[0], n_trees))
+            for _ in range(self.max_depth_):
+                go_left = dense[rows, self.feature_[nodes]] <= self.threshold_[nodes]
+                nodes = np.where(go_left, self.children_left_[nodes], self.children_right_[nodes])
+            proba[start:start + dense.shape[0]] = self.value_[nodes].mean(axis=1)
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+def forest_memory_mb(forest):
+    """In-memory size of a fitted sklearn forest's tree arrays (nodes + leaf values)."""
+    total = 0
+    for estimator in forest.estimators_:
+        t = estimator.tree_
+        total += t.node_count * SKLEARN_NODE_BYTES + t.value.nbytes
+    return total / 1024 ** 2
+
+def _pickled_mb(model):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.pkl")
+        joblib.dump(model, path)
+        return os.path.getsize(path) / 1024 ** 2
+
+# ---------------- TRAINING ----------------
+
+def grow_forest(X, y, params, batch_trees=BATCH_TREES, max_trees=MAX_TREES, time_budget_s=TIME_BUDGET_S,
+                memory_budget_mb=MEMORY_BUDGET_MB, min_oob_gain=MIN_OOB_GAIN, oob_rows=OOB_ROWS):
+    """Grow a max_samples forest in warm_start batches until a budget or the OOB plateau stops it.
+
+    Returns:
+        (fitted RandomForestClassifier, DataFrame with one row per batch)
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    model = RandomForestClassifier(**{**params, "warm_start": True, "oob_score": False, "n_estimators": 0})
+    rows = np.sort(stratified_subsample(np.arange(len(y)), y, oob_rows, random_state=RANDOM_STATE))
+    oob = RunningOOB(X[rows], y[rows], rows, len(np.unique(y)))
+    # Convert once; fit() would otherwise re-validate and copy the store every batch.
+    X = check_array(X, accept_sparse="csc", dtype=np.float32)
+
+    log = []
+    start = time.time()
+    while model.n_estimators < max_trees:
+        batch_start = time.time()
+        model.set_params(n_estimators=min(model.n_estimators + batch_trees, max_trees))
+        model.fit(X, y)
+        batch_time = time.time() - batch_start
+        oob.update(model)
+        row = {"n_trees": len(model.estimators_), "elapsed_s": time.time() - start,
+               "batch_time_s": batch_time, "forest_mb": forest_memory_mb(model), **oob.metrics()}
+        log.append(row)
+        print(f"  {row['n_trees']:>4} trees | {row['elapsed_s']:7.1f}s | forest {row['forest_mb']:7.1f} MB | "
+              f"OOB macro F1 {row['oob_macro_f1']:.4f} | OOB C4 recall {row['oob_class_4_recall']:.4f}")
+
+        # Budgets are checked against the cost of one more batch.
+        per_tree_mb = row["forest_mb"] / row["n_trees"]
+        if row["elapsed_s"] + batch_time > time_budget_s:
+            row["stopped"] = "time_budget"
+        elif row["forest_mb"] + per_tree_mb * batch_trees > memory_budget_mb:
+            row["stopped"] = "memory_budget"
+        elif len(log) > 1 and row["oob_macro_f1"] - log[-2]["oob_macro_f1"] < min_oob_gain:
+            row["stopped"] = "oob_plateau"
+        if "stopped" in row:
+            break
+    return model, pd.DataFrame(log)
+
+# ---------------- MAIN ----------------
+
+def main(compact=COMPACT):
+    X_train, X_test, y_train, y_test = load_data()
+    y_train, y_test = np.asarray(y_train), np.asarray(y_test)
+    weights_dict = get_weights(y_train)
+    params = {**MODELS_CONFIG["random_forest"]["params"], "max_samples": MAX_SAMPLES, "class_weight": weights_dict}
+
+    print(f"\n>>> Starting: {NAME} (max_samples={MAX_SAMPLES}, {BATCH_TREES} trees per batch)")
+    start_train = time.time()
+    forest, growth = grow_forest(X_train, y_train, params)
+    train_time = time.time() - start_train
+    del X_train
+
+    preds, inference_time = predict_in_chunks(forest, X_test)
+    metrics = evaluate_predictions(y_test, preds, inference_time)
+    metrics["training_time"] = train_time
+    metrics["bootstrap"] = confidence_intervals(metrics["confusion_matrix"])
+    metrics["forest_growth"] = {
+        "max_samples": MAX_SAMPLES,
+        "n_trees": len(forest.estimators_),
+        "stopped": growth["stopped"].dropna().iloc[0] if "stopped" in growth else "max_trees",
+        **{k: float(growth[k].iloc[-1]) for k in ("oob_macro_f1", "oob_class_4_recall", "oob_coverage")},
+    }
+
+    saved = forest
+    if compact:
+        saved = CompactForest.from_forest(forest)
+        compact_preds, compact_time = predict_in_chunks(saved, X_test)
+        metrics["compact"] = {
+            "agreement": float((compact_preds == preds).mean()),
+            "memory_mb": {"sklearn": forest_memory_mb(forest), "compact": saved.nbytes / 1024 ** 2},
+            "file_mb": {"sklearn": _pickled_mb(forest), "compact": _pickled_mb(saved)},
+            "inference_time": {"sklearn": inference_time, "compact": compact_time},
+        }
+        print(f"Compact forest: {metrics['compact']['memory_mb']['sklearn']:.1f} MB -> "
+              f"{metrics['compact']['memory_mb']['compact']:.1f} MB in memory, "
+              f"agreement {metrics['compact']['agreement']:.4%}")
+
+    save_all(NAME, saved, metrics, weights_dict)
+    growth.to_csv(os.path.join(MODELS_ROOT, NAME, "oob_curve.csv"), index=False)
+    print(f"Finished {NAME}. {len(forest.estimators_)} trees | Macro F1: {metrics['macro_f1']:.4f} | "
+          f"C4 Recall: {metrics['class_4_recall']:.4f} | {train_time:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Random forest grown in warm_start batches under budgets")
+    parser.add_argument("--no-compact", action="store_true", help="save the sklearn forest as model.pkl")
+    args = parser.parse_args()
+    main(compact=not args.no_compact)
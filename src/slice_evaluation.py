@@ -0,0 +1,119 @@
+import os
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+
+from preprocessing.transform import load_test_frame
+from src.evaluation import N_CLASSES, metrics_from_confusion, predict_in_chunks
+from src.benchmark_inference import discover_artifacts
+
+# ---------------- CONFIG ----------------
+DATA_DIR = "data/training_ready/"
+OUTPUT_PATH = "evaluations/slices/slice_report.parquet"
+SLICE_COLUMNS = ["State", "Weather_Simple", "time_bucket", "season", "Distance(mi)_bin"]
+# Two-way slices, e.g. Severity 4 recall in snow at night.
+CROSS_SLICES = [("Weather_Simple", "time_bucket"), ("State", "Weather_Simple")]
+MISSING = "missing"
+
+# ---------------- CODES ----------------
+
+def _codes(values):
+    """Integer codes and labels for one column; NaN becomes its own 'missing' level."""
+    codes, labels = pd.factorize(values, sort=True)
+    labels = [str(label) for label in labels]
+    if (codes < 0).any():
+        codes = np.where(codes < 0, len(labels), codes)
+        labels.append(MISSING)
+    return codes.astype(np.int64), labels
+
+def slice_codes(frame, columns=SLICE_COLUMNS, crosses=CROSS_SLICES):
+    """Per-row slice ids for every slicing, in one id space.
+
+    Returns:
+        codes: (n_rows, n_slicings) slice id of each row under each slicing
+        index: DataFrame with one row per slice id (slice_column, slice_value)
+    """
+    per_column = {column: _codes(frame[column].to_numpy()) for column in columns}
+    slicings = [(column, *per_column[column]) for column in columns]
+    for a, b in crosses:
+        (codes_a, labels_a), (codes_b, labels_b) = per_column[a], per_column[b]
+        codes = codes_a * len(labels_b) + codes_b
+        labels = [f"{la} | {lb}" for la in labels_a for lb in labels_b]
+        slicings.append((f"{a} x {b}", codes, labels))
+
+    offset, codes, index = 0, [], []
+    for name, column_codes, labels in slicings:
+        codes.append(column_codes + offset)
+        index.extend((name, label) for label in labels)
+        offset += len(labels)
+    return np.column_stack(codes), pd.DataFrame(index, columns=["slice_column", "slice_value"])
+
+# ---------------- CONFUSION ----------------
+
+def grouped_confusion(codes, y_true, y_pred, n_slices, n_classes=N_CLASSES):
+    """(n_slices, n, n) confusion matrices of every slice from a single bincount.
+
+    Each row contributes one (slice, true, predicted) cell per slicing, so
+    all slices of all columns are counted in the same pass.
+    """
+    cells = np.asarray(y_true, dtype=np.int64) * n_classes + np.asarray(y_pred, dtype=np.int64)
+    combined = codes * (n_classes * n_classes) + cells[:, None]
+    counts = np.bincount(combined.ravel(), minlength=n_slices * n_classes * n_classes)
+    return counts.reshape(n_slices, n_classes, n_classes)
+
+def slice_report(model_name, codes, index, y_true, y_pred, n_classes=N_CLASSES):
+    """One row per non-empty slice with its metrics and raw confusion counts."""
+    cms = grouped_confusion(codes, y_true, y_pred, len(index), n_classes)
+    metrics = metrics_from_confusion(cms)
+    report = index.copy()
+    report.insert(0, "model", model_name)
+    report["n_rows"] = cms.sum(axis=(1, 2))
+    for key in ("macro_f1", "weighted_f1", "accuracy", "class_4_recall"):
+        report[key] = metrics[key]
+    for c in range(n_classes):
+        report[f"support_{c + 1}"] = metrics["support"][:, c].astype(np.int64)
+        report[f"precision_{c + 1}"] = metrics["precision"][:, c]
+        report[f"recall_{c + 1}"] = metrics["recall"][:, c]
+    # Raw counts let the dashboard merge slices or recompute any metric.
+    flat = cms.reshape(len(index), -1).astype(np.int32)
+    for i in range(n_classes * n_classes):
+        report[f"cm_{i // n_classes + 1}{i % n_classes + 1}"] = flat[:, i]
+    return report[report["n_rows"] > 0]
+
+# ---------------- MAIN ----------------
+
+def main(models=None, output_path=OUTPUT_PATH):
+    X_test, y_test = joblib.load(os.path.join(DATA_DIR, "test_data.pkl"))
+    y_test = np.asarray(y_test) - 1
+    frame, _ = load_test_frame()
+    if len(frame) != X_test.shape[0]:
+        raise ValueError(f"Test frame has {len(frame)} rows but test_data.pkl has {X_test.shape[0]}; "
+                         "re-run preprocessing/transform.py so both come from the same split")
+    codes, index = slice_codes(frame)
+    del frame
+
+    reports = []
+    for name, path in discover_artifacts():
+        if models and name not in models:
+            continue
+        print(f"Slicing {name}...")
+        y_pred, _ = predict_in_chunks(joblib.load(path), X_test)
+        reports.append(slice_report(name, codes, index, y_test, y_pred))
+
+    report = pd.concat(reports, ignore_index=True)
+    for column in ("model", "slice_column"):
+        report[column] = report[column].astype("category")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    report.to_parquet(output_path, index=False)
+    print(f"Saved {len(report)} slice rows to {output_path}")
+
+    worst = report[(report["slice_column"] == "Weather_Simple") & (report["support_4"] >= 100)]
+    print("\nLowest Severity 4 recall by weather:")
+    print(worst.nsmallest(10, "class_4_recall")[["model", "slice_value", "n_rows", "class_4_recall", "macro_f1"]])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-slice evaluation of the saved models")
+    parser.add_argument("--models", nargs="+", help="artifact names to run (default: all found)")
+    args = parser.parse_args()
+    main(args.models)
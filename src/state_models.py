@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+from threadpoolctl import threadpool_limits
+
+from src.binned_dataset import load_training_store, balanced_sample_weights, build_binned_dataset, train_on_subset
+from src.cross_validation import registered_models
+from src.feature_importance import feature_groups
+from src.native_export import export_booster, has_native, load_native, feature_names_from, NATIVE_FORMATS
+from src.registry import register_model, _read_json
+from src.evaluation import confusion_matrix, metrics_from_confusion, evaluate_predictions, iter_chunks
+from src.bootstrap import confidence_intervals
+from src.benchmark_inference import time_batches, make_batches
+from src.benchmark_report import BENCHMARK_DIR
+
+# ---------------- CONFIG ----------------
+DATA_DIR = "data/training_ready/"
+PREPROCESSOR_PATH = "preprocessing/new/preprocessor.pkl"
+FAMILY_DIR = "model/state_family/"
+MANIFEST_FILE = "family.json"
+GLOBAL_MODEL = "lightgbm_tuned"      # Config the members are cut down from, and the fallback
+MEMBER_PARAMS = {"n_estimators": 200}  # Overrides that make each member smaller than the global model
+GROUP_BY = "state"                   # "state" or "region"
+MIN_TRAIN_ROWS = 50_000              # Groups with fewer training rows use the global model
+N_WORKERS = 4
+THREADS_PER_WORKER = max(1, (os.cpu_count() or 1) // N_WORKERS)
+BATCH_SIZES = [1, 1_000]             # Latency benchmark; 1 row is the Streamlit request
+FALLBACK = "global"
+UNKNOWN_STATE = "Unknown"
+RANDOM_STATE = 42
+
+# US Census regions
+REGIONS = {
+    "Northeast": ["CT", "ME", "MA", "NH", "RI", "VT", "NJ", "NY", "PA"],
+    "Midwest": ["IL", "IN", "MI", "OH", "WI", "IA", "KS", "MN", "MO", "NE", "ND", "SD"],
+    "South": ["DE", "DC", "FL", "GA", "MD", "NC", "SC", "VA", "WV", "AL", "KY", "MS", "TN",
+              "AR", "LA", "OK", "TX"],
+    "West": ["AZ", "CO", "ID", "MT", "NV", "NM", "UT", "WY", "AK", "CA", "HI", "OR", "WA"],
+}
+STATE_REGION = {state: region for region, states in REGIONS.items() for state in states}
+
+# ---------------- GROUPS ----------------
+
+def group_of(state, group_by=GROUP_BY):
+    """Family key for a State abbreviation (None when it has no group)."""
+    if state == UNKNOWN_STATE:
+        return None
+    if group_by == "state":
+        return state
+    if group_by == "region":
+        return STATE_REGION.get(state)
+    raise ValueError(f"Unknown grouping: {group_by}")
+
+def state_categories(preprocessor):
+    """State values in the order of their one-hot columns."""
+    for name, transformer, columns in preprocessor.transformers_:
+        if "State" in list(columns):
+            encoder = transformer.steps[-1][1] if hasattr(transformer, "steps") else transformer
+            return np.asarray(encoder.categories_[list(columns).index("State")]).astype(str)
+    raise ValueError("The preprocessor has no State column")
+
+def row_states(X, preprocessor):
+    """State of every row of a processed matrix, read back from its State one-hot block."""
+    start, stop = feature_groups(preprocessor)["State"]
+    categories = np.append(state_categories(preprocessor), UNKNOWN_STATE)
+    codes = np.empty(X.shape[0], dtype=np.int64)
+    for rows in iter_chunks(X.shape[0]):
+        block = X[rows, start:stop]
+        if sp.issparse(block):
+            present = block.getnnz(axis=1) > 0
+            idx = np.asarray(block.argmax(axis=1)).ravel()
+        else:
+            present = (block != 0).any(axis=1)
+            idx = block.argmax(axis=1)
+        codes[rows] = np.where(present, idx, len(categories) - 1)   # Unseen states encode as all zeros
+    return categories[codes]
+
+def plan_family(groups, min_train_rows=MIN_TRAIN_ROWS):
+    """(members, fallback groups): groups with enough training rows get their own model."""
+    counts = pd.Series(groups).value_counts()
+    counts = counts[counts.index.notna()]
+    return (sorted(counts[counts >= min_train_rows].index),
+            sorted(counts[counts < min_train_rows].index))
+
+# ---------------- FAMILY ----------------
+
+class StateFamily:
+    """Routes each row to its group's model; groups without one (and unknown states) use the global model.
+
+    Exposes predict_proba / predict / classes_ like the single model, with
+    the rows' State abbreviations passed alongside the features.
+    """
+
+    def __init__(self, members, fallback, group_by, manifest=None):
+        self.members = members
+        self.fallback = fallback
+        self.group_by = group_by
+        self.manifest = manifest or {}
+        self.classes_ = np.asarray(fallback.classes_)
+
+    def route(self, states):
+        """Member key for each state (FALLBACK where the family has no member)."""
+        keys = [group_of(state, self.group_by) for state in states]
+        return np.array([key if key in self.members else FALLBACK for key in keys], dtype=object)
+
+    def predict_proba(self, X, states=None):
+        if states is None:
+            return self.fallback.predict_proba(X)
+        routes = self.route(states)
+        if len(routes) == 1:   # Single request: no scatter needed
+            return self.members.get(routes[0], self.fallback).predict_proba(X)
+        proba = np.empty((X.shape[0], len(self.classes_)))
+        for key in np.unique(routes):
+            rows = np.flatnonzero(routes == key)
+            proba[rows] = self.members.get(key, self.fallback).predict_proba(X[rows])
+        return proba
+
+    def predict(self, X, states=None):
+        return self.classes_[self.predict_proba(X, states).argmax(axis=1)]
+
+def _load_single(model_dir):
+    if has_native(model_dir):
+        return load_native(model_dir)
+    return joblib.load(os.path.join(model_dir, "model.pkl"))
+
+def has_family(family_dir=FAMILY_DIR):
+    return os.path.exists(os.path.join(family_dir, MANIFEST_FILE))
+
+def load_family(family_dir=FAMILY_DIR):
+    """StateFamily from the manifest written by train_family."""
+    with open(os.path.join(family_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    members = {key: load_native(os.path.join(family_dir, member["dir"]))
+               for key, member in manifest["members"].items()}
+    return StateFamily(members, _load_single(manifest["global_model"]), manifest["group_by"], manifest)
+
+# ---------------- TRAINING ----------------
+
+def train_member(key, indices, params, binned_path, n_features, output_dir, n_threads):
+    """Fit one member on its rows of the shared binned dataset and export it natively."""
+    start = time.time()
+    booster = train_on_subset(indices, params, binned_path, num_threads=n_threads)
+    train_time = time.time() - start
+    export_booster(booster, "LGBMClassifier", np.arange(params["num_class"]), n_features, output_dir,
+                   feature_names_from(PREPROCESSOR_PATH), PREPROCESSOR_PATH)
+    size_mb = os.path.getsize(os.path.join(output_dir, NATIVE_FORMATS["LGBMClassifier"][1])) / 1024 ** 2
+    return {"key": key, "n_train": len(indices), "train_time_s": train_time, "size_mb": size_mb}
+
+def train_family(group_by=GROUP_BY, min_train_rows=MIN_TRAIN_ROWS, family_dir=FAMILY_DIR,
+                 n_workers=N_WORKERS, threads_per_worker=THREADS_PER_WORKER):
+    """Train one smaller model per group in parallel and write the family manifest.
+
+    Returns:
+        dict: the manifest
+    """
+    configs = {name: (config, output_dir) for name, config, output_dir in registered_models()}
+    config, global_dir = configs[GLOBAL_MODEL]
+    params = {**config["params"], **MEMBER_PARAMS}
+
+    X_train, y_train = load_training_store()
+    groups = np.array([group_of(s, group_by) for s in row_states(X_train, joblib.load(PREPROCESSOR_PATH))],
+                      dtype=object)
+    members, fallback_groups = plan_family(groups, min_train_rows)
+    binned_path = build_binned_dataset(X_train, y_train, weight=balanced_sample_weights(y_train))
+    n_features = X_train.shape[1]
+    del X_train
+
+    print(f"Training {len(members)} {group_by} models on {n_workers} workers x {threads_per_worker} threads; "
+          f"{len(fallback_groups)} {group_by}s fall back to {GLOBAL_MODEL}")
+    start = time.time()
+    results = Parallel(n_jobs=n_workers)(
+        delayed(train_member)(key, np.flatnonzero(groups == key), params, binned_path, n_features,
+                              os.path.join(family_dir, "members", key), threads_per_worker)
+        for key in members
+    )
+    manifest = {
+        "group_by": group_by,
+        "global_model": global_dir,
+        "min_train_rows": min_train_rows,
+        "member_params": {k: v for k, v in params.items() if isinstance(v, (int, float, str, bool))},
+        "members": {r["key"]: {"dir": os.path.join("members", r["key"]), "n_train": r["n_train"],
+                               "train_time_s": r["train_time_s"], "size_mb": r["size_mb"]}
+                    for r in results},
+        "fallback_groups": fallback_groups,
+        "wall_time_s": time.time() - start,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    os.makedirs(family_dir, exist_ok=True)
+    with open(os.path.join(family_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=4)
+    return manifest
+
+# ---------------- BENCHMARK ----------------
+
+def _group_scores(y, preds, groups, keys):
+    rows = []
+    for key in keys:
+        mask = groups == key
+        m = metrics_from_confusion(confusion_matrix(y[mask], preds[mask]))
+        rows.append({"macro_f1": float(m["macro_f1"]), "class_4_recall": float(m["class_4_recall"])})
+    return rows
+
+def compare_family(family, single, X_test, y_test, states, batch_sizes=BATCH_SIZES):
+    """Accuracy (overall and per member group), size and latency of the family against the single model.
+
+    Returns:
+        (family test metrics, per-group DataFrame, latency DataFrame)
+    """
+    start = time.time()
+    family_preds = family.predict(X_test, states)
+    family_time = time.time() - start
+    single_preds = np.asarray(single.predict(X_test)).ravel()
+    metrics = evaluate_predictions(y_test, family_preds, family_time)
+    single_metrics = evaluate_predictions(y_test, single_preds)
+
+    groups = np.array([group_of(s, family.group_by) for s in states], dtype=object)
+    keys = list(family.members)
+    per_group = pd.DataFrame({"group": keys, "n_test": [int((groups == k).sum()) for k in keys],
+                              "n_train": [family.manifest["members"][k]["n_train"] for k in keys]})
+    for label, preds in (("family", family_preds), ("single", single_preds)):
+        scores = pd.DataFrame(_group_scores(y_test, preds, groups, keys))
+        per_group[f"{label}_macro_f1"] = scores["macro_f1"]
+        per_group[f"{label}_class_4_recall"] = scores["class_4_recall"]
+    per_group["macro_f1_gain"] = per_group["family_macro_f1"] - per_group["single_macro_f1"]
+
+    rng = np.random.default_rng(RANDOM_STATE)
+    latency = []
+    for batch_size in batch_sizes:
+        windows = make_batches(X_test.shape[0], batch_size, rng)
+        batches = [(X_test[w], states[w]) for w in windows]
+        with threadpool_limits(limits=1):
+            family_ms = time_batches(lambda b: family.predict_proba(*b), batches)
+            single_ms = time_batches(lambda b: single.predict_proba(b[0]), batches)
+        latency.append({"batch_size": len(windows[0]),
+                        "family_p50_ms": float(np.percentile(family_ms, 50)),
+                        "single_p50_ms": float(np.percentile(single_ms, 50)),
+                        "family_p99_ms": float(np.percentile(family_ms, 99)),
+                        "single_p99_ms": float(np.percentile(single_ms, 99))})
+    metrics["single_model"] = {"macro_f1": single_metrics["macro_f1"],
+                               "class_4_recall": single_metrics["class_4_recall"]}
+    return metrics, per_group, pd.DataFrame(latency)
+
+def _single_size_mb(model_dir):
+    meta = _read_json(os.path.join(model_dir, "model_meta.json"))
+    path = os.path.join(model_dir, meta["file"]) if meta else os.path.join(model_dir, "model.pkl")
+    return os.path.getsize(path) / 1024 ** 2
+
+# ---------------- MAIN ----------------
+
+def main(group_by=GROUP_BY, min_train_rows=MIN_TRAIN_ROWS, n_workers=N_WORKERS):
+    manifest = train_family(group_by, min_train_rows, n_workers=n_workers,
+                            threads_per_worker=max(1, (os.cpu_count() or 1) // n_workers))
+    family = load_family()
+
+    X_test, y_test = joblib.load(os.path.join(DATA_DIR, "test_data.pkl"))
+    y_test = np.asarray(y_test) - 1
+    states = row_states(X_test, joblib.load(PREPROCESSOR_PATH))
+    metrics, per_group, latency = compare_family(family, family.fallback, X_test, y_test, states)
+
+    routed = family.route(states)
+    metrics["training_time"] = manifest["wall_time_s"]
+    metrics["bootstrap"] = confidence_intervals(metrics["confusion_matrix"])
+    metrics["family"] = {
+        "group_by": group_by,
+        "n_members": len(family.members),
+        "test_share_routed_to_members": float((routed != FALLBACK).mean()),
+        "members_size_mb": float(sum(m["size_mb"] for m in manifest["members"].values())),
+        "single_size_mb": _single_size_mb(manifest["global_model"]),
+    }
+    # metrics.json makes the family show up in the registry next to the single models
+    with open(os.path.join(FAMILY_DIR, "metrics.json"), "w") as f:
+        json.dump(metrics, f, indent=4)
+    register_model(FAMILY_DIR)
+
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    per_group.to_csv(os.path.join(BENCHMARK_DIR, f"state_family_{group_by}_groups.csv"), index=False)
+    latency.to_csv(os.path.join(BENCHMARK_DIR, f"state_family_{group_by}_latency.csv"), index=False)
+
+    f = metrics["family"]
+    print("\n" + per_group.round(4).to_string(index=False))
+    print("\n" + latency.round(3).to_string(index=False))
+    print(f"\nFamily: Macro F1 {metrics['macro_f1']:.4f} | C4 Recall {metrics['class_4_recall']:.4f} | "
+          f"{f['n_members']} members, {f['members_size_mb']:.1f} MB | "
+          f"{f['test_share_routed_to_members']:.1%} of test rows routed to a member")
+    print(f"Single: Macro F1 {metrics['single_model']['macro_f1']:.4f} | "
+          f"C4 Recall {metrics['single_model']['class_4_recall']:.4f} | {f['single_size_mb']:.1f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-state (or per-region) model family routed by State")
+    parser.add_argument("--group-by", choices=["state", "region"], default=GROUP_BY)
+    parser.add_argument("--min-train-rows", type=int, default=MIN_TRAIN_ROWS)
+    parser.add_argument("--workers", type=int, default=N_WORKERS)
+    args = parser.parse_args()
+    main(args.group_by, args.min_train_rows, args.workers)
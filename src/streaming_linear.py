@@ -0,0 +1,142 @@
+import os
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+
+from src.train_models import DATA_DIR, MODELS_ROOT, RANDOM_STATE, get_weights, save_all
+from src.binned_dataset import stratified_subsample
+from src.evaluation import confusion_matrix, metrics_from_confusion, predict_in_chunks, evaluate_predictions
+from src.bootstrap import confidence_intervals
+
+# ---------------- CONFIG ----------------
+NAME = "logistic_regression_sgd"
+MODEL_PARAMS = {
+    "loss": "log_loss",          # Logistic regression, so predict_proba works like the saga model
+    "penalty": "l2",
+    "alpha": 1e-6,
+    "learning_rate": "constant", # Step size is scheduled per epoch below
+    "eta0": 0.01,
+    "random_state": RANDOM_STATE,
+}
+EPOCHS = 20
+BATCH_SIZE = 10_000
+BLOCK_ROWS = 500_000         # Contiguous rows read from the memory-mapped store at a time
+HOLDOUT_ROWS = 200_000       # Stratified training rows held out for early stopping
+PATIENCE = 3                 # Epochs without holdout macro F1 gain before stopping
+LR_DECAY = 0.5               # eta0 multiplier after an epoch without improvement
+MIN_DELTA = 1e-4
+
+# ---------------- STREAMING ----------------
+
+def open_store(data_dir=DATA_DIR):
+    """Training matrix memory-mapped from train_data.pkl (only touched rows are read) and 0-indexed targets."""
+    X, y = joblib.load(os.path.join(data_dir, "train_data.pkl"), mmap_mode="r")
+    y = np.asarray(y)
+    return X, y - 1 if y.min() == 1 else y
+
+def iter_minibatches(X, y, exclude, rng, block_rows=BLOCK_ROWS, batch_size=BATCH_SIZE):
+    """Shuffled minibatches: blocks are visited in random order and rows are shuffled within each block.
+
+    Only one block is in memory at a time; rows flagged in `exclude` (the
+    holdout) are skipped.
+    """
+    starts = np.arange(0, X.shape[0], block_rows)
+    for start in rng.permutation(starts):
+        stop = min(start + block_rows, X.shape[0])
+        rows = np.flatnonzero(~exclude[start:stop])
+        block, block_y = X[start:stop][rows], y[start:stop][rows]
+        order = rng.permutation(len(rows))
+        for i in range(0, len(order), batch_size):
+            batch = order[i:i + batch_size]
+            yield block[batch], block_y[batch]
+
+def _holdout_macro_f1(model, X, y):
+    return float(metrics_from_confusion(confusion_matrix(y, model.predict(X)))["macro_f1"])
+
+def fit_streaming(X, y, class_weight, params=MODEL_PARAMS, epochs=EPOCHS, patience=PATIENCE,
+                  holdout_rows=HOLDOUT_ROWS):
+    """SGD logistic regression over minibatches of the on-disk store, with holdout early stopping.
+
+    The learning rate is multiplied by LR_DECAY after every epoch that does
+    not improve holdout macro F1; training stops after `patience` such
+    epochs and the best epoch's coefficients are restored.
+
+    Returns:
+        (fitted SGDClassifier, DataFrame with one row per epoch)
+    """
+    rng = np.random.default_rng(RANDOM_STATE)
+    classes = np.unique(y)
+    holdout = np.sort(stratified_subsample(np.arange(len(y)), y, holdout_rows, random_state=RANDOM_STATE))
+    exclude = np.zeros(len(y), dtype=bool)
+    exclude[holdout] = True
+    X_hold, y_hold = X[holdout], y[holdout]
+
+    model = SGDClassifier(**params, class_weight=class_weight)
+    best = {"macro_f1": -np.inf}
+    bad_epochs = 0
+    log = []
+    for epoch in range(1, epochs + 1):
+        start = time.time()
+        for X_batch, y_batch in iter_minibatches(X, y, exclude, rng):
+            model.partial_fit(X_batch, y_batch, classes=classes)
+        score = _holdout_macro_f1(model, X_hold, y_hold)
+        log.append({"epoch": epoch, "eta0": model.eta0, "holdout_macro_f1": score,
+                    "epoch_time_s": time.time() - start})
+        print(f"  epoch {epoch:>2} | eta0 {model.eta0:.5f} | holdout macro F1 {score:.4f} | "
+              f"{log[-1]['epoch_time_s']:.1f}s")
+
+        if score > best["macro_f1"] + MIN_DELTA:
+            best = {"macro_f1": score, "epoch": epoch,
+                    "coef": model.coef_.copy(), "intercept": model.intercept_.copy()}
+            bad_epochs = 0
+        else:
+            bad_epochs += 1
+            if bad_epochs >= patience:
+                break
+            model.set_params(eta0=model.eta0 * LR_DECAY)
+
+    model.coef_, model.intercept_ = best["coef"], best["intercept"]
+    history = pd.DataFrame(log)
+    history.attrs["best_epoch"] = best["epoch"]
+    return model, history
+
+# ---------------- MAIN ----------------
+
+def main(epochs=EPOCHS):
+    X_train, y_train = open_store()
+    weights_dict = get_weights(y_train)
+
+    print(f"\n>>> Starting: {NAME} ({X_train.shape[0]} rows, batches of {BATCH_SIZE})")
+    start_train = time.time()
+    model, history = fit_streaming(X_train, y_train, weights_dict, epochs=epochs)
+    train_time = time.time() - start_train
+    del X_train
+
+    X_test, y_test = joblib.load(os.path.join(DATA_DIR, "test_data.pkl"))
+    y_test = np.asarray(y_test) - 1
+    preds, inference_time = predict_in_chunks(model, X_test)
+    metrics = evaluate_predictions(y_test, preds, inference_time)
+    metrics["training_time"] = train_time
+    metrics["bootstrap"] = confidence_intervals(metrics["confusion_matrix"])
+    metrics["early_stopping"] = {
+        "best_iteration": int(history.attrs["best_epoch"]),   # Epochs, for this model
+        "monitor": "macro_f1",
+        "patience": PATIENCE,
+        "validation_size": HOLDOUT_ROWS,
+        "val_macro_f1": float(history["holdout_macro_f1"].max()),
+        "n_epochs": len(history),
+    }
+
+    save_all(NAME, model, metrics, weights_dict)
+    history.to_csv(os.path.join(MODELS_ROOT, NAME, "epochs.csv"), index=False)
+    print(f"Finished {NAME}. Macro F1: {metrics['macro_f1']:.4f} | C4 Recall: {metrics['class_4_recall']:.4f} | "
+          f"{train_time:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming SGD logistic regression over the on-disk store")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    args = parser.parse_args()
+    main(args.epochs)
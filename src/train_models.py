@@ -1,21 +1,30 @@
 import os
+import argparse
 import joblib
 import json
 import time
 import numpy as np
 import pandas as pd
 from sklearn.utils.class_weight import compute_class_weight
-from sklearn.metrics import f1_score, classification_report, confusion_matrix
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
 from lightgbm import LGBMClassifier
 from xgboost import XGBClassifier
+from src.early_stopping import fit_with_early_stopping, supports_early_stopping
+from src.registry import register_model
+from src.native_export import export_native, feature_names_from
+from src.evaluation import predict_in_chunks, evaluate_predictions
+from src.bootstrap import confidence_intervals, paired_comparisons
+from src.experiment_cache import experiment_key, load_cached, save_key
+from src.matrix_format import training_matrix
 
 # ---------------- CONFIG ----------------
 DATA_DIR = "data/training_ready/"
 MODELS_ROOT = "model/"
 PREPROCESSOR_PATH = "models/preprocessor.pkl"
 RANDOM_STATE = 42
+EARLY_STOPPING = True        # Carve out a validation split and stop GBMs early
+PATIENCE = 50
 
 MODELS_CONFIG = {
     "logistic_regression": {
@@ -64,6 +73,19 @@ MODELS_CONFIG = {
 
 # ---------------- HELPERS ----------------
 
+def _format_ci(interval):
+    return f"[{interval['low']:.4f}, {interval['high']:.4f}]"
+
+def _log_entry(name, metrics):
+    return {
+        "model": name,
+        "macro_f1": metrics["macro_f1"],
+        "macro_f1_ci": _format_ci(metrics["bootstrap"]["macro_f1"]),
+        "class_4_recall": metrics["class_4_recall"],
+        "class_4_recall_ci": _format_ci(metrics["bootstrap"]["class_4_recall"]),
+        "train_time": metrics["training_time"]
+    }
+
 def load_data():
     X_train, y_train = joblib.load(os.path.join(DATA_DIR, "train_data.pkl"))
     X_test, y_test = joblib.load(os.path.join(DATA_DIR, "test_data.pkl"))
@@ -75,22 +97,6 @@ def get_weights(y_train):
     weights = compute_class_weight("balanced", classes=classes, y=y_train)
     return dict(zip(classes, weights))
 
-def evaluate_model(model, X_test, y_test):
-    start_time = time.time()
-    preds = model.predict(X_test)
-    inference_time = time.time() - start_time
-    
-    report = classification_report(y_test, preds, output_dict=True)
-    
-    return {
-        "macro_f1": f1_score(y_test, preds, average="macro"),
-        "weighted_f1": f1_score(y_test, preds, average="weighted"),
-        "inference_time_cpu": inference_time,
-        "class_4_recall": report["3"]["recall"], # index 3 is Severity 4
-        "report": report,
-        "confusion_matrix": confusion_matrix(y_test, preds).tolist()
-    }
-
 def save_all(name, model, metrics, weights):
     path = os.path.join(MODELS_ROOT, name)
     os.makedirs(path, exist_ok=True)
@@ -103,13 +109,20 @@ def save_all(name, model, metrics, weights):
     with open(os.path.join(path, "class_weights.json"), "w") as f:
         json.dump({int(k)+1: v for k, v in weights.items()}, f, indent=4)
 
+    # Booster in its native format too, for fast, version-tolerant loading when serving
+    export_native(model, path, feature_names_from())
+
+    # Index the artifact so it can be listed and compared without opening it
+    register_model(path)
+
 # ---------------- MAIN ----------------
 
-def main():
+def main(force=False):
     X_train, X_test, y_train, y_test = load_data()
     weights_dict = get_weights(y_train)
     
     comparison_log = []
+    test_predictions = {}   # int8 labels per model, for the paired comparison
 
     for name, config in MODELS_CONFIG.items():
         print(f"\n>>> Starting: {name}")
@@ -122,29 +135,54 @@ def main():
         else:
             params["class_weight"] = weights_dict
         
+        # Reuse the saved model when data, class, params and code are unchanged
+        key, key_parts = experiment_key(os.path.join(DATA_DIR, "train_data.pkl"), config["class"], params,
+                                       code=[main, load_data, get_weights],
+                                       settings={"early_stopping": EARLY_STOPPING, "patience": PATIENCE},
+                                       test_path=os.path.join(DATA_DIR, "test_data.pkl"))
+        cached = load_cached(os.path.join(MODELS_ROOT, name), key, force=force)
+        if cached:
+            model, metrics = cached
+            print(f"Reusing {name} (experiment key {key[:12]} unchanged; --force to retrain)")
+            test_predictions[name], _ = predict_in_chunks(model, X_test)
+            comparison_log.append(_log_entry(name, metrics))
+            continue
+
+        # Layout picked by src/matrix_format.py for this library (CSR by default)
+        X_fit = training_matrix(X_train, config["class"])
+
         model = config["class"](**params)
         
         # Train
         start_train = time.time()
-        if name == "xgboost":
-            model.fit(X_train, y_train, sample_weight=sample_weights)
+        early_stopping = None
+        if EARLY_STOPPING and supports_early_stopping(model):
+            early_stopping = fit_with_early_stopping(
+                model, X_fit, y_train,
+                sample_weight=sample_weights if name == "xgboost" else None,
+                patience=PATIENCE
+            )
+        elif name == "xgboost":
+            model.fit(X_fit, y_train, sample_weight=sample_weights)
         else:
-            model.fit(X_train, y_train)
+            model.fit(X_fit, y_train)
         train_time = time.time() - start_train
+        del X_fit
         
         # Eval
-        metrics = evaluate_model(model, X_test, y_test)
+        preds, inference_time = predict_in_chunks(model, X_test)
+        metrics = evaluate_predictions(y_test, preds, inference_time)
         metrics["training_time"] = train_time
+        metrics["bootstrap"] = confidence_intervals(metrics["confusion_matrix"])
+        test_predictions[name] = preds
+        if early_stopping:
+            metrics["early_stopping"] = early_stopping
         
         # Save
         save_all(name, model, metrics, weights_dict)
+        save_key(os.path.join(MODELS_ROOT, name), key, key_parts)
         
-        comparison_log.append({
-            "model": name,
-            "macro_f1": metrics["macro_f1"],
-            "class_4_recall": metrics["class_4_recall"],
-            "train_time": train_time
-        })
+        comparison_log.append(_log_entry(name, metrics))
         
         print(f"Finished {name}. Macro F1: {metrics['macro_f1']:.4f} | C4 Recall: {metrics['class_4_recall']:.4f}")
 
@@ -154,5 +192,15 @@ def main():
     print("="*30)
     print(pd.DataFrame(comparison_log).sort_values("macro_f1", ascending=False))
 
+    # Paired bootstrap on the same test rows: is the Macro F1 gap bigger than resampling noise?
+    paired = paired_comparisons(y_test, test_predictions)
+    paired.to_csv(os.path.join(MODELS_ROOT, "paired_comparison.csv"), index=False)
+    print("\nPaired differences (model_a - model_b, 95% bootstrap CI):")
+    print(paired[paired["metric"].isin(["macro_f1", "class_4_recall"])].round(4).to_string(index=False))
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--force", action="store_true",
+                        help="retrain even when a model with the same experiment key is saved")
+    args = parser.parse_args()
+    main(force=args.force)
\ No newline at end of file
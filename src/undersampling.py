@@ -0,0 +1,152 @@
+import os
+import time
+import argparse
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from imblearn.under_sampling import RandomUnderSampler
+
+from src.streaming_linear import open_store
+from src.binned_dataset import balanced_sample_weights
+from src.cross_validation import registered_models, _with_threads
+from src.evaluation import evaluate_model, N_CLASSES
+from src.benchmark_report import make_record, append_records, peak_rss_mb
+
+# ---------------- CONFIG ----------------
+DATA_DIR = "data/training_ready/"
+OUTPUT_DIR = "evaluations/undersampling/"
+MAJORITY_CLASS = 1           # Severity 2, 0-indexed
+RATIOS = [1.0, 0.5, 0.25, 0.1]   # Fraction of majority rows kept (1.0 = full data)
+BLOCK_ROWS = 500_000         # Rows read from the memory-mapped store at a time
+N_THREADS = os.cpu_count() or 1
+RANDOM_STATE = 42
+
+# ---------------- SAMPLING ----------------
+
+def _block_sample(y_block, ratio, majority, random_state):
+    """Local row positions kept from one block: every minority row, round(ratio * n) majority rows."""
+    n_majority = int((y_block == majority).sum())
+    if ratio >= 1 or n_majority == 0:
+        return np.arange(len(y_block))
+    sampler = RandomUnderSampler(
+        sampling_strategy={majority: int(round(n_majority * ratio))}, random_state=random_state
+    )
+    # Resample positions rather than the rows themselves; only the kept rows are read afterwards.
+    sampler.fit_resample(np.arange(len(y_block)).reshape(-1, 1), y_block)
+    return np.sort(sampler.sample_indices_)
+
+def undersample(X, y, ratio, majority=MAJORITY_CLASS, block_rows=BLOCK_ROWS, random_state=RANDOM_STATE):
+    """Keep `ratio` of the majority class in one pass over X, with compensating weights.
+
+    Blocks are sampled independently, so the kept rows stay spread over the
+    whole store and only one block is in memory at a time. Each row gets its
+    balanced class weight computed on the full data; kept majority rows are
+    further scaled by 1 / ratio, so the weighted loss over the sample
+    estimates the weighted loss over the full store.
+
+    Returns:
+        (X_sample, y_sample, sample_weight)
+    """
+    y = np.asarray(y)
+    classes = np.unique(y)
+    full_weights = balanced_sample_weights(y)
+    class_weight = np.array([full_weights[y == c][0] for c in classes])
+
+    rng = np.random.RandomState(random_state)
+    blocks, kept = [], []
+    for start in range(0, len(y), block_rows):
+        stop = min(start + block_rows, len(y))
+        rows = _block_sample(y[start:stop], ratio, majority, rng.randint(np.iinfo(np.int32).max))
+        blocks.append(X[start:stop][rows])
+        kept.append(rows + start)
+    kept = np.concatenate(kept)
+    X_sample = sp.vstack(blocks, format="csr") if sp.issparse(X) else np.concatenate(blocks)
+    y_sample = y[kept]
+
+    sample_weight = class_weight[np.searchsorted(classes, y_sample)]
+    sample_weight[y_sample == majority] /= ratio
+    return X_sample, y_sample, sample_weight
+
+# ---------------- COMPARISON ----------------
+
+def fit_weighted(config, X, y, sample_weight, n_threads=N_THREADS):
+    """Fit a registered config with explicit per-sample weights (instead of its class weights)."""
+    model = config["class"](**_with_threads(config, n_threads))
+    model.fit(X, y, sample_weight=sample_weight)
+    return model
+
+def compare_ratios(name, config, ratios=RATIOS, data_dir=DATA_DIR, n_threads=N_THREADS, run_id=None):
+    """Train `config` once per ratio and report training time and per-class metrics against full data.
+
+    Returns:
+        DataFrame with one row per ratio; *_delta columns are relative to ratio 1.0.
+    """
+    run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+    X_train, y_train = open_store(data_dir)
+    X_test, y_test = joblib.load(os.path.join(data_dir, "test_data.pkl"))
+    y_test = np.asarray(y_test) - 1
+
+    rows = []
+    for ratio in sorted(set(ratios) | {1.0}, reverse=True):
+        start = time.time()
+        X_s, y_s, weight = undersample(X_train, y_train, ratio)
+        sample_time = time.time() - start
+
+        baseline_rss = peak_rss_mb()
+        start = time.time()
+        model = fit_weighted(config, X_s, y_s, weight, n_threads)
+        train_time = time.time() - start
+        metrics = evaluate_model(model, X_test, y_test)
+        print(f"{name} | ratio {ratio:.2f} | {len(y_s)} rows | sample {sample_time:.1f}s | "
+              f"train {train_time:.1f}s | Macro F1 {metrics['macro_f1']:.4f} | "
+              f"C4 Recall {metrics['class_4_recall']:.4f}")
+
+        append_records([make_record(
+            "training", f"{name}_undersampled_{ratio:g}", config["class"].__name__, n_threads, run_id,
+            dataset="real", n_rows=int(len(y_s)), n_features=int(X_s.shape[1]),
+            wall_time_s=train_time, rows_per_s=len(y_s) / train_time,
+            baseline_rss_mb=baseline_rss, peak_rss_mb=peak_rss_mb(), model_size_mb=None,
+            params={"majority_ratio": ratio, "majority_class": MAJORITY_CLASS + 1},
+        )], "training")
+
+        row = {"model": name, "ratio": ratio, "n_rows": len(y_s),
+               "sample_time_s": sample_time, "train_time_s": train_time,
+               "macro_f1": metrics["macro_f1"], "class_4_recall": metrics["class_4_recall"]}
+        for c in range(N_CLASSES):
+            report = metrics["report"][str(c)]
+            row[f"severity_{c + 1}_precision"] = report["precision"]
+            row[f"severity_{c + 1}_recall"] = report["recall"]
+            row[f"severity_{c + 1}_f1"] = report["f1-score"]
+        rows.append(row)
+        del X_s, model
+
+    table = pd.DataFrame(rows)
+    full = table[table["ratio"] == 1.0].iloc[0]
+    table["speedup"] = full["train_time_s"] / table["train_time_s"]
+    metric_cols = ["macro_f1", "class_4_recall"] + [c for c in table.columns if c.startswith("severity_")]
+    for col in metric_cols:
+        table[f"{col}_delta"] = table[col] - full[col]
+    return table
+
+# ---------------- MAIN ----------------
+
+def main(model="lightgbm", ratios=RATIOS):
+    configs = {name: config for name, config, _ in registered_models()}
+    table = compare_ratios(model, configs[model], ratios)
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    path = os.path.join(OUTPUT_DIR, f"{model}_undersampling.csv")
+    table.to_csv(path, index=False)
+    cols = ["ratio", "n_rows", "train_time_s", "speedup", "macro_f1", "macro_f1_delta",
+            "class_4_recall", "class_4_recall_delta"]
+    print("\n" + table[cols].round(4).to_string(index=False))
+    print(f"\nSaved {path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Majority-class undersampling vs full-data training")
+    parser.add_argument("--model", default="lightgbm", help="name of a model in the training scripts")
+    parser.add_argument("--ratios", type=float, nargs="+", default=RATIOS,
+                        help="fraction of Severity 2 rows kept")
+    args = parser.parse_args()
+    main(args.model, args.ratios)
@@ -20,6 +20,9 @@ from streamlit_extras.add_vertical_space import add_vertical_space
 import holidays
 us_holidays = holidays.US()
 from db_mysql_config import AccidentPredictionDB, init_db_session
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # project root, for src/
+from src.native_export import has_native, load_native
 
 # Page configuration
 st.set_page_config(
@@ -70,13 +73,44 @@ def set_page(page_name):
     st.session_state.page = page_name
     st.rerun()
 
+# Served model, chosen explicitly (a missing artifact is an error, never a silent fallback):
+#   "zip"          model.pkl.zip
+#   "native"       booster exported to NATIVE_MODEL_DIR (src/native_export.py)
+#   "state_family" per-state models in STATE_FAMILY_DIR (src/state_models.py)
+#   "cascade"      logistic regression first, the GBM on escalation, in CASCADE_DIR (src/cascade.py)
+SERVING_MODEL = "zip"
+NATIVE_MODEL_DIR = "model/fine/lightgbm_tuned"
+STATE_FAMILY_DIR = "model/state_family"
+CASCADE_DIR = "model/cascade"
+
 # Load model and preprocessor
 @st.cache_resource
 def load_model():
     try:
-        with zipfile.ZipFile("model.pkl.zip", "r") as z:
-            with z.open("model.pkl") as file:
-                model = joblib.load(file)
+        if SERVING_MODEL == "state_family":
+            from src.state_models import has_family, load_family   # Only this branch needs the family code
+            if not has_family(STATE_FAMILY_DIR):
+                raise FileNotFoundError(f"SERVING_MODEL is 'state_family' but {STATE_FAMILY_DIR} has no family.json; "
+                                        "run python -m src.state_models")
+            model = load_family(STATE_FAMILY_DIR)
+        elif SERVING_MODEL == "cascade":
+            from src.cascade import has_cascade, load_cascade
+            if not has_cascade(CASCADE_DIR):
+                raise FileNotFoundError(f"SERVING_MODEL is 'cascade' but {CASCADE_DIR} has no cascade.json; "
+                                        "run python -m src.cascade")
+            model = load_cascade(CASCADE_DIR)
+        elif SERVING_MODEL == "native":
+            if not has_native(NATIVE_MODEL_DIR):
+                raise FileNotFoundError(f"SERVING_MODEL is 'native' but {NATIVE_MODEL_DIR} has no native export; "
+                                        "run python -m src.native_export")
+            model = load_native(NATIVE_MODEL_DIR)
+        elif SERVING_MODEL == "zip":
+            with zipfile.ZipFile("model.pkl.zip", "r") as z:
+                with z.open("model.pkl") as file:
+                    model = joblib.load(file)
+        else:
+            raise ValueError(f"Unknown SERVING_MODEL: {SERVING_MODEL}")
+        print(f"Serving model: {SERVING_MODEL}")
         # model = joblib.load('model.pkl')
         preprocessor = joblib.load('preprocessing/new/preprocessor.pkl')
         return model, preprocessor
@@ -578,6 +612,38 @@ def show_dashboard_page():
         map.add_child(heatmap)
         folium_static(map)
 
+    add_vertical_space(5)
+    show_slice_performance()
+
+@st.cache_data
+def load_slice_report(path="evaluations/slices/slice_report.parquet"):
+    return pd.read_parquet(path)
+
+def show_slice_performance():
+    """Where the models fail: per-slice metrics written by src/slice_evaluation.py"""
+    st.markdown("### Model Performance by Slice")
+    try:
+        report = load_slice_report()
+    except Exception:
+        st.info("Slice report not found. Run `python -m src.slice_evaluation` to generate it.")
+        return
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        model_name = st.selectbox("Model", sorted(report['model'].unique()))
+    with c2:
+        slice_column = st.selectbox("Slice by", list(report['slice_column'].cat.categories))
+    with c3:
+        metric = st.selectbox("Metric", ['class_4_recall', 'macro_f1', 'accuracy', 'weighted_f1'])
+
+    view = report[(report['model'] == model_name) & (report['slice_column'] == slice_column)]
+    view = view[view['n_rows'] >= 100].sort_values(metric).head(40)
+    fig = px.bar(view, x='slice_value', y=metric, hover_data=['n_rows', 'support_4'],
+                 title=f'{metric} by {slice_column} (lowest 40 slices with 100+ rows)',
+                 color_discrete_sequence=px.colors.qualitative.Pastel)
+    fig.update_layout(xaxis_title=slice_column, yaxis_title=metric)
+    st.plotly_chart(fig, use_container_width=True)
+
 @lru_cache(maxsize=100)
 def get_state_from_coords(lat, lon):
     """
@@ -1091,8 +1157,11 @@ def show_prediction_page():
                 # Apply preprocessing
                 X_processed = preprocessor.transform(input_df)
                 
-                # Predict
-                prediction_proba = model.predict_proba(X_processed)[0]
+                # Predict (the state family routes by the State found above)
+                if getattr(model, "group_by", None):
+                    prediction_proba = model.predict_proba(X_processed, states=[state])[0]
+                else:
+                    prediction_proba = model.predict_proba(X_processed)[0]
                 
                 # Get class labels in correct order
                 class_labels = model.classes_ + 1
@@ -0,0 +1,32 @@
+import numpy as np
+import scipy.sparse as sp
+from src.backtest import month_index, month_label, make_windows, split_chains, run_chain
+from src.binned_dataset import build_binned_dataset, share_matrix
+
+
+def test_windows_train_on_past_months_and_test_on_the_next():
+    periods = np.repeat(month_index(2016, np.arange(1, 7)), 10)
+    assert month_label(periods[0]) == "2016-01"
+    windows = make_windows(periods, min_train_months=2, step=2)
+    assert [(w["train_stop"], w["test_start"], w["test_stop"]) for w in windows] == [(20, 20, 30), (40, 40, 50)]
+    assert month_label(windows[-1]["test_month"]) == "2016-05"
+    chains = split_chains(make_windows(periods, 1), n_workers=2)
+    assert [len(c) for c in chains] == [3, 2] and chains[1][0]["train_end"] == month_index(2016, 4)
+
+
+def test_chain_warm_starts_from_previous_window(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(3000, 5))
+    y = ((X[:, 0] > 0).astype(int) + 2 * (X[:, 1] > 1)).astype(np.int8)
+    periods = np.repeat(month_index(2020, np.arange(1, 7)), 500)
+    meta = {"matrix": share_matrix(sp.csr_matrix(X), str(tmp_path / "matrix.pkl"), source=None),
+            "labels": str(tmp_path / "labels.npz"),
+            "binned": build_binned_dataset(X, y, path=str(tmp_path / "backtest.bin"), source=None)}
+    np.savez(meta["labels"], y=y, periods=periods)
+
+    params = {"objective": "multiclass", "num_class": 4, "n_estimators": 20, "num_leaves": 7, "random_state": 0}
+    results = run_chain(make_windows(periods, 3), params, meta, warm_rounds=5, n_threads=1)
+    assert [r["warm_start"] for r in results] == [False, True, True]
+    assert [r["total_trees"] for r in results] == [20, 25, 30]
+    assert [r["n_train"] for r in results] == [1500, 2000, 2500]
+    assert all(r["n_test"] == 500 and r["macro_f1"] > 0.6 for r in results)
@@ -0,0 +1,59 @@
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from lightgbm import LGBMClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import FunctionTransformer
+import src.benchmark_inference as bi
+from src.benchmark_inference import make_batches, time_batches, pin_threads, benchmark_model
+from src.benchmark_report import COMMON_FIELDS, KIND_FIELDS
+
+
+def test_make_batches_are_contiguous_windows_inside_the_data():
+    rng = np.random.default_rng(0)
+    batches = make_batches(100, 8, rng, n_batches=20)
+    assert len(batches) == 20
+    for window in batches:
+        assert len(window) == 8 and window[0] >= 0 and window[-1] < 100
+        assert (np.diff(window) == 1).all()
+    # Batch size is capped at the rows available
+    assert [len(w) for w in make_batches(5, 1_000, rng, n_batches=3)] == [5, 5, 5]
+
+
+def test_time_batches_times_each_batch_once(monkeypatch):
+    monkeypatch.setattr(bi, "WARMUP", 0)
+    monkeypatch.setattr(bi, "MIN_REPEATS", 4)
+    monkeypatch.setattr(bi, "MAX_REPEATS", 4)
+    seen = []
+    latencies = time_batches(seen.append, ["a", "b", "c", "d"])
+    assert seen == ["a", "b", "c", "d"]
+    assert latencies.shape == (4,) and (latencies >= 0).all()
+
+
+def test_pin_threads_sets_n_jobs():
+    model = LGBMClassifier(n_jobs=-1)
+    assert pin_threads(model, 1) == {}
+    assert model.get_params()["n_jobs"] == 1
+    assert pin_threads(LogisticRegression(), 2) == {}
+
+
+def test_benchmark_model_records_follow_the_inference_schema(tmp_path, monkeypatch):
+    monkeypatch.setattr(bi, "MIN_REPEATS", 2)
+    monkeypatch.setattr(bi, "MAX_REPEATS", 2)
+    rng = np.random.default_rng(0)
+    raw = pd.DataFrame(rng.normal(size=(50, 3)), columns=["a", "b", "c"])
+    y = (raw["a"] > 0).astype(int)
+    path = tmp_path / "model.pkl"
+    joblib.dump(LGBMClassifier(n_estimators=5, verbose=-1).fit(raw.values, y), path)
+    preprocessor = FunctionTransformer(lambda df: df.values)
+
+    records = benchmark_model("toy", str(path), raw, sp.csr_matrix(raw.values), preprocessor,
+                              [1, 10], 1, "run")
+    assert len(records) == 4   # (batch size) x (with / without preprocessing)
+    expected = set(COMMON_FIELDS) | set(KIND_FIELDS["inference"])
+    for record in records:
+        assert set(record) == expected
+        assert record["kind"] == "inference" and record["n_repeats"] == 2
+    assert sorted((r["batch_size"], r["preprocessing"]) for r in records) == \
+        [(1, False), (1, True), (10, False), (10, True)]
@@ -0,0 +1,31 @@
+import pytest
+from src.benchmark_report import make_record, append_records, load_records, normalize_metrics
+
+
+def _training_fields(**overrides):
+    fields = dict(dataset="synthetic", n_rows=100, n_features=5, wall_time_s=1.0, rows_per_s=100.0,
+                  baseline_rss_mb=10.0, peak_rss_mb=20.0, model_size_mb=0.5, params={})
+    fields.update(overrides)
+    return fields
+
+
+def test_records_round_trip(tmp_path):
+    record = make_record("training", "lightgbm", "LGBMClassifier", 4, "run", **_training_fields())
+    append_records([record], "training", output_dir=tmp_path)
+    df = load_records("training", output_dir=tmp_path)
+    assert df.loc[0, "rows_per_s"] == 100.0
+    assert df.loc[0, "schema_version"] == record["schema_version"]
+
+
+def test_schema_rejects_unknown_fields():
+    with pytest.raises(ValueError):
+        make_record("training", "lightgbm", "LGBMClassifier", 4, "run",
+                    **_training_fields(training_time=1.0))
+
+
+def test_normalize_legacy_metrics():
+    legacy = {"training_time_seconds": 5.0, "macro_avg_f1": 0.4, "f1_weighted": 0.6,
+              "accuracy": 0.5, "class_performance": {"4": {"recall": 0.8}}}
+    current = {"training_time": 5.0, "macro_f1": 0.4, "weighted_f1": 0.6,
+               "class_4_recall": 0.8, "report": {"accuracy": 0.5}}
+    assert normalize_metrics(legacy) == normalize_metrics(current)
@@ -0,0 +1,30 @@
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from src.binned_dataset import build_binned_dataset, share_matrix, balanced_sample_weights
+
+
+def test_cached_files_rebuild_when_the_source_changes(tmp_path, capsys):
+    rng = np.random.default_rng(0)
+    X = sp.csr_matrix(rng.normal(size=(400, 5)))
+    y = rng.integers(0, 4, 400)
+    source = str(tmp_path / "train_data.pkl")
+    joblib.dump((X, y), source)
+    binned, matrix = str(tmp_path / "train.bin"), str(tmp_path / "matrix.pkl")
+
+    build_binned_dataset(X, y, path=binned, source=source)
+    build_binned_dataset(X, y, path=binned, source=source)
+    assert capsys.readouterr().out.count("Binning") == 1
+
+    # Different weights, then a new store of the same shape: both rebuild
+    build_binned_dataset(X, y, weight=balanced_sample_weights(y), path=binned, source=source)
+    assert "Binning" in capsys.readouterr().out
+    X_new = sp.csr_matrix(rng.normal(size=(400, 5)))
+    joblib.dump((X_new, y), source)
+    build_binned_dataset(X_new, y, weight=balanced_sample_weights(y), path=binned, source=source)
+    assert "Binning" in capsys.readouterr().out
+
+    share_matrix(X, matrix, source=source)
+    joblib.dump((X, y[::-1]), source)
+    share_matrix(X_new, matrix, source=source)
+    assert (joblib.load(matrix) != X_new).nnz == 0
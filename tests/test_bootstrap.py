@@ -0,0 +1,30 @@
+import numpy as np
+from src.bootstrap import confidence_intervals, joint_counts, paired_bootstrap
+from src.evaluation import confusion_matrix
+
+
+def _labels(n=20000, accuracy=0.6, seed=0):
+    rng = np.random.default_rng(seed)
+    y_true = rng.choice(4, n, p=[0.05, 0.7, 0.2, 0.05])
+    y_pred = np.where(rng.random(n) < accuracy, y_true, rng.integers(0, 4, n))
+    return y_true, y_pred
+
+
+def test_confidence_interval_brackets_estimate():
+    y_true, y_pred = _labels()
+    ci = confidence_intervals(confusion_matrix(y_true, y_pred), n_boot=500)
+    assert ci["macro_f1"]["low"] < ci["macro_f1"]["estimate"] < ci["macro_f1"]["high"]
+    assert ci["per_class"]["3"]["recall"]["estimate"] == ci["class_4_recall"]["estimate"]
+
+
+def test_paired_bootstrap():
+    y_true, pred_a = _labels()
+    joint = joint_counts(y_true, pred_a, pred_a)
+    assert np.array_equal(joint.sum(axis=2), confusion_matrix(y_true, pred_a))
+
+    same = paired_bootstrap(y_true, pred_a, pred_a, n_boot=200)
+    assert same["macro_f1"]["low"] == same["macro_f1"]["high"] == 0.0
+
+    _, pred_b = _labels(accuracy=0.3, seed=1)
+    better = paired_bootstrap(y_true, pred_a, pred_b, n_boot=200)
+    assert better["macro_f1"]["low"] > 0 and better["macro_f1"]["p_value"] < 0.05
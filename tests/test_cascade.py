@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from lightgbm import LGBMClassifier
+from sklearn.linear_model import LogisticRegression
+from src.cascade import Cascade, cascade_predictions, threshold_sweep, choose_threshold
+
+
+def test_cascade_escalates_only_unconfident_rows():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(1000, 5))
+    y = (X[:, 0] > 0).astype(int) + (X[:, 1] > 0).astype(int) * 2
+    first = LogisticRegression(max_iter=200).fit(X, y)
+    second = LGBMClassifier(n_estimators=50, verbose=-1).fit(X, y)
+
+    threshold = 0.6
+    cascade = Cascade(first, second, threshold)
+    proba = cascade.predict_proba(X)
+    first_proba, second_proba = first.predict_proba(X), second.predict_proba(X)
+    confident = first_proba.max(axis=1) >= threshold
+    assert 0 < confident.sum() < len(X)
+    np.testing.assert_allclose(proba[confident], first_proba[confident])
+    np.testing.assert_allclose(proba[~confident], second_proba[~confident])
+    assert cascade.served == {"first": int(confident.sum()), "second": int((~confident).sum())}
+
+    preds, answered = cascade_predictions(first_proba, second_proba, threshold)
+    np.testing.assert_array_equal(preds, cascade.predict(X[:len(preds)]))
+    np.testing.assert_array_equal(answered, confident)
+    np.testing.assert_allclose(cascade.predict_proba(X[:1]), proba[:1])   # Single request
+
+
+def test_choose_threshold_maximises_first_stage_share_under_floor():
+    sweep = pd.DataFrame({"threshold": [0.4, 0.6, 0.8, 0.9],
+                          "first_stage_share": [0.9, 0.7, 0.4, 0.2],
+                          "macro_f1": [0.5, 0.55, 0.6, 0.6],
+                          "class_4_recall": [0.5, 0.65, 0.7, 0.72]})
+    assert choose_threshold(sweep, 0.6)["threshold"] == 0.6
+    assert choose_threshold(sweep, 0.8) is None
+
+
+def test_threshold_sweep_shares_fall_as_threshold_rises():
+    rng = np.random.default_rng(1)
+    first_proba = rng.dirichlet(np.ones(4), size=500)
+    second_proba = rng.dirichlet(np.ones(4), size=500)
+    y = rng.integers(0, 4, size=500)
+    sweep = threshold_sweep(first_proba, second_proba, y)
+    assert sweep["first_stage_share"].iloc[0] == 1.0
+    assert (np.diff(sweep["first_stage_share"]) <= 0).all()
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+from src import catboost_native
+from src.catboost_native import native_frame, build_pools, fit_native, FEATURES, CATEGORICAL_FEATURES
+
+
+def _raw_frame(n=1500, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({col: rng.normal(size=n) for col in FEATURES})
+    for col in CATEGORICAL_FEATURES:
+        X[col] = pd.Categorical(rng.choice(["a", "b", "c", None], size=n))
+    X["State"] = pd.Categorical(rng.choice(["CA", "FL", "TX", "NY"], size=n))
+    y = 1 + (X["State"] == "CA").astype(int) + (X[FEATURES[0]] > 0.5).astype(int) * 2
+    return X, y
+
+
+def test_pools_are_cached_and_train_on_native_categories(tmp_path, monkeypatch):
+    X, y = _raw_frame()
+    source = tmp_path / "processed.parquet"
+    source.write_bytes(b"v1")
+    calls = []
+    monkeypatch.setattr(catboost_native, "DATA_PATH", str(source))
+    monkeypatch.setattr(catboost_native, "load_split", lambda: calls.append(1) or (X, None, y, None))
+
+    meta = build_pools(str(tmp_path / "pools"), {"border_count": 32})
+    assert build_pools(str(tmp_path / "pools"), {"border_count": 32}) == meta and len(calls) == 1
+    build_pools(str(tmp_path / "pools"), {"border_count": 16})      # New quantization -> rebuilt
+    assert len(calls) == 2
+
+    model, best_iteration = fit_native({"iterations": 40, "random_seed": 0, "allow_writing_files": False},
+                                       meta, patience=10, log_every=0)
+    assert 1 <= best_iteration <= 40 and model.get_cat_feature_indices()
+    frame = native_frame(X)
+    assert not frame[CATEGORICAL_FEATURES].isna().any().any()
+    assert (np.asarray(model.predict(frame)).ravel() == np.asarray(y) - 1).mean() > 0.8
@@ -0,0 +1,54 @@
+import numpy as np
+import scipy.sparse as sp
+from lightgbm import LGBMClassifier
+from src.checkpoint import Checkpointer
+from src.early_stopping import fit_with_early_stopping
+
+
+def _toy_data(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 10))
+    y = (X[:, 0] + rng.normal(size=n) > 0).astype(int) + (X[:, 1] > 1).astype(int) * 2
+    return sp.csr_matrix(X), y
+
+
+def _model(**params):
+    return LGBMClassifier(n_estimators=60, learning_rate=0.1, random_state=42, verbose=-1, **params)
+
+
+def test_checkpointing_does_not_change_an_uninterrupted_run(tmp_path):
+    X, y = _toy_data()
+    sampled = dict(colsample_bytree=0.8, subsample=0.8, subsample_freq=1)
+    plain = _model(**sampled)
+    fit_with_early_stopping(plain, X, y, patience=100, log_every=0)
+    checkpointed = _model(**sampled)
+    fit_with_early_stopping(checkpointed, X, y, patience=100, log_every=0,
+                            checkpoint=Checkpointer("full", rounds=20, root=tmp_path))
+    assert np.array_equal(plain.predict_proba(X), checkpointed.predict_proba(X))
+    assert (tmp_path / "full" / "model.txt").exists()
+
+
+def test_resume_matches_uninterrupted_run(tmp_path, monkeypatch):
+    # No row/column sampling: its RNG state is not checkpointed, so only this case replays exactly.
+    X, y = _toy_data()
+    full = _model()
+    fit_with_early_stopping(full, X, y, patience=100, log_every=0)
+
+    # Simulate a crash right after the first checkpoint is written.
+    save = Checkpointer.save
+    def crash(self, *args):
+        save(self, *args)
+        raise KeyboardInterrupt
+    monkeypatch.setattr(Checkpointer, "save", crash)
+    try:
+        fit_with_early_stopping(_model(), X, y, patience=100, log_every=0,
+                                checkpoint=Checkpointer("run", rounds=20, root=tmp_path))
+    except KeyboardInterrupt:
+        pass
+    monkeypatch.setattr(Checkpointer, "save", save)
+
+    resumed = _model()
+    fit_with_early_stopping(resumed, X, y, patience=100, log_every=0,
+                            checkpoint=Checkpointer("run", rounds=20, root=tmp_path, resume=True))
+    assert resumed.booster_.current_iteration() == full.booster_.current_iteration()
+    np.testing.assert_allclose(full.predict_proba(X), resumed.predict_proba(X), atol=1e-10)
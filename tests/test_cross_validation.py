@@ -0,0 +1,19 @@
+import numpy as np
+from src.cross_validation import fold_metrics, aggregate_folds
+
+
+def test_fold_metrics_reports_severity_labels():
+    y_true = np.array([0, 1, 2, 3, 3, 1])
+    y_pred = np.array([0, 1, 2, 3, 1, 1])
+    metrics = fold_metrics(y_true, y_pred)
+    assert set(metrics["per_class"]) == {"1", "2", "3", "4"}
+    assert metrics["class_4_recall"] == metrics["per_class"]["4"]["recall"] == 0.5
+
+
+def test_aggregate_folds_mean_and_std():
+    y_true = np.array([0, 1, 2, 3])
+    folds = [fold_metrics(y_true, y_true), fold_metrics(y_true, np.array([0, 1, 2, 2]))]
+    summary = aggregate_folds(folds)
+    assert summary["class_4_recall"]["mean"] == 0.5
+    assert summary["class_4_recall"]["std"] > 0
+    assert summary["per_class"]["1"]["f1"]["std"] == 0.0
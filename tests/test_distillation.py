@@ -0,0 +1,30 @@
+import numpy as np
+import scipy.sparse as sp
+from lightgbm import LGBMClassifier
+from src.distillation import soft_label_rows, fit_student, agreement_report, STUDENTS
+
+
+def test_soft_label_rows_carry_teacher_probabilities():
+    X = sp.csr_matrix(np.arange(12, dtype=float).reshape(3, 4))
+    proba = np.array([[0.7, 0.3, 0.0, 0.0],
+                      [0.005, 0.995, 0.0, 0.0],
+                      [0.25, 0.25, 0.25, 0.25]])
+    X_soft, y_soft, weight = soft_label_rows(X, proba, min_prob=0.01)
+    assert X_soft.shape[0] == len(y_soft) == len(weight) == 2 + 1 + 4
+    np.testing.assert_array_equal(y_soft, [0, 1, 1, 0, 1, 2, 3])
+    np.testing.assert_allclose(weight, [0.7, 0.3, 0.995, 0.25, 0.25, 0.25, 0.25])
+    np.testing.assert_array_equal(X_soft.toarray()[2], X.toarray()[1])
+
+
+def test_student_tracks_teacher():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 5))
+    y = (X[:, 0] > 0).astype(int) + (X[:, 1] > 0).astype(int) * 2
+    teacher = LGBMClassifier(n_estimators=100, verbose=-1).fit(X, y)
+    proba = teacher.predict_proba(X)
+
+    student = fit_student(STUDENTS["lightgbm_student"], X, proba)
+    summary, per_class = agreement_report(y, teacher.predict(X), student.predict(X))
+    assert summary["agreement"] > 0.95
+    assert list(per_class["severity"]) == [1, 2, 3, 4]
+    np.testing.assert_allclose(per_class["f1_gap"], per_class["student_f1"] - per_class["teacher_f1"])
@@ -0,0 +1,31 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import joblib
+import numpy as np
+from src.distributed_training import run_worker, free_ports, xgb_train_params
+
+
+def test_two_lightgbm_workers_train_one_model(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 5))
+    y = (X[:, 0] > 0).astype(int) + (X[:, 1] > 0).astype(int) * 2
+    shards = []
+    for rank, rows in enumerate(np.array_split(np.arange(2000), 2)):
+        shards.append(str(tmp_path / f"shard_{rank}.pkl"))
+        joblib.dump((X[rows], y[rows], np.ones(len(rows))), shards[-1])
+
+    params = {"objective": "multiclass", "num_class": 4, "n_estimators": 10, "n_jobs": 1}
+    machines = [f"127.0.0.1:{port}" for port in free_ports(2)]
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(run_worker, "LGBMClassifier", params, shard, rank, machines, "data", None, 1)
+                   for rank, shard in enumerate(shards)]
+        results = [f.result() for f in futures]
+
+    booster = results[0]["booster"]
+    assert results[1]["booster"] is None and booster.current_iteration() == 10
+    assert (booster.predict(X).argmax(axis=1) == y).mean() > 0.8
+
+
+def test_xgb_train_params():
+    params, rounds = xgb_train_params({"n_estimators": 50, "random_state": 1, "n_jobs": -1, "max_depth": 3}, 2)
+    assert rounds == 50 and params == {"seed": 1, "nthread": 2, "max_depth": 3}
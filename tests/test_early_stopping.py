@@ -0,0 +1,33 @@
+import numpy as np
+import scipy.sparse as sp
+from lightgbm import LGBMClassifier
+from src.early_stopping import split_validation, fit_with_early_stopping
+
+
+def _toy_data(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 10))
+    y = (X[:, 0] > 0).astype(int) + (X[:, 1] > 1).astype(int) * 2
+    return sp.csr_matrix(X), y
+
+
+def test_split_validation_is_stratified():
+    X, y = _toy_data()
+    X_fit, X_val, y_fit, y_val, w_fit, w_val = split_validation(X, y, val_size=0.2)
+    assert X_fit.shape[0] + X_val.shape[0] == X.shape[0]
+    assert w_fit is None and w_val is None
+    assert np.allclose(np.bincount(y_val) / len(y_val), np.bincount(y) / len(y), atol=0.01)
+
+
+def test_split_validation_sorts_csc_indices():
+    X, y = _toy_data()
+    X_fit, X_val, *_ = split_validation(X.tocsc(), y)
+    assert X_fit.has_sorted_indices and X_val.has_sorted_indices
+
+
+def test_lightgbm_truncated_to_best_iteration():
+    X, y = _toy_data()
+    model = LGBMClassifier(n_estimators=500, learning_rate=0.5, verbose=-1)
+    result = fit_with_early_stopping(model, X, y, patience=5, log_every=0)
+    assert result["best_iteration"] < 500
+    assert model.booster_.current_iteration() == result["best_iteration"]
@@ -0,0 +1,43 @@
+import numpy as np
+from sklearn.metrics import classification_report, f1_score
+from sklearn.metrics import confusion_matrix as sk_confusion_matrix
+from src.evaluation import (
+    confusion_matrix, metrics_from_confusion, StreamingConfusion,
+    classification_report as report_from_confusion
+)
+
+
+def _labels(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    y_true = rng.choice(4, n, p=[0.05, 0.7, 0.2, 0.05])
+    y_pred = np.where(rng.random(n) < 0.6, y_true, rng.integers(0, 4, n))
+    return y_true, y_pred
+
+
+def test_metrics_match_sklearn():
+    y_true, y_pred = _labels()
+    cm = confusion_matrix(y_true, y_pred)
+    assert np.array_equal(cm, sk_confusion_matrix(y_true, y_pred))
+
+    metrics = metrics_from_confusion(cm)
+    assert np.isclose(metrics["macro_f1"], f1_score(y_true, y_pred, average="macro"))
+    assert np.isclose(metrics["weighted_f1"], f1_score(y_true, y_pred, average="weighted"))
+
+    expected = classification_report(y_true, y_pred, output_dict=True)
+    report = report_from_confusion(cm)
+    for key in ("0", "3", "macro avg", "weighted avg"):
+        for metric, value in expected[key].items():
+            assert np.isclose(report[key][metric], value)
+    assert np.isclose(report["accuracy"], expected["accuracy"])
+
+
+def test_streaming_matches_single_pass_and_batches():
+    y_true, y_pred = _labels()
+    stream = StreamingConfusion()
+    for start in range(0, len(y_true), 700):
+        stream.update(y_true[start:start + 700], y_pred[start:start + 700])
+    assert np.array_equal(stream.matrix, confusion_matrix(y_true, y_pred))
+
+    stacked = np.stack([stream.matrix, confusion_matrix(*_labels(seed=1))])
+    assert metrics_from_confusion(stacked)["macro_f1"].shape == (2,)
+    assert np.isclose(metrics_from_confusion(stacked)["macro_f1"][0], stream.metrics()["macro_f1"])
@@ -0,0 +1,71 @@
+import joblib
+import numpy as np
+from lightgbm import LGBMClassifier
+import pytest
+from src.experiment_cache import experiment_key, load_cached, save_key, code_version, CODE_FILES
+
+
+def _train():
+    return "fit"
+
+
+def _train_changed():
+    return "fit differently"
+
+
+def test_key_tracks_params_and_data_and_reuses_saved_model(tmp_path):
+    data = tmp_path / "train_data.pkl"
+    joblib.dump(np.arange(10), data)
+    params = {"n_estimators": 10, "class_weight": {np.int64(0): np.float64(1.5)}}
+
+    key, parts = experiment_key(str(data), LGBMClassifier, params, code=[_train], settings={"patience": 50})
+    assert experiment_key(str(data), LGBMClassifier, dict(params), code=[_train], settings={"patience": 50})[0] == key
+    assert experiment_key(str(data), LGBMClassifier, {**params, "n_estimators": 11}, code=[_train])[0] != key
+
+    model_dir = tmp_path / "lightgbm"
+    model_dir.mkdir()
+    assert load_cached(str(model_dir), key) is None
+    joblib.dump({"model": 1}, model_dir / "model.pkl")
+    (model_dir / "metrics.json").write_text('{"macro_f1": 0.5}')
+    save_key(str(model_dir), key, parts)
+    model, metrics = load_cached(str(model_dir), key)
+    assert model == {"model": 1} and metrics["macro_f1"] == 0.5
+    assert load_cached(str(model_dir), key, force=True) is None
+
+    joblib.dump(np.arange(11), data)   # New training store -> new key
+    assert experiment_key(str(data), LGBMClassifier, params, code=[_train], settings={"patience": 50})[0] != key
+
+
+def test_key_misses_on_test_store_or_code_change(tmp_path):
+    data, test = tmp_path / "train_data.pkl", tmp_path / "test_data.pkl"
+    joblib.dump(np.arange(10), data)
+    joblib.dump(np.arange(5), test)
+    params = {"n_estimators": 10}
+    key, parts = experiment_key(str(data), LGBMClassifier, params, code=[_train], test_path=str(test))
+    model_dir = tmp_path / "lightgbm"
+    model_dir.mkdir()
+    joblib.dump({"model": 1}, model_dir / "model.pkl")
+    (model_dir / "metrics.json").write_text('{"macro_f1": 0.5}')
+    save_key(str(model_dir), key, parts)
+
+    changed_code = experiment_key(str(data), LGBMClassifier, params, code=[_train_changed], test_path=str(test))[0]
+    assert changed_code != key and load_cached(str(model_dir), changed_code) is None
+
+    joblib.dump(np.arange(6), test)    # Regenerated test store: saved test metrics are stale
+    changed_test = experiment_key(str(data), LGBMClassifier, params, code=[_train], test_path=str(test))[0]
+    assert changed_test != key and load_cached(str(model_dir), changed_test) is None
+
+
+def test_key_tracks_matrix_layout_and_requires_code_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)   # Code files resolve against the repo, format_choice.json against the CWD
+    joblib.dump(np.arange(10), "train_data.pkl")
+    key, parts = experiment_key("train_data.pkl", LGBMClassifier, {}, code=[_train])
+    assert parts["matrix_format"] == "csr"
+
+    choice = tmp_path / "data" / "training_ready" / "formats" / "format_choice.json"
+    choice.parent.mkdir(parents=True)
+    choice.write_text('{"LGBMClassifier": {"format": "csc"}}')
+    assert experiment_key("train_data.pkl", LGBMClassifier, {}, code=[_train])[0] != key
+
+    with pytest.raises(FileNotFoundError):
+        code_version(code_files=CODE_FILES + ["src/no_such_module.py"])
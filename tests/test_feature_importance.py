@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from src.feature_importance import feature_groups, permute_group
+
+
+def test_feature_groups_cover_one_hot_blocks():
+    df = pd.DataFrame({"Temperature(F)": [1.0, 2.0, 3.0], "State": ["CA", "TX", "NY"],
+                       "season": ["winter", "summer", "winter"], "Junction": [True, False, True]})
+    pre = ColumnTransformer([
+        ("num", StandardScaler(), ["Temperature(F)"]),
+        ("cat", OneHotEncoder(), ["State", "season"]),
+        ("bool", "passthrough", ["Junction"]),
+    ]).fit(df)
+    assert feature_groups(pre) == {"Temperature(F)": (0, 1), "State": (1, 4), "season": (4, 6), "Junction": (6, 7)}
+
+
+def test_permute_group_only_moves_the_group():
+    X = sp.csr_matrix(np.arange(20, dtype=float).reshape(5, 4))
+    perm = np.array([4, 3, 2, 1, 0])
+    shuffled = permute_group(X, 1, 3, perm).toarray()
+    assert np.array_equal(shuffled[:, [0, 3]], X.toarray()[:, [0, 3]])
+    assert np.array_equal(shuffled[:, 1:3], X.toarray()[perm, 1:3])
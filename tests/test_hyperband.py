@@ -0,0 +1,38 @@
+import numpy as np
+import src.hyperband as hb
+from src.hyperband import hyperband_brackets, rung_budget, successive_halving, load_trials, sample_config
+
+
+def test_brackets_and_budgets_follow_hyperband():
+    # R / r = 81, eta = 3: s_max = 4 and n_s = ceil((s_max + 1) / (s + 1) * eta^s)
+    assert list(hyperband_brackets(1_000, 81_000, eta=3)) == [(4, 81), (3, 34), (2, 15), (1, 8), (0, 5)]
+    for s in range(5):
+        for rung in range(s + 1):
+            n_rows, n_rounds = rung_budget(rung, s, 81_000, eta=3)
+            assert n_rows == int(81_000 * 3 ** (rung - s))
+            assert n_rounds == max(hb.MIN_ROUNDS, int(hb.MAX_ROUNDS * 3 ** (rung - s)))
+        assert rung_budget(s, s, 81_000, eta=3) == (81_000, hb.MAX_ROUNDS)   # Last rung: full budget
+
+
+def test_successive_halving_promotes_top_configs(tmp_path, monkeypatch):
+    def toy_trial(binned_path, fit_idx, val_idx, config, n_rounds, num_threads):
+        # Higher "quality" always scores better; more rows add the same amount to everyone.
+        return {"macro_f1": config["quality"] + len(fit_idx) * 1e-6, "class_4_recall": 0.5,
+                "best_iteration": n_rounds, "train_time": 0.0}
+    monkeypatch.setattr(hb, "run_trial", toy_trial)
+    monkeypatch.setattr(hb, "N_WORKERS", 1)
+
+    rng = np.random.default_rng(0)
+    configs = [(i, {**sample_config(rng), "quality": float(q)}) for i, q in enumerate(rng.permutation(9))]
+    y = np.repeat(np.arange(4), 250)
+    log_path = tmp_path / "trials.jsonl"
+    winner = successive_halving(configs, 2, 0, None, y, np.arange(900), np.arange(900, 1000), 900,
+                                str(log_path), "test")
+
+    trials = load_trials(str(log_path))
+    by_quality = sorted(configs, key=lambda c: c[1]["quality"], reverse=True)
+    for rung, n_kept in enumerate([9, 3, 1]):
+        kept = set(trials.loc[trials["rung"] == rung, "config_id"])
+        assert kept == {cid for cid, _ in by_quality[:n_kept]}
+    assert list(trials.groupby("rung")["n_rows"].first()) == [100, 300, 900]
+    assert winner["config_id"] == by_quality[0][0]
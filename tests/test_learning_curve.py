@@ -0,0 +1,32 @@
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.ensemble import RandomForestClassifier
+from src.learning_curve import curve_sizes, worker_layout, fit_point, cheapest_size
+
+
+def test_sizes_grow_geometrically_to_the_full_store():
+    assert curve_sizes(1_000_000, 50_000, 2) == [50_000, 100_000, 200_000, 400_000, 800_000, 1_000_000]
+    assert curve_sizes(30_000, 50_000) == [30_000]
+    assert worker_layout(6, core_budget=8, n_workers=4) == (4, 2)
+    assert worker_layout(2, core_budget=8, n_workers=4) == (2, 4)
+
+
+def test_fit_point_scores_on_test_store_and_cheapest_size(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, 5))
+    y = (X[:, 0] > 0).astype(int) + 2 * (X[:, 1] > 1)
+    joblib.dump(sp.csr_matrix(X[:1500]), tmp_path / "train.pkl")
+    joblib.dump((sp.csr_matrix(X[1500:]), pd.Series(y[1500:] + 1)), tmp_path / "test.pkl")
+    config = {"class": RandomForestClassifier, "params": {"n_estimators": 20, "random_state": 0}}
+
+    point = fit_point(config, np.arange(1000)[::-1], y[:1500], str(tmp_path / "train.pkl"), None,
+                      str(tmp_path / "test.pkl"), 1)
+    assert point["n_rows"] == 1000 and point["macro_f1"] > 0.7
+
+    table = pd.DataFrame({"n_rows": [1, 2, 3], "train_time_s": [1.0, 2.0, 4.0],
+                          "macro_f1": [0.5, 0.6, 0.62], "class_4_recall": [0.3, 0.5, 0.55]})
+    assert cheapest_size(table, min_macro_f1=0.55)["n_rows"] == 2
+    assert cheapest_size(table, min_macro_f1=0.55, min_class_4_recall=0.52)["n_rows"] == 3
+    assert cheapest_size(table, min_macro_f1=0.9) is None
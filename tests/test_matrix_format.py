@@ -0,0 +1,45 @@
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from src import matrix_format
+from src.matrix_format import convert, density, cached_store, choose_formats
+
+
+def test_convert_keeps_values_in_every_layout():
+    X = sp.random(200, 30, density=0.2, format="csr", random_state=0)
+    assert np.isclose(density(X), 0.2, atol=0.01)
+    for fmt in ("csr", "csc", "dense32"):
+        out = convert(X, fmt)
+        values = out.toarray() if sp.issparse(out) else out
+        assert np.allclose(values, X.toarray(), atol=1e-6)
+    assert convert(X, "csc").format == "csc" and convert(X, "dense32").dtype == np.float32
+
+
+def test_cached_store_is_reused_until_source_changes(tmp_path, monkeypatch):
+    X = sp.random(100, 10, density=0.3, format="csr", random_state=0)
+    joblib.dump((X, np.zeros(100)), tmp_path / "train_data.pkl")
+    calls = []
+    real_convert = matrix_format.convert
+    monkeypatch.setattr(matrix_format, "convert", lambda X, fmt: calls.append(fmt) or real_convert(X, fmt))
+
+    first = cached_store(X, "dense32", str(tmp_path), str(tmp_path / "formats"))
+    second = cached_store(X, "dense32", str(tmp_path), str(tmp_path / "formats"))
+    assert calls == ["dense32"] and np.array_equal(first, second)
+
+    joblib.dump((X[:50], np.zeros(50)), tmp_path / "train_data.pkl")
+    cached_store(X[:50], "dense32", str(tmp_path), str(tmp_path / "formats"))
+    assert calls == ["dense32", "dense32"]
+
+
+def test_choose_formats_prefers_csr_unless_clearly_faster():
+    results = pd.DataFrame([
+        {"library": "RandomForestClassifier", "format": "csr", "fit_time_s": 10.0},
+        {"library": "RandomForestClassifier", "format": "dense32", "fit_time_s": 3.0},
+        {"library": "LGBMClassifier", "format": "csr", "fit_time_s": 1.0},
+        {"library": "LGBMClassifier", "format": "csc", "fit_time_s": 0.98},
+    ]).assign(density=0.2, n_rows=1000)
+    choices = choose_formats(results)
+    assert choices["RandomForestClassifier"]["format"] == "dense32"
+    assert np.isclose(choices["RandomForestClassifier"]["speedup_vs_csr"], 10 / 3)
+    assert choices["LGBMClassifier"]["format"] == "csr"
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from lightgbm import LGBMClassifier
+from preprocessing.transform import (
+    get_preprocessor, NUMERIC_FEATURES, CATEGORICAL_FEATURES, BOOL_FEATURES
+)
+from src.feature_importance import feature_groups
+from src.model_slimming import truncate, smallest_prefix, group_columns, reduced_preprocessor
+
+
+def test_prefix_search_and_truncation_agree():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(1000, 5))
+    y = (X[:, 0] > 0).astype(int) + (X[:, 1] > 0).astype(int) * 2
+    model = LGBMClassifier(n_estimators=100, verbose=-1).fit(X, y)
+
+    total = model.booster_.current_iteration()
+    k, curve = smallest_prefix(model, X, y, step=10)
+    assert k <= total and curve["rounds"].iloc[-1] == total
+    slim = truncate(model, k)
+    assert slim.booster_.current_iteration() == k
+    np.testing.assert_allclose(slim.predict_proba(X), model.predict_proba(X, num_iteration=k))
+
+
+def test_reduced_preprocessor_reproduces_kept_columns():
+    rng = np.random.default_rng(0)
+    n = 200
+    frame = pd.DataFrame({c: rng.normal(size=n) for c in NUMERIC_FEATURES})
+    for c in CATEGORICAL_FEATURES:
+        frame[c] = rng.choice(["a", "b", "c"], size=n)
+    for c in BOOL_FEATURES:
+        frame[c] = rng.integers(0, 2, size=n)
+    full = get_preprocessor().fit(frame)
+    groups = feature_groups(full)
+
+    kept = ["Start_Lat", "State", "season", "Stop"]
+    reduced = reduced_preprocessor(full, kept, frame)
+    expected = sp.csr_matrix(full.transform(frame))[:, group_columns(groups, kept)]
+    np.testing.assert_allclose(sp.csr_matrix(reduced.transform(frame)).toarray(), expected.toarray())
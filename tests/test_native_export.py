@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from lightgbm import LGBMClassifier
+from xgboost import XGBClassifier
+from src.native_export import export_native, has_native, load_native
+
+
+@pytest.mark.parametrize("model", [
+    LGBMClassifier(n_estimators=20, verbose=-1),
+    XGBClassifier(n_estimators=20),
+])
+def test_native_roundtrip_matches_wrapper(tmp_path, model):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 6))
+    y = (X[:, 0] > 0).astype(int) + (X[:, 1] > 0).astype(int) * 2
+    model.fit(X, y)
+
+    export_native(model, str(tmp_path), [f"f{i}" for i in range(6)], str(tmp_path / "missing.pkl"))
+    assert has_native(str(tmp_path))
+    native = load_native(str(tmp_path))
+    np.testing.assert_allclose(native.predict_proba(X), model.predict_proba(X), rtol=1e-6)
+    assert (native.predict(X) == model.predict(X)).all()
+    assert native.meta["severity_labels"] == [1, 2, 3, 4]
+
+
+def test_no_native_format_for_random_forest(tmp_path):
+    from sklearn.ensemble import RandomForestClassifier
+    model = RandomForestClassifier(n_estimators=2).fit([[0], [1]], [0, 1])
+    assert export_native(model, str(tmp_path)) is None
+    assert not has_native(str(tmp_path))
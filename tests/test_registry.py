@@ -0,0 +1,30 @@
+import json
+import joblib
+import pytest
+from src.registry import ModelRegistry
+
+
+def _artifact(root, name, macro_f1):
+    path = root / name
+    path.mkdir(parents=True)
+    joblib.dump({"model": name}, path / "model.pkl")
+    with open(path / "metrics.json", "w") as f:
+        json.dump({"macro_f1": macro_f1, "weighted_f1": 0.6, "class_4_recall": 0.5,
+                   "training_time": 10.0, "report": {"accuracy": 0.7}}, f)
+    return path
+
+
+def test_registry_lists_verifies_and_memoizes(tmp_path):
+    registry = ModelRegistry(str(tmp_path / "registry.json"))
+    a = _artifact(tmp_path, "a", 0.40)
+    _artifact(tmp_path, "b", 0.45)
+    registry.scan([str(tmp_path / "*")])
+
+    reloaded = ModelRegistry(str(tmp_path / "registry.json"))
+    assert reloaded.best()["name"] == "b"
+    model = reloaded.load("a")
+    assert model == {"model": "a"} and reloaded.load("a") is model
+
+    joblib.dump({"model": "tampered"}, a / "model.pkl")
+    with pytest.raises(ValueError):
+        ModelRegistry(str(tmp_path / "registry.json")).load("a")
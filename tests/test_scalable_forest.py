@@ -0,0 +1,41 @@
+import numpy as np
+import scipy.sparse as sp
+from sklearn.ensemble import RandomForestClassifier
+import pytest
+from src.scalable_forest import RunningOOB, CompactForest
+
+
+def _data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 5)).astype(np.float32)
+    y = (X[:, 0] > 0).astype(int) + (X[:, 1] > 0).astype(int) * 2
+    return X, y
+
+
+@pytest.mark.parametrize("class_weight", [None, "balanced"])
+def test_running_oob_matches_sklearn(class_weight):
+    X, y = _data()
+    y[:60] = 3   # Unbalanced classes, so balanced weights skew the bootstrap draws
+    params = dict(max_samples=200, oob_score=True, class_weight=class_weight, random_state=0)
+    forest = RandomForestClassifier(n_estimators=20, **params).fit(X, y)
+    rows = np.arange(len(y))
+    oob = RunningOOB(X, y, rows, 4)
+    # Two warm_start batches, as grow_forest adds them
+    grown = RandomForestClassifier(n_estimators=10, warm_start=True, **{**params, "oob_score": False}).fit(X, y)
+    oob.update(grown)
+    grown.set_params(n_estimators=20).fit(X, y)
+    oob.update(grown)
+    covered = oob.votes > 0
+    expected = forest.oob_decision_function_[covered]
+    ours = oob.proba[covered] / oob.proba[covered].sum(axis=1, keepdims=True)
+    np.testing.assert_allclose(ours, expected, atol=1e-5)
+
+
+def test_compact_forest_predicts_like_sklearn():
+    X, y = _data()
+    forest = RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0).fit(X, y)
+    compact = CompactForest.from_forest(forest)
+    X_sparse = sp.csr_matrix(X)
+    np.testing.assert_allclose(compact.predict_proba(X_sparse), forest.predict_proba(X), atol=1e-5)
+    assert (compact.predict(X) == forest.predict(X)).all()
+    assert compact.threshold_.dtype == np.float32 and compact.feature_.dtype == np.int16
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+from src.evaluation import confusion_matrix
+from src.slice_evaluation import slice_codes, grouped_confusion, slice_report
+
+
+def test_grouped_confusion_matches_per_slice_loop():
+    rng = np.random.default_rng(0)
+    n = 3000
+    frame = pd.DataFrame({
+        "State": pd.Categorical(rng.choice(["CA", "TX", "NY"], n)),
+        "Weather_Simple": pd.Categorical(rng.choice(["clear", "snow", None], n)),
+    })
+    y_true, y_pred = rng.integers(0, 4, n), rng.integers(0, 4, n)
+    codes, index = slice_codes(frame, columns=["State", "Weather_Simple"],
+                               crosses=[("State", "Weather_Simple")])
+    cms = grouped_confusion(codes, y_true, y_pred, len(index))
+
+    labels = frame.astype(object).fillna("missing").astype(str)
+    labels["State x Weather_Simple"] = labels["State"] + " | " + labels["Weather_Simple"]
+    for slice_id, (column, value) in index.iterrows():
+        mask = (labels[column] == value).to_numpy()
+        assert np.array_equal(cms[slice_id], confusion_matrix(y_true[mask], y_pred[mask]))
+
+    report = slice_report("m", codes, index, y_true, y_pred)
+    assert report.groupby("slice_column")["n_rows"].sum().eq(n).all()
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from lightgbm import LGBMClassifier
+from preprocessing.transform import get_preprocessor
+from src.state_models import row_states, plan_family, group_of, StateFamily, FALLBACK
+
+
+def test_row_states_read_back_from_one_hot_block():
+    raw = pd.DataFrame({"x": [0.1, 0.2, 0.3, 0.4], "State": ["CA", "FL", "CA", "TX"], "flag": [1, 0, 1, 0]})
+    preprocessor = get_preprocessor(numeric=["x"], categorical=["State"], boolean=["flag"]).fit(raw)
+    X = preprocessor.transform(pd.DataFrame({"x": [0.0, 1.0], "State": ["TX", "NV"], "flag": [0, 1]}))
+    assert list(row_states(X, preprocessor)) == ["TX", "Unknown"]
+    assert list(row_states(sp.csr_matrix(X), preprocessor)) == ["TX", "Unknown"]
+
+
+def test_family_routes_rows_and_falls_back():
+    assert group_of("CA", "region") == "West" and group_of("Unknown") is None
+    groups = np.array(["CA"] * 5 + ["FL"] * 3 + [None], dtype=object)
+    assert plan_family(groups, min_train_rows=4) == (["CA"], ["FL"])
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 4))
+    y = (X[:, 0] > 0).astype(int) + 2 * (X[:, 1] > 0.5)
+    fit = lambda rows: LGBMClassifier(n_estimators=10, verbose=-1).fit(X[rows], y[rows])
+    ca, glob = fit(slice(0, 300)), fit(slice(None))
+    family = StateFamily({"CA": ca}, glob, "state")
+
+    states = np.array(["CA", "FL", "Unknown", "CA"])
+    assert list(family.route(states)) == ["CA", FALLBACK, FALLBACK, "CA"]
+    proba = family.predict_proba(X[:4], states)
+    assert np.allclose(proba[[0, 3]], ca.predict_proba(X[[0, 3]]))
+    assert np.allclose(proba[[1, 2]], glob.predict_proba(X[[1, 2]]))
+    assert np.allclose(family.predict_proba(X[:1], ["CA"]), ca.predict_proba(X[:1]))
+    assert (family.predict(X[:4]) == glob.predict(X[:4])).all()
@@ -0,0 +1,24 @@
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from src.streaming_linear import open_store, iter_minibatches, fit_streaming
+
+
+def test_streaming_fit_from_memory_mapped_store(tmp_path):
+    rng = np.random.default_rng(0)
+    X = sp.csr_matrix(rng.normal(size=(3000, 6)))
+    y = pd.Series((X[:, 0].toarray().ravel() > 0).astype(int) + 1 + (X[:, 1].toarray().ravel() > 0) * 2)
+    joblib.dump((X, y), tmp_path / "train_data.pkl")
+
+    X_store, y_store = open_store(str(tmp_path))
+    assert y_store.min() == 0
+    exclude = np.zeros(3000, dtype=bool)
+    exclude[:100] = True
+    seen = np.concatenate([b for _, b in iter_minibatches(X_store, y_store, exclude, rng, 700, 128)])
+    assert len(seen) == 2900
+
+    weights = {c: 1.0 for c in range(4)}
+    model, history = fit_streaming(X_store, y_store, weights, epochs=5, holdout_rows=500)
+    assert history["holdout_macro_f1"].max() > 0.8
+    assert (model.predict(X[:500]) >= 0).all() and model.predict_proba(X[:5]).shape == (5, 4)
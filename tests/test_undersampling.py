@@ -0,0 +1,25 @@
+import numpy as np
+import scipy.sparse as sp
+from src.undersampling import undersample
+from src.binned_dataset import balanced_sample_weights
+
+
+def test_undersample_keeps_minorities_and_reweights_majority():
+    rng = np.random.default_rng(0)
+    y = rng.choice(4, size=10_000, p=[0.02, 0.8, 0.15, 0.03])
+    X = sp.csr_matrix(np.arange(len(y), dtype=np.float64).reshape(-1, 1))
+
+    X_s, y_s, weight = undersample(X, y, 0.25, block_rows=3000)
+    rows = X_s.toarray().ravel().astype(int)
+    assert (y[rows] == y_s).all() and (np.diff(rows) > 0).all()      # Single ordered pass
+    for c in (0, 2, 3):
+        assert (y_s == c).sum() == (y == c).sum()
+    assert abs((y_s == 1).sum() - 0.25 * (y == 1).sum()) <= 4        # Rounded per block
+
+    # Compensated class totals match the full-data balanced weighting
+    full = balanced_sample_weights(y)
+    for c in range(4):
+        assert np.isclose(weight[y_s == c].sum(), full[y == c].sum(), rtol=0.01)
+
+    X_full, y_full, w_full = undersample(X, y, 1.0)
+    assert X_full.shape[0] == len(y) and np.allclose(w_full, full)